@@ -4,6 +4,8 @@ import os
 #sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 AVAILABLE_PARSER_LIST = ['ossp', 'msgu']
+# commands to run parsers in a decode server
+AVAILABLE_SERVER_LIST = ['serve', 'client']
 
 def _main_help(script_name):
     print('Usage:\n')
@@ -11,16 +13,29 @@ def _main_help(script_name):
     print('  [parser] can be one of [ossp], [msgu]')
     print('  ossp: translate OSSP register dump from input log')
     print('  msgu: translate MSGU register dump from input log')
+    print('')
+    print('  python ' + script_name + ' serve --socket PATH [-j N] [-w path/to/basecode/workspace]')
+    print('  python ' + script_name + ' client --socket PATH [parser] -i dump_file [dump_file...] [-o output_dir]')
+    print('  serve: keep definitions loaded and decode dumps sent by client over a Unix socket')
+    print('  client: send dumps to a running server to decode')
     sys.exit(1)
 
 if __name__ == '__main__':
     parser = ''
-    if len(sys.argv) > 1 and sys.argv[1].lower() in AVAILABLE_PARSER_LIST:
+    if len(sys.argv) > 1 and sys.argv[1].lower() in AVAILABLE_PARSER_LIST + AVAILABLE_SERVER_LIST:
         parser = sys.argv[1].lower()
         sys.argv[0] = sys.argv[0] + ' ' + parser 
         del sys.argv[1]
     else:
         _main_help(sys.argv[0])
+
+    if parser == 'serve':
+        from src import server
+        server.run_server()
+        sys.exit(0)
+    elif parser == 'client':
+        from src import server
+        sys.exit(0 if server.run_client() else 1)
     
     found_log_flag = False
     if parser == 'msgu':
@@ -1,5 +1,6 @@
 import os
 import re
+import sys
 from ..shared import dutil as ut
 
 class MSGULog(ut.XMLREToken):
@@ -22,59 +23,84 @@ class MSGULog(ut.XMLREToken):
     # how many register value per register address is dumped on a line
     VAL_PER_LINE = 8
 
-    # default chipset, this will be overwritten by calling set_chipset()
-    chipset = LUXOR
+    # default chipset, used if chipset is not found in dump file
+    DEFAULT_CHIPSET = LUXOR
+    # line in dump file contains chipset name
+    ASIC_FAMILY_WORD = 'ASIC Family'
 
-    INPUT_DIR = ''
-    OUTPUT_DIR = ''
-    DEBUG_MODE = ''
-    WORKSPACE = ''
-    out_filename = ''
+    # section headers/endings in dump file used by a parser, override this in child class
+    LOG_MARKER_LIST = []
 
     @classmethod
-    def set_input_params(cls):
+    def get_input_context(cls):
+        ''' Get input params from sys argv
+            @return ut.ParseContext
+        '''
         argv = _MSGU_DUMP_WORKER()
         argv.parse()
-        cls.INPUT_DIR  = argv.INPUT_DIR
-        cls.OUTPUT_DIR = argv.OUTPUT_DIR
-        cls.DEBUG_MODE = argv.DEBUG_MODE
-        cls.WORKSPACE  = argv.WORKSPACE
-        cls.out_filename = ut.get_parsed_filename(cls.INPUT_DIR, cls.MODULE) + '.html'
-        cls.out_filename = os.path.join(cls.OUTPUT_DIR, cls.out_filename)
+        return cls.new_context(argv.INPUT_DIR, argv.OUTPUT_DIR, argv.DEBUG_MODE, argv.WORKSPACE)
+
+    @classmethod
+    def new_context(cls, in_file, out_dir, debug_mode=False, workspace='', out_name=None):
+        ''' Get context to decode a dump file without reading sys argv
+            @param in_file: path to input dump file
+            @param out_dir: path to output dir
+            @param debug_mode: optional, True to enable additional log
+            @param workspace: optional, path to BC workspace
+            @param out_name: optional, name of the dump used in output filenames, see ut.ParseContext
+            @return ut.ParseContext
+        '''
+        ctx = ut.ParseContext(in_file, out_dir, debug_mode, workspace, out_name=out_name)
+        ctx.out_filename = ctx.get_out_filename(cls.MODULE)
+        return ctx
 
     @classmethod
-    def set_chipset(cls):
-        if cls.INPUT_DIR is '':
+    def set_dump_index(cls, ctx, marker_list):
+        ''' Scan input dump file once and index section markers in marker_list.
+            @param ctx: ut.ParseContext
+            @param marker_list: list of section headers/endings
+            @note: index in ctx is reused if it has all markers in marker_list
+        '''
+        if not ctx.in_file:
+            raise ValueError('Input dir not defined.')
+        if ctx.dump_index is not None:
+            if ctx.dump_index.has_markers(marker_list):
+                return
+            ctx.dump_index.close()
+        ctx.dump_index = ut.DumpIndex(None, ctx.in_file, marker_list, [cls.ASIC_FAMILY_WORD], ctx.data)
+
+    @classmethod
+    def set_chipset(cls, ctx):
+        ''' Read chipset from dump file and save it in ctx
+            @param ctx: ut.ParseContext
+        '''
+        if ctx.in_file == '':
             raise ValueError('Input dir not defined.')
         flag_found = False
-        lines = ut.get_data_from_file(None, cls.INPUT_DIR)
-        for line in lines:
-            if 'ASIC Family' in line:
-                if cls.LUXOR in line:
-                    cls.chipset = cls.LUXOR
-                    flag_found = True
-                elif cls.WF in line:
-                    cls.chipset = cls.WF
-                    flag_found = True
-                break
+        ctx.chipset = cls.DEFAULT_CHIPSET
+        line = ctx.dump_index.get_keyword_line(cls.ASIC_FAMILY_WORD)
+        if line is not None:
+            if cls.LUXOR in line:
+                ctx.chipset = cls.LUXOR
+                flag_found = True
+            elif cls.WF in line:
+                ctx.chipset = cls.WF
+                flag_found = True
         if flag_found is True:
-            print("From the input file, chipset is " + cls.chipset)
+            print("From the input file, chipset is " + ctx.chipset)
         else:
-            print("Cannot read chipset from the input file, use default chipset " + cls.chipset)
+            print("Cannot read chipset from the input file, use default chipset " + ctx.chipset)
     
     @classmethod
-    def get_reg_val_list(cls, tag, header, ending, byte_per_reg):
+    def get_reg_val_list(cls, tag, ctx, header, ending, byte_per_reg):
         tag, tag_next_level = ut.get_debug_tags(tag, cls.MODULE, cls.SECTION, 'get_reg_val_list')
-        reg_list = []
         lines = ut.save_line_to_list(tag_next_level, header, ending, \
-        cls.INPUT_DIR, cls.LOG_LINE_LENGTH)
-        for line in lines:
-            # we have 8-byte(64-bit) stored per register address, each value splited by whitespace is 4-byte(32-bit).
-            # And there are 1 register address and 8 values per line
-            this_line_list = ut.reg_dump_line_to_addr_val_pair(tag_next_level, line, cls.ENDIANNESS, byte_per_reg, cls.BYTE_PER_VAL, cls.VAL_PER_LINE)
-
-            reg_list.extend(this_line_list)
-        if cls.DEBUG_MODE is True:
+        ctx.in_file, cls.LOG_LINE_LENGTH, dump_file=ctx.dump_index.get_section_lines(header, ending), \
+        line_num=ctx.dump_index.get_line_num(header))
+        # we have 8-byte(64-bit) stored per register address, each value splited by whitespace is 4-byte(32-bit).
+        # And there are 1 register address and 8 values per line
+        reg_list = ut.reg_dump_lines_to_addr_val_list(tag_next_level, lines, cls.ENDIANNESS, byte_per_reg, cls.BYTE_PER_VAL, cls.VAL_PER_LINE)
+        if ctx.debug_mode is True:
             print(tag + '[reg address] [reg value] after processing dump file:')
             addr_formater = '{:0%dx}' % (cls.BYTE_PER_VAL << 1)
             val_formater = '{:0%dx}' % (byte_per_reg << 1)
@@ -82,6 +108,40 @@ class MSGULog(ut.XMLREToken):
                 print(addr_formater.format(reg_addr) + ' ' + ' ' + val_formater.format(reg_val))
         return reg_list
 
+    def run(self, ctx=None, standalone=True, out_fd=None, writer=None):
+        ''' Run this parser. A child class defines
+                decode(ctx): decode this section, dump index in ctx has markers in LOG_MARKER_LIST,
+                             returns decoded result, or None if log for this section is not found
+                save(ctx, result, standalone, out_fd): save result returned by decode(), in its own file
+                             if standalone is True, otherwise write it to out_fd or append it to ctx.out_filename
+                save_records(ctx, result, writer): write result returned by decode() as records to writer
+            @param ctx: optional, ut.ParseContext of dump file to decode,
+                        read input params from sys argv if None
+            @param standalone: optional, save result in its own file if True
+            @param out_fd: optional, file-like object to write result to if standalone is False,
+                           result is appended to ctx.out_filename if None
+            @param writer: optional, ut.RecordWriter to write result as records to,
+                           standalone and out_fd are not used if writer is given
+            @return True if log is found
+        '''
+        if ctx is None:
+            ctx = self.get_input_context()
+        self.set_dump_index(ctx, self.LOG_MARKER_LIST)
+        tag = ut.get_debug_tags(None, self.MODULE, self.SECTION, 'run')[0]
+        print(tag + 'parser starts')
+
+        result = self.decode(ctx)
+        if result is None:
+            print(tag + 'parser ends, no log for this section')
+            return False
+        if writer is not None:
+            self.save_records(ctx, result, writer)
+        else:
+            self.save(ctx, result, standalone, out_fd)
+
+        print(tag + 'parser ends')
+        return True
+
 class HQA_WORD(object):
     # The following vars are string used in MSGU parsers 
     W_IB = 'IB'
@@ -103,16 +163,19 @@ class HQA_WORD(object):
 class _MSGU_DUMP_WORKER(ut.DumpArgvWorker):
     '''@Override ut.DumpArgvWorker to parse sys argv for MSGU'''
     WORKSPACE = ''
+    # follow a growing input file if set to true
+    FOLLOW = False
+    # seconds to wait before reading again in follow mode
+    INTERVAL = 1.0
 
-    @classmethod
-    def _set_workspace(cls, in_dir):
+    def _set_workspace(self, in_dir):
         ''' Set BC workspace, check this based on folder
             @param in_dir: path to a bc workspace
         '''
         if in_dir is not None and in_dir != '':
             if os.path.isdir(in_dir) and \
             os.path.isdir(os.path.join(in_dir, 'msgux')):
-                cls.WORKSPACE = in_dir
+                self.WORKSPACE = in_dir
             else:
                 raise AssertionError('Error, [{}] is not a valid dir to a BC workspace because msgux folder is NOT under this folder.\n'.format(in_dir))
 
@@ -122,15 +185,21 @@ class _MSGU_DUMP_WORKER(ut.DumpArgvWorker):
         '''
         parser = ut.DumpArgvWorker._build()
         parser.add_argument('-w', '--workspace', help='path to BaseCode workspace')
+        parser.add_argument('--follow', help='follow a growing input file and decode sections as they arrive, stop by Ctrl-C', action='store_true')
+        parser.add_argument('--interval', help='seconds to wait before reading again in follow mode', type=float, default=cls.INTERVAL)
         return parser
 
-    @classmethod
-    def parse(cls, build_cb=None):
+    def parse(self, build_cb=None):
         ''' @Override
         '''
         if build_cb:
-            args = ut.DumpArgvWorker.parse(build_cb)
+            args = ut.DumpArgvWorker.parse(self, build_cb)
         else:
-            args = ut.DumpArgvWorker.parse(cls._build)
-        cls._set_workspace(args.workspace)
+            args = ut.DumpArgvWorker.parse(self, self._build)
+        self._set_workspace(args.workspace)
+        if args.follow and args.batch:
+            print('Error, --follow cannot be used with --batch')
+            sys.exit(1)
+        self.FOLLOW = args.follow
+        self.INTERVAL = args.interval
         return args
@@ -8,9 +8,11 @@ class FWLog(cm.MSGULog):
     # name of this object
     SECTION = 'fw_log'
     # DEFINITION_FILE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', '..','msgux', 'pqi', 'src', 'msgu_log.h')
-    DEFINITION_FILE_DIR = os.path.join(ut.DumpArgvWorker().INCLUDE_DIR, 'doc', 'msgu', 'msgu_log.h')
+    DEFINITION_FILE_NAME = 'msgu_log.h'
+    DEFINITION_FILE_DIR = os.path.join(ut.DumpArgvWorker().INCLUDE_DIR, 'doc', 'msgu', DEFINITION_FILE_NAME)
     LOG_HEADER = '# MSGU FW Log from DQ location'
     LOG_ENDING = '# HQA Memory'
+    LOG_MARKER_LIST = [LOG_HEADER, LOG_ENDING]
     # special word on first line of MSGU FW log
     LOG_FIRST_LINE_WORD_1 = 'a0a1a2a3'
     LOG_FIRST_LINE_WORD_8 = 'a4a5a6a7'
@@ -22,9 +24,6 @@ class FWLog(cm.MSGULog):
     # 003d at the correct idx tells this line is a msgu fw log
     re_is_fw_log_token = re.compile('^(0x)?(003[dD])([0-9a-fA-F]{4}$)')
 
-    def __init__(self):
-        self.log_start_idx = None
-        self.clk_freq = None
     @classmethod
     def _process_line(cls, tag, reg_dump_line, definition_list, verbose=False):
         tag = ut.get_debug_tags(tag, cls.MODULE, cls.SECTION, 'process_line')[0]
@@ -53,9 +52,7 @@ class FWLog(cm.MSGULog):
             idx = int(raw_key[4:], 16)
             if idx < 0 or idx >= len(definition_list):
                 return time_tick, reg_dump_line + ' meaning of the log not found.'
-            definition_line = definition_list[idx]
-            trans_line = ut.replace_word_in_line_from_logh(log_word_list, \
-            cls.LOG_FIRST_WORD_IDX, definition_line)
+            trans_line = definition_list[idx].render(log_word_list, cls.LOG_FIRST_WORD_IDX)
             if verbose is True:
                 print(tag + 'translate line before:')
                 print(tag + reg_dump_line + '\n')
@@ -72,6 +69,56 @@ class FWLog(cm.MSGULog):
                     return time_tick, reg_dump_line + ' is not a valid MSGU FW log.'
             return None, None
 
+    @classmethod
+    def decode_line(cls, tag, line, definition_list, verbose=False):
+        ''' Decode one complete line of FW log section
+            @param line: line returned by ut.save_line_to_list or ut.SectionLineJoiner
+            @param definition_list: list returned by get_def_list()
+            @param verbose: optional, True to enable additional log
+            @return [log_start_idx, clk_freq] in int if line is first line of FW log,
+                    [time_tick, log_str] if line is a log entry, [None, None] if line is empty
+        '''
+        return cls._process_line(tag, line, definition_list, verbose)
+
+    @classmethod
+    def _find_def_file(cls, workspace):
+        ''' Walk through a BC workspace to find header file
+            @param workspace: path to a BC workspace
+            @return path to header file
+        '''
+        def_file_dir = ''
+        header_file_count = 0
+        for root, dirs, files in os.walk(workspace):
+            for filename in files:
+                if cls.DEFINITION_FILE_NAME in filename:
+                    def_file_dir = os.path.join(root, filename)
+                    header_file_count += 1
+                    if header_file_count > 1:
+                        raise AssertionError('In workspace {}, found multiple msgu header file msgu_log.h'.format(workspace))
+
+        if header_file_count == 0:
+            raise AssertionError('In workspace {}, header file msgu_log.h not found'.format(workspace))
+        return def_file_dir
+
+    @classmethod
+    def get_def_list(cls, tag, workspace='', verbose=False):
+        ''' Get list of LogFormat from header file
+            @param tag: tag from caller
+            @param workspace: optional, use header file in this BC workspace if given
+            @param verbose: optional, True to print out log entries when header file is compiled
+            @return list of LogFormat
+        '''
+        def_file_dir = cls.DEFINITION_FILE_DIR
+        # Override def file dir if workspace is defined
+        if workspace != '':
+            def_file_dir = ut.DefCache.get_workspace_file(tag, workspace, \
+            cls.DEFINITION_FILE_NAME, cls._find_def_file)
+
+        # compile header file only if it is not in def cache
+        return ut.DefCache.get(tag, 'msgu_log_format_list', def_file_dir, \
+        lambda filename: ut.create_log_format_list_from_logh(tag, filename, \
+        cls.LOG_ENTRY_PREFIX, verbose))
+
     @classmethod
     def write_result(cls, fd, start_idx_msg, clk_freq, time_list, log_list, standalone):
         if standalone is True:
@@ -84,119 +131,156 @@ class FWLog(cm.MSGULog):
         if start_idx_msg is not None:
             fd.write(''.join([pre_0, start_idx_msg, pre_1]))
 
+        cls.write_clock(fd, clk_freq, pre_0, pre_1)
+        cls.write_entries(fd, clk_freq, time_list, log_list, pre_0, pre_1)
+
+    @classmethod
+    def write_clock(cls, fd, clk_freq, pre_0='', pre_1=''):
+        ''' Write clock frequency line
+            @param fd: fd to output file
+            @param clk_freq: clock frequency in Hz, None if unknown
+            @param pre_0: optional, prefix of each line
+            @param pre_1: optional, suffix of each line
+        '''
         if clk_freq is None:
             fd.write(''.join(['{}Clock frequency is unknown, use "tick" as time unit{}\n'.format(pre_0, pre_1)]))
+        else:
+            # divide by 10^6 so clkFreq is in MHz
+            fd.write('%sClock frequency is %d MHz%s\n' % (pre_0, clk_freq // 1000000, pre_1))
+
+    @classmethod
+    def write_entries(cls, fd, clk_freq, time_list, log_list, pre_0='', pre_1=''):
+        ''' Write log entries, time is in us if clock frequency is known, otherwise in tick
+            @param fd: fd to output file
+            @param clk_freq: clock frequency in Hz, None if unknown
+            @param time_list: list of time in tick
+            @param log_list: list of decoded log
+            @param pre_0: optional, prefix of each line
+            @param pre_1: optional, suffix of each line
+        '''
+        if clk_freq is None:
             for time_tick, log in zip(time_list, log_list):
                 fd.write('{}{} tick: {}{}\n'.format(pre_0, time_tick, log, pre_1))
         else:
-            # divide by 10^6 so clkFreq is in MHz
             frequency = clk_freq // 1000000
-            fd.write('%sClock frequency is %d MHz%s\n' % (pre_0, frequency, pre_1))
             for time_tick, log in zip(time_list, log_list):
                 time_real = time_tick // frequency
                 time_print = ut.add_mark_to_word(str(time_real), ',', 3)
                 fd.write('%s%s us: %s%s\n' % (pre_0, time_print, log, pre_1))
 
-    def run(self, standalone=True):
-        if standalone is True:
-            self.set_input_params()
+    @classmethod
+    def write_entry_records(cls, writer, clk_freq, time_list, log_list):
+        ''' Write log entries as records, time_us is None if clock frequency is unknown
+            @param writer: ut.RecordWriter
+            @param clk_freq: clock frequency in Hz, None if unknown
+            @param time_list: list of time in tick
+            @param log_list: list of decoded log
+        '''
+        frequency = clk_freq // 1000000 if clk_freq is not None else None
+        for time_tick, log in zip(time_list, log_list):
+            time_us = time_tick // frequency if frequency else None
+            writer.write('fw_log', section=cls.SECTION, tick=time_tick, time_us=time_us, log=log)
 
+    def decode(self, ctx):
+        ''' Decode FW log
+            @param ctx: ut.ParseContext
+            @return DecodedFWLog, or None if FW log is not found
+        '''
+        # messages in result use tag of run()
         tag, tag_next_level = ut.get_debug_tags(None, self.MODULE, self.SECTION, 'run')
-        print(tag + 'parser starts')
-
         line_list = ut.save_line_to_list(tag_next_level, self.LOG_HEADER, self.LOG_ENDING, \
-        self.INPUT_DIR, self.LOG_LINE_LENGTH)
+        ctx.in_file, self.LOG_LINE_LENGTH, \
+        dump_file=ctx.dump_index.get_section_lines(self.LOG_HEADER, self.LOG_ENDING), \
+        line_num=ctx.dump_index.get_line_num(self.LOG_HEADER))
         if not line_list:
-            print(tag + 'parser ends, no log for this section')
-            return False
+            return None
 
-        # Override def file dir if workspace is defined
-        if self.WORKSPACE != '':
-            self.DEFINITION_FILE_DIR = ''
-            header_file_count = 0
-            for root, dirs, files in os.walk(self.WORKSPACE):
-                for filename in files:
-                    if 'msgu_log.h' in filename:
-                        self.DEFINITION_FILE_DIR = os.path.join(root, filename)
-                        header_file_count += 1
-                        if header_file_count > 1:
-                            raise AssertionError('In workspace {}, found multiple msgu header file msgu_log.h'.format(self.WORKSPACE))
-            
-            if header_file_count is 0:
-                raise AssertionError('In workspace {}, header file msgu_log.h not found'.format(self.WORKSPACE))
-            
-                     
-
-        definition_list = ut.create_def_list_from_logh(tag_next_level, self.DEFINITION_FILE_DIR, \
-        self.LOG_ENTRY_PREFIX, self.DEBUG_MODE)
+        definition_list = self.get_def_list(tag_next_level, ctx.workspace, ctx.debug_mode)
 
+        log_start_idx = None
+        clk_freq = None
         trans_list_time = []
         trans_list_log = []
         for line in line_list:
-            item_1, item_2 = self._process_line(tag_next_level, line, definition_list, self.DEBUG_MODE)
+            item_1, item_2 = self._process_line(tag_next_level, line, definition_list, ctx.debug_mode)
             if item_1 is None or item_2 is None:
                 continue
             if type(item_2) is int and type(item_1) is int:
-                self.log_start_idx = item_1
-                self.clk_freq = item_2
+                log_start_idx = item_1
+                clk_freq = item_2
             else:           
                 trans_list_time.append(item_1)
                 trans_list_log.append(item_2)
 
-        if self.log_start_idx is None or self.log_start_idx > len(trans_list_time):
-            if self.log_start_idx is None:
+        if log_start_idx is None or log_start_idx > len(trans_list_time):
+            if log_start_idx is None:
                 no_log_start_idx_msg = tag + \
                 'Warning, start index not found, not sort the log!\n'
             else:
                 no_log_start_idx_msg = tag + \
-                'Warning, start index =' + str(self.log_start_idx) + ' too large, not sort the log!\n'
+                'Warning, start index =' + str(log_start_idx) + ' too large, not sort the log!\n'
             sorted_trans_list_time = trans_list_time
             sorted_trans_list_log = trans_list_log
         else:
             no_log_start_idx_msg = None
-            sorted_trans_list_time = trans_list_time[self.log_start_idx:]
-            sorted_trans_list_time.extend(trans_list_time[0:self.log_start_idx])
-            sorted_trans_list_log = trans_list_log[self.log_start_idx:]
-            sorted_trans_list_log.extend(trans_list_log[0:self.log_start_idx])
-        if self.DEBUG_MODE is True:
+            sorted_trans_list_time = trans_list_time[log_start_idx:]
+            sorted_trans_list_time.extend(trans_list_time[0:log_start_idx])
+            sorted_trans_list_log = trans_list_log[log_start_idx:]
+            sorted_trans_list_log.extend(trans_list_log[0:log_start_idx])
+        if ctx.debug_mode is True:
             print("\nsorted list is:")
             for time_tick, log in zip(sorted_trans_list_time, sorted_trans_list_log):
                 time_tick_hex = format(time_tick, '08x')
                 print(time_tick_hex + ' time: ' + log)
             print("\n")
-        try:
-            os.stat(self.OUTPUT_DIR)
-        except:
-            os.mkdir(self.OUTPUT_DIR)
+        return DecodedFWLog(sorted_trans_list_time, sorted_trans_list_log, clk_freq, no_log_start_idx_msg)
 
+    def save(self, ctx, result, standalone=True, out_fd=None):
+        ''' Save result returned by decode(), see MSGULog.run '''
+        tag = ut.get_debug_tags(None, self.MODULE, self.SECTION, 'run')[0]
         if standalone is True:
-            filename = ut.get_parsed_filename(self.INPUT_DIR, self.MODULE, self.SECTION) + '.log'
-            filename = os.path.join(self.OUTPUT_DIR, filename)
+            try:
+                os.stat(ctx.out_dir)
+            except:
+                os.mkdir(ctx.out_dir)
+            filename = ctx.get_out_filename(self.MODULE, self.SECTION, '.log')
             fd = open(filename, 'w')
 
             fd.write('Decoded ' + self.MODULE + self.SECTION + \
-            'from dump file ' + self.INPUT_DIR + ':\n')
-            self.write_result(fd, no_log_start_idx_msg, self.clk_freq, \
-            sorted_trans_list_time, sorted_trans_list_log, standalone)
+            'from dump file ' + ctx.in_file + ':\n')
+            self.write_result(fd, result.warning, result.clk_freq, \
+            result.time_list, result.log_list, standalone)
 
             fd.close()
             print(tag + 'result saved in ' + filename)
         else:
-            fd = open(self.out_filename, 'a')
+            fd = open(ctx.out_filename, 'a') if out_fd is None else out_fd
             fd.write(mhtml.get_fw_group_header())
 
-            self.write_result(fd, no_log_start_idx_msg, self.clk_freq, \
-            sorted_trans_list_time, sorted_trans_list_log, standalone)
+            self.write_result(fd, result.warning, result.clk_freq, \
+            result.time_list, result.log_list, standalone)
       
             fd.write(mhtml.get_fw_group_ending())
-            fd.close()
+            if out_fd is None:
+                fd.close()
 
-        # set vars read from dump file back to none after finish
-        self.log_start_idx = None
-        self.clk_freq = None
+    def save_records(self, ctx, result, writer):
+        ''' Write result returned by decode() as records, see MSGULog.run '''
+        writer.write('fw_info', section=self.SECTION, clk_freq=result.clk_freq, \
+        warning=result.warning.strip() if result.warning is not None else None)
+        self.write_entry_records(writer, result.clk_freq, result.time_list, result.log_list)
 
-        print(tag + 'parser ends')
-        return True
+class DecodedFWLog(object):
+    ''' Decoded MSGU FW log, entries are sorted from the oldest one if start index is found '''
+    def __init__(self, time_list, log_list, clk_freq=None, warning=None):
+        # list of time in tick
+        self.time_list = time_list
+        # list of decoded log, log_list[i] is logged at time_list[i]
+        self.log_list = log_list
+        # clock frequency in Hz, None if not found in dump file
+        self.clk_freq = clk_freq
+        # warning about log order, None if log is sorted
+        self.warning = warning
 
 # if entry point is this script, then run this script independently from other parsers.
 if __name__ == '__main__':
@@ -1,4 +1,5 @@
 import os
+import collections
 import xml.etree.ElementTree as ET
 import src.msgu.msgu_common as cm
 import src.msgu.msgu_html as mhtml
@@ -46,78 +47,94 @@ class HQALog(cm.MSGULog, cm.HQA_WORD):
     LOG_CR_ADDRESS = 0xbf607008
     LOG_CR_BYTE_PER_REG = 8
     LOG_CR_VAL_PER_LINE = 2
+    LOG_MARKER_LIST = [LOG_HEADER, LOG_ENDING, LOG_CR_HEADER, LOG_CR_ENDING]
 
-    def __init__(self):
-        self.first_enabled_q = self.DEFAULT_ID
-        # Default int mode
-        self.hqa_int_mode = self.W_MSIX
-        # default Q range, use LUXOR
-        self.q_num = self.LUXOR_Q_NUM
-        self.qid_first_ib_admin = self.LUXOR_IB_ADMIN_FIRST_QID
-        self.qid_last_ib_admin = self.LUXOR_IB_ADMIN_LAST_QID
-        self.qid_first_ib_oper = self.LUXOR_IB_OPER_FIRST_QID
-        self.qid_last_ib_oper = self.LUXOR_IB_OPER_LAST_QID
-        self.qid_first_ob_admin = self.LUXOR_OB_ADMIN_FIRST_QID
-        self.qid_last_ob_admin = self.LUXOR_OB_ADMIN_LAST_QID
-        self.qid_first_ob_oper = self.LUXOR_OB_OPER_FIRST_QID
-        self.qid_last_ob_oper = self.LUXOR_OB_OPER_LAST_QID
-        self.q_reg_per_q = self.LUXOR_REG_PER_Q
-   
-    def set_q_range(self, chipset):
-        if chipset == self.LUXOR:
-            # default is set in initialization, so just pass here.
-            pass
-        elif chipset == self.WF:
-            self.q_num = self.WF_Q_NUM
-            self.qid_first_ib_admin = self.WF_IB_ADMIN_FIRST_QID
-            self.qid_last_ib_admin = self.WF_IB_ADMIN_LAST_QID
-            self.qid_first_ib_oper = self.WF_IB_OPER_FIRST_QID
-            self.qid_last_ib_oper = self.WF_IB_OPER_LAST_QID
-            self.qid_first_ob_admin = self.WF_OB_ADMIN_FIRST_QID
-            self.qid_last_ob_admin = self.WF_OB_ADMIN_LAST_QID
-            self.qid_first_ob_oper = self.WF_OB_OPER_FIRST_QID
-            self.qid_last_ob_oper = self.WF_OB_OPER_LAST_QID
-            self.q_reg_per_q = self.WF_REG_PER_Q
+    @classmethod
+    def get_q_range(cls, chipset):
+        ''' @param chipset: chipset read from input dump file
+            @return HQAQRange of the chipset
+        '''
+        if chipset == cls.LUXOR:
+            return HQAQRange(cls.LUXOR_Q_NUM, \
+            cls.LUXOR_IB_ADMIN_FIRST_QID, cls.LUXOR_IB_ADMIN_LAST_QID, \
+            cls.LUXOR_IB_OPER_FIRST_QID, cls.LUXOR_IB_OPER_LAST_QID, \
+            cls.LUXOR_OB_ADMIN_FIRST_QID, cls.LUXOR_OB_ADMIN_LAST_QID, \
+            cls.LUXOR_OB_OPER_FIRST_QID, cls.LUXOR_OB_OPER_LAST_QID, \
+            cls.LUXOR_REG_PER_Q)
+        elif chipset == cls.WF:
+            return HQAQRange(cls.WF_Q_NUM, \
+            cls.WF_IB_ADMIN_FIRST_QID, cls.WF_IB_ADMIN_LAST_QID, \
+            cls.WF_IB_OPER_FIRST_QID, cls.WF_IB_OPER_LAST_QID, \
+            cls.WF_OB_ADMIN_FIRST_QID, cls.WF_OB_ADMIN_LAST_QID, \
+            cls.WF_OB_OPER_FIRST_QID, cls.WF_OB_OPER_LAST_QID, \
+            cls.WF_REG_PER_Q)
         else:
             raise ValueError('chipset ' + chipset + 'is not supported.')
 
-    def set_int_mode(self, tag):
-        tag_next_level = ut.get_debug_tags(tag, self.MODULE, self.SECTION, 'set_int_mode')[1]
-        cr_reg_lines = ut.save_line_to_list(tag_next_level, self.LOG_CR_HEADER, self.LOG_CR_ENDING, \
-        self.INPUT_DIR, self.LOG_CR_LINE_LENGTH)
-        cr_addr_str = '{:08x}'.format(self.LOG_CR_ADDRESS)
+    @classmethod
+    def get_int_mode(cls, tag, ctx):
+        ''' @param ctx: ut.ParseContext
+            @return int mode of HQA in the dump, W_INTX or W_MSIX
+        '''
+        tag_next_level = ut.get_debug_tags(tag, cls.MODULE, cls.SECTION, 'get_int_mode')[1]
+        cr_reg_lines = ut.save_line_to_list(tag_next_level, cls.LOG_CR_HEADER, cls.LOG_CR_ENDING, \
+        ctx.in_file, cls.LOG_CR_LINE_LENGTH, \
+        dump_file=ctx.dump_index.get_section_lines(cls.LOG_CR_HEADER, cls.LOG_CR_ENDING), \
+        line_num=ctx.dump_index.get_line_num(cls.LOG_CR_HEADER))
+        cr_addr_str = '{:08x}'.format(cls.LOG_CR_ADDRESS)
         for line in cr_reg_lines:
             if cr_addr_str in line:
-                this_line_list = ut.reg_dump_line_to_addr_val_pair(tag_next_level, line, self.ENDIANNESS, \
-                self.LOG_CR_BYTE_PER_REG, self.BYTE_PER_VAL, self.LOG_CR_VAL_PER_LINE)
+                this_line_list = ut.reg_dump_line_to_addr_val_pair(tag_next_level, line, cls.ENDIANNESS, \
+                cls.LOG_CR_BYTE_PER_REG, cls.BYTE_PER_VAL, cls.LOG_CR_VAL_PER_LINE)
                 for reg_addr, reg_val in this_line_list:
-                    if reg_addr == self.LOG_CR_ADDRESS and \
-                       ut.bit_shift(reg_val, 32)[0] == 1:
-                       self.hqa_int_mode = self.W_INTX
-                       break
+                    if reg_addr == cls.LOG_CR_ADDRESS and \
+                       ut.get_bit_field(32).extract(reg_val) == 1:
+                       return cls.W_INTX
                 break
+        # Default int mode
+        return cls.W_MSIX
+
+    @classmethod
+    def get_first_enabled_q(cls, queue_list):
+        ''' @param queue_list: list of HQA_Q returned by decode()
+            @return qid of the first enabled queue, or DEFAULT_ID if no queue is enabled
+        '''
+        for queue in queue_list:
+            if queue.is_enabled is True:
+                return queue.qid
+        return cls.DEFAULT_ID
+
+    @classmethod
+    def init_queues(cls, reg_list, q_range, hqa_int_mode, verbose=False):
+        # put regs into per queue buckets in one pass, qid is addr // reg per queue
+        q_reg_list_dict = collections.defaultdict(list)
+        hqa_addr_offset = cls.MSGU_ADDRESS_OFFSET + cls.HQA_ADDRESS_OFFSET
+        for reg_addr, reg_val in reg_list:
+            reg_addr -= hqa_addr_offset
+            if reg_addr < 0:
+                continue
+            q_reg_list_dict[reg_addr // q_range.reg_per_q].append([reg_addr, reg_val])
 
-    def init_queues(self, reg_list, verbose=False):
         queue_list = []
-        for qid in range(0, self.q_num):
-            if qid >= self.qid_first_ib_admin and qid <= self.qid_last_ib_admin:
-                q_mode = self.W_IB
-                q_type = self.W_ADMIN
-            elif qid >= self.qid_first_ib_oper and qid <= self.qid_last_ib_oper:
-                q_mode = self.W_IB
-                q_type = self.W_OPER
-            elif qid >= self.qid_first_ob_admin and qid <= self.qid_last_ob_admin:
-                q_mode = self.W_OB
-                q_type = self.W_ADMIN
-            elif qid >= self.qid_first_ob_oper and qid <= self.qid_last_ob_oper:
-                q_mode = self.W_OB
-                q_type = self.W_OPER
+        for qid in range(0, q_range.q_num):
+            if qid >= q_range.first_ib_admin and qid <= q_range.last_ib_admin:
+                q_mode = cls.W_IB
+                q_type = cls.W_ADMIN
+            elif qid >= q_range.first_ib_oper and qid <= q_range.last_ib_oper:
+                q_mode = cls.W_IB
+                q_type = cls.W_OPER
+            elif qid >= q_range.first_ob_admin and qid <= q_range.last_ob_admin:
+                q_mode = cls.W_OB
+                q_type = cls.W_ADMIN
+            elif qid >= q_range.first_ob_oper and qid <= q_range.last_ob_oper:
+                q_mode = cls.W_OB
+                q_type = cls.W_OPER
             else:
-                q_mode = self.W_NA
-                q_type = self.W_NA
+                q_mode = cls.W_NA
+                q_type = cls.W_NA
                 continue
-            offset = qid * self.q_reg_per_q
-            this_q = HQA_Q(qid, q_mode, q_type, offset, self.hqa_int_mode)
+            offset = qid * q_range.reg_per_q
+            this_q = HQA_Q(qid, q_mode, q_type, offset, hqa_int_mode)
             # Special reg_addr
             gen_cfg_reg_addr = 0x0038 + offset
             hwa_cfg_reg_addr = 0x0040 + offset
@@ -126,58 +143,49 @@ class HQALog(cm.MSGULog, cm.HQA_WORD):
         
             # lower bound is 0+offset
             this_q.reg_lower_bound = offset
-            this_q.reg_upper_bound = self.q_reg_per_q + offset - self.BYTE_PER_REG
+            this_q.reg_upper_bound = q_range.reg_per_q + offset - cls.BYTE_PER_REG
 
-            for reg_addr, reg_val in reg_list:
-                reg_addr -= (self.MSGU_ADDRESS_OFFSET + self.HQA_ADDRESS_OFFSET)
-                if reg_addr < this_q.reg_lower_bound:
-                    continue
-                if reg_addr > this_q.reg_upper_bound:
-                    #print(qid,' break at ', reg_addr)
-                    break
+            # regs in the bucket of this queue are all within its bounds
+            for reg_addr, reg_val in q_reg_list_dict.get(qid, []):
                 this_q.decoded_reg_dict[reg_addr] = REG.DecodedReg(reg_addr, 'TBD', reg_val)
                 if reg_addr == gen_cfg_reg_addr:
-                    if ut.bit_shift(reg_val, 30)[0] == 1:
-                        this_q.status_dict['rearm'] = self.W_ON
-                    if ut.bit_shift(reg_val, 29)[0] == 1:
+                    if ut.get_bit_field(30).extract(reg_val) == 1:
+                        this_q.status_dict['rearm'] = cls.W_ON
+                    if ut.get_bit_field(29).extract(reg_val) == 1:
                         this_q.is_enabled = True
-                        if self.first_enabled_q < 0:
-                            self.first_enabled_q = this_q.qid
-                            if verbose is True:
-                                print('first enabled Q is ', self.first_enabled_q)
 
                 elif reg_addr == hwa_cfg_reg_addr and \
-                    this_q.q_mode is self.W_IB and \
-                    this_q.q_type is self.W_OPER:
-                    egsm_id = ut.bit_shift(reg_val, '40:32')[0]
-                    if egsm_id == self.EGSM_HBA_QID:
-                        this_q.status_ib_oper_q_raid_hba = self.W_HBA
-                    elif egsm_id == self.EGSM_RAID_QID:
-                        this_q.status_ib_oper_q_raid_hba = self.W_RAID
+                    this_q.q_mode is cls.W_IB and \
+                    this_q.q_type is cls.W_OPER:
+                    egsm_id = ut.get_bit_field('40:32').extract(reg_val)
+                    if egsm_id == cls.EGSM_HBA_QID:
+                        this_q.status_ib_oper_q_raid_hba = cls.W_HBA
+                    elif egsm_id == cls.EGSM_RAID_QID:
+                        this_q.status_ib_oper_q_raid_hba = cls.W_RAID
                     del egsm_id
 
                 elif reg_addr == hqa_eng_cfg_reg_addr:
-                    if this_q.q_mode is self.W_OB and \
-                       this_q.q_type is self.W_OPER:
-                        this_q.status_ob_oper_q_int_num = ut.bit_shift(reg_val, '55:48')[0]
+                    if this_q.q_mode is cls.W_OB and \
+                       this_q.q_type is cls.W_OPER:
+                        this_q.status_ob_oper_q_int_num = ut.get_bit_field('55:48').extract(reg_val)
 
-                    if ut.bit_shift(reg_val, 63)[0] == 1:
-                        this_q.status_dict['int_max_tmr'] = self.W_ENABLE
-                    if ut.bit_shift(reg_val, 62)[0] == 1:
-                        this_q.status_dict['int_min_tmr'] = self.W_ENABLE
+                    if ut.get_bit_field(63).extract(reg_val) == 1:
+                        this_q.status_dict['int_max_tmr'] = cls.W_ENABLE
+                    if ut.get_bit_field(62).extract(reg_val) == 1:
+                        this_q.status_dict['int_min_tmr'] = cls.W_ENABLE
                     
-                    if ut.bit_shift(reg_val, 31)[0] == 1:
-                        this_q.status_dict['idx_max_tmr'] = self.W_ENABLE
-                    if ut.bit_shift(reg_val, 30)[0] == 1:
-                        this_q.status_dict['idx_min_tmr'] = self.W_ENABLE
+                    if ut.get_bit_field(31).extract(reg_val) == 1:
+                        this_q.status_dict['idx_max_tmr'] = cls.W_ENABLE
+                    if ut.get_bit_field(30).extract(reg_val) == 1:
+                        this_q.status_dict['idx_min_tmr'] = cls.W_ENABLE
 
-                    if ut.bit_shift(reg_val, 15)[0] == 1:
-                        this_q.status_dict['iu_max_tmr'] = self.W_ENABLE
+                    if ut.get_bit_field(15).extract(reg_val) == 1:
+                        this_q.status_dict['iu_max_tmr'] = cls.W_ENABLE
 
-                    if ut.bit_shift(reg_val, 14)[0] == 1:
-                        this_q.status_dict['iu_min_tmr'] = self.W_ENABLE
+                    if ut.get_bit_field(14).extract(reg_val) == 1:
+                        this_q.status_dict['iu_min_tmr'] = cls.W_ENABLE
                 elif reg_addr == error_reg_addr:
-                    if ut.bit_shift(reg_val, 0)[0] == 1:
+                    if ut.get_bit_field(0).extract(reg_val) == 1:
                         this_q.is_bad_q = True
             queue_list.append(this_q)
             if verbose is True:
@@ -188,79 +196,110 @@ class HQALog(cm.MSGULog, cm.HQA_WORD):
             del this_q
         return queue_list
 
+    @classmethod
+    def _build_def_table(cls, def_file_dir):
+        ''' Build HQA def table from def xml file
+            @param def_file_dir: path to def xml file
+            @return def_table: dict[doc_addr] = [reg_name, bit_list], where bit_list is
+                               list of [bit_pos, bit_field, bit_name, p_list], p_list is list of
+                               [attrib_list, text] for each <p> in bit description, and
+                               attrib_list is list of [key, val] the queue status must match
+        '''
+        root = ET.parse(def_file_dir).getroot()
+        def_table = collections.OrderedDict()
+        for reg in root.findall('register'):
+            doc_addr = int(reg.find('reg_address').text, 16)
+            reg_name = reg.find('reg_name').text
+            bit_list = []
+            reg_bits = reg.find('reg_bits')
+            if reg_bits is not None:
+                for reg_bit in reg_bits.findall('reg_bit'):
+                    bit_pos = reg_bit.find('bit_position').text
+                    bit_name = reg_bit.find('bit_name').text
+                    bit_des = reg_bit.find('bit_description')
+                    p_list = []
+                    if bit_des is not None:
+                        for p in bit_des:
+                            if p.text is not None:
+                                p_list.append([list(p.attrib.items()), p.text])
+                    bit_list.append([bit_pos, ut.get_bit_field(bit_pos), bit_name, p_list])
+            if doc_addr in def_table:
+                # same as walking the xml tree, the last reg name wins and
+                # bits from all regs with this addr are decoded
+                def_table[doc_addr][0] = reg_name
+                def_table[doc_addr][1].extend(bit_list)
+            else:
+                def_table[doc_addr] = [reg_name, bit_list]
+        return def_table
+
+    @classmethod
+    def get_def_table(cls, tag):
+        # parse def xml file only if it is not in def cache
+        return ut.DefCache.get(tag, 'hqa_def_table', cls.DEFINITION_FILE_DIR, cls._build_def_table)
+
     @classmethod
     def get_reg_meaning(cls, tag, queue_list, verbose=False):
         tag, tag_next_level = ut.get_debug_tags(tag, cls.MODULE, cls.SECTION, 'get_reg_meaning')
-        tree = ET.parse(cls.DEFINITION_FILE_DIR)
-        root = tree.getroot()
+        def_table = cls.get_def_table(tag_next_level)
         for idx, hqa_q in enumerate(queue_list):
             if hqa_q.is_enabled is False:
                 continue
             if verbose is True:
                 print('qid ', hqa_q.qid)
+            status_dict = hqa_q.status_dict
+            # meanings depend on queue status, so status is part of the key to decoded bits
+            status_key = tuple(sorted(status_dict.items()))
             for hqa_reg_addr, decoded_reg in hqa_q.decoded_reg_dict.items():
                 doc_addr = hqa_reg_addr - hqa_q.addr_offset
-                for reg in root.findall('register'):
-                    if doc_addr == int(reg.find('reg_address').text, 16):
-                        decoded_reg.reg_name = reg.find('reg_name').text
-                        if verbose is True:
-                            print(doc_addr)
-                            print(decoded_reg.reg_name)
-                        reg_bits = reg.find('reg_bits')
-                        if reg_bits is not None:
-                            for reg_bit in reg_bits.findall('reg_bit'):
-                                bit_pos = reg_bit.find('bit_position').text
-                                bit_name = reg_bit.find('bit_name').text
-                                bit_des = reg_bit.find('bit_description')
-                                bit_meaning = ''
-                                if bit_des is not None:
-                                    for p in bit_des:
-                                        flag_save_this_p = True
-                                        if p.attrib:
-                                            for p_key, p_val in p.attrib.items():
-                                                if hqa_q.status_dict[p_key] != p_val:
-                                                    flag_save_this_p = False
-                                                    break
-                                        if flag_save_this_p is True:
-                                            '''
-                                                add '\n' to split lines, this is useful to
-                                                split meanings with 'When set to logic'
-                                            '''
-                                            if p.text is not None:
-                                                bit_meaning = ''.join([bit_meaning, p.text, '\n'])
-                                bit_val, bit_val_str = ut.bit_shift(decoded_reg.reg_val, bit_pos)
-                                if cls.re_logic.search(bit_meaning) is not None:
-                                    bit_meaning = ut.handle_logic_token(bit_val_str, bit_meaning)
-                                if cls.re_hex_token.search(bit_meaning) is not None:
-                                    hex_digit = len(bit_val_str) >> 2
-                                    if (len(bit_val_str) % 4) != 0:
-                                        hex_digit += 1
-                                    hex_format = ''.join(['0x{:0', str(hex_digit), 'x}'])
-                                bit_meaning = cls.re_hex_token.sub(hex_format.format(bit_val), bit_meaning)
-                                bit_meaning = cls.re_dec_token.sub(str(bit_val), bit_meaning)
-                                if verbose is True:
-                                    print(bit_pos)
-                                    print(bit_name)
-                                    print(bit_val_str)
-                                    print(bit_meaning)
-                                decoded_reg.add_bit_des(bit_pos, bit_name, bit_val_str, bit_meaning)
-                hqa_q.decoded_reg_dict[hqa_reg_addr] = decoded_reg
+                if doc_addr not in def_table:
+                    continue
+                reg_name, bit_list = def_table[doc_addr]
+                decoded_reg.reg_name = reg_name
+                if verbose is True:
+                    print(doc_addr)
+                    print(decoded_reg.reg_name)
+                # queues with the same status and reg value share decoded bits
+                memo_key = (doc_addr, decoded_reg.reg_val, status_key)
+                bit_des_dict = ut.decode_memo.get(bit_list, memo_key)
+                if bit_des_dict is None:
+                    bit_des_dict = collections.OrderedDict()
+                    for bit_pos, bit_field, bit_name, p_list in bit_list:
+                        bit_meaning = ''
+                        for attrib_list, text in p_list:
+                            flag_save_this_p = True
+                            for p_key, p_val in attrib_list:
+                                if status_dict[p_key] != p_val:
+                                    flag_save_this_p = False
+                                    break
+                            if flag_save_this_p is True:
+                                '''
+                                    add '\n' to split lines, this is useful to
+                                    split meanings with 'When set to logic'
+                                '''
+                                bit_meaning = ''.join([bit_meaning, text, '\n'])
+                        bit_val, bit_val_str = bit_field.get(decoded_reg.reg_val)
+                        # meaning depends on queue status, compile it once for each status
+                        bit_des_dict[bit_pos] = (bit_name, ut.intern_text(bit_val_str), ut.get_bit_meaning(bit_meaning))
+                    ut.decode_memo.put(bit_list, memo_key, bit_des_dict)
+                decoded_reg.set_shared_bit_des(bit_des_dict)
+                if verbose is True and decoded_reg.has_bit_des is True:
+                    for bit_pos, (bit_name, bit_val_str, bit_meaning) in decoded_reg.bit_dict.items():
+                        print(bit_pos)
+                        print(bit_name)
+                        print(bit_val_str)
+                        print(bit_meaning)
             ut.handle_parse_math_token(tag_next_level, hqa_q.decoded_reg_dict)
             queue_list[idx] = hqa_q
         return queue_list
 
     @classmethod
-    def save_result(cls, tag, queue_list, first_enabled_q, standalone):
+    def save_result(cls, tag, ctx, queue_list, first_enabled_q, standalone, out_fd=None):
         if standalone is True:
-            filename = ut.get_parsed_filename(cls.INPUT_DIR, cls.MODULE, cls.SECTION) + '.html'
-            filename = os.path.join(cls.OUTPUT_DIR, filename)
+            filename = ctx.get_out_filename(cls.MODULE, cls.SECTION)
             fd = open(filename, 'w')
-            fd.write(mhtml.get_hqa_standalone_header(cls.INPUT_DIR, queue_list, first_enabled_q))
+            fd.write(mhtml.get_hqa_standalone_header(ctx.in_file, queue_list, first_enabled_q))
             for queue in queue_list:
                 if queue.is_enabled is True:
-                    # use address in doc when save
-                    for reg_addr in queue.decoded_reg_dict.keys():
-                        queue.decoded_reg_dict[reg_addr].reg_address += cls.HQA_ADDRESS_OFFSET 
                     fd.write(mhtml.get_hqa_tbl_header(queue, first_enabled_q))
                     ut.save_decoded_reg_dict_to_html_table(queue.decoded_reg_dict, fd, True)
                     fd.write(mhtml.get_hqa_tbl_ending())
@@ -268,41 +307,63 @@ class HQALog(cm.MSGULog, cm.HQA_WORD):
             fd.close()
             print(tag + 'result saved in ' + filename)
         else:
-            fd = open(cls.out_filename, 'a')
+            fd = open(ctx.out_filename, 'a') if out_fd is None else out_fd
             fd.write(mhtml.get_hqa_group_header(queue_list, first_enabled_q))
             for queue in queue_list:
                 if queue.is_enabled is True:
-                    # use address in doc when save
-                    for reg_addr in queue.decoded_reg_dict.keys():
-                        queue.decoded_reg_dict[reg_addr].reg_address += cls.HQA_ADDRESS_OFFSET 
                     fd.write(mhtml.get_hqa_tbl_header(queue, first_enabled_q))
-                    ut.save_decoded_reg_dict_to_html_table(queue.decoded_reg_dict, fd, cls.DEBUG_MODE)
+                    ut.save_decoded_reg_dict_to_html_table(queue.decoded_reg_dict, fd, ctx.debug_mode)
                     fd.write(mhtml.get_hqa_tbl_ending())
             fd.write(mhtml.get_hqa_group_ending())
-            fd.close()
+            if out_fd is None:
+                fd.close()
 
-    def run(self, standalone=True):
-        if standalone is True:
-            self.set_input_params()
-        self.set_chipset()
-        self.set_q_range(self.chipset)
-        
-        tag, tag_next_level = ut.get_debug_tags(None, self.MODULE, self.SECTION, 'run')
-        print(tag + 'parser starts')
+    def decode(self, ctx):
+        ''' Decode HQA registers
+            @param ctx: ut.ParseContext
+            @return list of HQA_Q, or None if HQA log is not found
+            @note: reg_address in decoded regs of enabled queues is address in doc
+        '''
+        tag_next_level = ut.get_debug_tags(None, self.MODULE, self.SECTION, 'run')[1]
+        self.set_chipset(ctx)
+        q_range = self.get_q_range(ctx.chipset)
 
-        self.set_int_mode(tag_next_level)
-        reg_list = self.get_reg_val_list(tag_next_level, self.LOG_HEADER, self.LOG_ENDING, self.BYTE_PER_REG)
+        hqa_int_mode = self.get_int_mode(tag_next_level, ctx)
+        reg_list = self.get_reg_val_list(tag_next_level, ctx, self.LOG_HEADER, self.LOG_ENDING, self.BYTE_PER_REG)
         if not reg_list:
-            print(tag + 'parser ends, no log for this section')
-            return False
+            return None
+
+        queue_list = self.init_queues(reg_list, q_range, hqa_int_mode, ctx.debug_mode)
+        if ctx.debug_mode is True:
+            print('first enabled Q is ', self.get_first_enabled_q(queue_list))
+        queue_list = self.get_reg_meaning(tag_next_level, queue_list, ctx.debug_mode)
+        # use address in doc for decoded regs
+        for queue in queue_list:
+            if queue.is_enabled is True:
+                for decoded_reg in queue.decoded_reg_dict.values():
+                    decoded_reg.reg_address += self.HQA_ADDRESS_OFFSET
+        return queue_list
 
-        queue_list = self.init_queues(reg_list, self.DEBUG_MODE)
-        queue_list = self.get_reg_meaning(tag_next_level, queue_list, self.DEBUG_MODE)
+    def save(self, ctx, result, standalone=True, out_fd=None):
+        ''' Save result returned by decode(), see MSGULog.run '''
+        tag_next_level = ut.get_debug_tags(None, self.MODULE, self.SECTION, 'run')[1]
+        self.save_result(tag_next_level, ctx, result, self.get_first_enabled_q(result), standalone, out_fd)
 
-        self.save_result(tag_next_level, queue_list, self.first_enabled_q, standalone)
+    def save_records(self, ctx, result, writer):
+        ''' Write result returned by decode() as records, see MSGULog.run '''
+        for queue in result:
+            writer.write('hqa_queue', section=self.SECTION, qid=queue.qid, mode=queue.q_mode, \
+            queue_type=queue.q_type, enabled=queue.is_enabled, bad=queue.is_bad_q, \
+            raid_hba=queue.status_ib_oper_q_raid_hba, int_num=queue.status_ob_oper_q_int_num, \
+            status=queue.status_dict)
+            if queue.is_enabled is True:
+                ut.save_decoded_reg_dict_to_records(queue.decoded_reg_dict, writer, \
+                section=self.SECTION, qid=queue.qid)
 
-        print(tag + 'parser ends')
-        return True
+# queue config of a chipset, first and last qid of each queue group, and number of regs per queue
+HQAQRange = collections.namedtuple('HQAQRange', ['q_num', \
+'first_ib_admin', 'last_ib_admin', 'first_ib_oper', 'last_ib_oper', \
+'first_ob_admin', 'last_ob_admin', 'first_ob_oper', 'last_ob_oper', 'reg_per_q'])
 
 class HQA_Q(cm.HQA_WORD):
     def __init__(self, qid, q_mode, q_type, addr_offset, hqa_int_mode):
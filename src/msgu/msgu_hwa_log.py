@@ -1,5 +1,6 @@
 import os
 import re
+import collections
 import xml.etree.ElementTree as ET
 import src.msgu.msgu_common as cm
 import src.msgu.msgu_html as mhtml
@@ -11,6 +12,7 @@ class HWALog(cm.MSGULog):
     DEFINITION_FILE_DIR = os.path.join(ut.DumpArgvWorker().INCLUDE_DIR, 'doc', 'msgu', 'MSGU_HWA_REG.xml')
     LOG_HEADER = '# MSGU HWA Registers'
     LOG_ENDING = '# MSGU_HWA - IB IU Context RAM'
+    LOG_MARKER_LIST = [LOG_HEADER, LOG_ENDING]
     # HWA addr 0x0 = MSGU addr 0x2b0000
     HWA_ADDRESS_OFFSET = 0x2b0000
 
@@ -57,6 +59,11 @@ class HWALog(cm.MSGULog):
                         "IB IU Completion response FIFO",
                         "IB IU DMA completion response FIFO"]
     reg_list = []
+    # q_expand token is special for HWA, other sections should not use this token
+    re_q_expand_token = re.compile('@PARSE_([IO]B(IX)?)_Q_EXPAND@')
+    # key is raw bit meaning, value is q_expand token in it or None
+    _q_expand_token_dict = {}
+
     def __init__(self):
         self.FINAL_ADDRESS_OFFSET = self.MSGU_ADDRESS_OFFSET + self.HWA_ADDRESS_OFFSET
     
@@ -83,10 +90,30 @@ class HWALog(cm.MSGULog):
             meaning_ret = ''.join([meaning_ret, fifo_name, ':', meaning, '\n'])
         return meaning_ret
 
+    @classmethod
+    def _get_bit_meaning(cls, reg, bit_pos, bit_val_str):
+        ''' Get compiled meaning of a bit, used as meaning_cb of ut.decode_reg_bits()
+            @param reg: REG.DefReg
+            @param bit_pos: bit position
+            @param bit_val_str: bit value in bin str
+            @return ut.BitMeaning
+        '''
+        raw_bit_meaning = reg.bit_dict[bit_pos][1]
+        try:
+            q_expand_token = cls._q_expand_token_dict[raw_bit_meaning]
+        except KeyError:
+            match = cls.re_q_expand_token.search(raw_bit_meaning)
+            q_expand_token = match.group(0) if match is not None else None
+            cls._q_expand_token_dict[raw_bit_meaning] = q_expand_token
+        if q_expand_token is not None:
+            # meaning depends on each bit, compile it after expanding
+            return ut.get_bit_meaning(cls._handle_parse_q_expand_token(bit_val_str, raw_bit_meaning, q_expand_token))
+        return reg.bit_meaning_dict[bit_pos]
+
     @classmethod
     def _post_spec_reg_handler_3000_3020(cls, decoded_reg, r_access, w_access):
         ''' special hwa register 3000 and 3020 after decoding regs '''
-        bit_name, bit_val, bit_meaning = decoded_reg.bit_dict['3:0']
+        bit_name, bit_val, bit_meaning = decoded_reg.get_bit_des('3:0')
         if r_access is True:
             bit_meaning = re.sub('FW does not have READ.*READ access.', \
             'FW has READ access to inbound free local buffer, HWA does not.', \
@@ -109,7 +136,7 @@ class HWALog(cm.MSGULog):
             block = 'DDR'
         else:
             block = 'N/A'
-        bit_name, bit_val, bit_meaning = decoded_reg.bit_dict['63:32']
+        bit_name, bit_val, bit_meaning = decoded_reg.get_bit_des('63:32')
         bit_meaning = re.sub('this.*block', block, bit_meaning)
         decoded_reg.add_bit_des('63:32', bit_name, bit_val, bit_meaning)
 
@@ -118,15 +145,19 @@ class HWALog(cm.MSGULog):
         ''' special hwa register 3140 after decoding regs '''
         bit_val, bit_val_str = ut.bit_shift(decoded_reg.reg_val, 20)
         if bit_val == 1:
-            bit_name, bit_val, bit_meaning = decoded_reg.bit_dict['15:0']
+            bit_name, bit_val, bit_meaning = decoded_reg.get_bit_des('15:0')
             decoded_reg.add_bit_des('15:0', bit_name, bit_val, \
             "This field is invalid because RD_IB_IU_HDR is set to 1.")
     
     @classmethod
-    def get_def_list(cls):
-        tree = ET.parse(cls.DEFINITION_FILE_DIR)
+    def _build_def_dict(cls, def_file_dir):
+        ''' Build dict of DefReg from def xml file
+            @param def_file_dir: path to def xml file
+            @return reg_dict: dict[reg_addr] = REG.DefReg where reg_addr is addr in HWA doc
+        '''
+        tree = ET.parse(def_file_dir)
         root = tree.getroot()
-        reg_list = []
+        reg_dict = collections.OrderedDict()
         for reg in root.findall('register'):
             reg_name = reg.find('reg_name').text
             reg_addr = reg.find('reg_address').text
@@ -152,9 +183,16 @@ class HWALog(cm.MSGULog):
                     #print(bit_name)
                     #print(bit_meaning)
                     this_reg.add_bit_des(bit_pos, bit_name, bit_meaning)
-            reg_list.append(this_reg)
-        if cls.DEBUG_MODE is True:
-            for reg in reg_list:
+            # same as a linear search, last def wins if an addr is defined twice
+            reg_dict[this_reg.reg_address] = this_reg
+        return reg_dict
+
+    @classmethod
+    def get_def_dict(cls, verbose=False):
+        # parse def xml file only if it is not in def cache
+        reg_dict = ut.DefCache.get(None, 'hwa_def_dict', cls.DEFINITION_FILE_DIR, cls._build_def_dict)
+        if verbose is True:
+            for reg in reg_dict.values():
                 print(hex(reg.reg_address))
                 print(reg.reg_name)
                 if reg.has_bit_des is True:
@@ -162,14 +200,11 @@ class HWALog(cm.MSGULog):
                     for key in bit_dict.keys():
                         print(key)
                         print(bit_dict[key])
-        return reg_list
+        return reg_dict
 
     @classmethod
-    def get_reg_meaning(cls, tag, reg_list, definition_list):
+    def get_reg_meaning(cls, tag, reg_list, definition_dict, verbose=False):
         tag, tag_next_level = ut.get_debug_tags(tag, cls.MODULE, cls.SECTION, 'get_reg_meaning')
-        # q_expand token is special for HWA, other sections should not use this token
-        re_q_expand_token = re.compile('@PARSE_([IO]B(IX)?)_Q_EXPAND@')
-        
         hwa_addr_offset = cls.MSGU_ADDRESS_OFFSET + cls.HWA_ADDRESS_OFFSET
         decoded_reg_dict = {}
         spec_ib_r_access = False
@@ -185,45 +220,28 @@ class HWALog(cm.MSGULog):
             if reg_addr_hwa == 0x3060:
                 # The following bit position defines the parameter
                 # For example bit 20 of 0x3060 is spec_ib_r_access
-                spec_ib_r_access = True if (ut.bit_shift(reg_val, 20)[0] == 1) else False
-                spec_ib_w_access = True if (ut.bit_shift(reg_val, 21)[0] == 1) else False
-                spec_ob_r_access = True if (ut.bit_shift(reg_val, 52)[0] == 1) else False
-                spec_ob_w_access = True if (ut.bit_shift(reg_val, 53)[0] == 1) else False
+                spec_ib_r_access = True if (ut.get_bit_field(20).extract(reg_val) == 1) else False
+                spec_ib_w_access = True if (ut.get_bit_field(21).extract(reg_val) == 1) else False
+                spec_ob_r_access = True if (ut.get_bit_field(52).extract(reg_val) == 1) else False
+                spec_ob_w_access = True if (ut.get_bit_field(53).extract(reg_val) == 1) else False
 
             # normal handle regs
-            for reg in definition_list:
-                if reg.reg_address == reg_addr_hwa:
-                    # store decoded address as addr in PD document: cpu_addr - MSGU_ADDRESS_OFFSET.
-                    decoded_reg = REG.DecodedReg(reg_addr - cls.MSGU_ADDRESS_OFFSET, reg.reg_name, reg_val)
-                    if cls.DEBUG_MODE is True:
-                        print(hex(decoded_reg.reg_address))
-                        print(decoded_reg.reg_name)
-
-                    if reg.has_bit_des is True:
-                        for bit_pos in reg.bit_dict.keys():
-                            bit_name, raw_bit_meaning = reg.bit_dict[bit_pos]
-                            bit_val, bit_val_str = ut.bit_shift(reg_val, bit_pos)
-                            bit_meaning = raw_bit_meaning
-                            match = re_q_expand_token.search(bit_meaning)
-                            if match is not None:
-                                bit_meaning = cls._handle_parse_q_expand_token(bit_val_str, bit_meaning, match.group(0))
+            reg = definition_dict.get(reg_addr_hwa)
+            if reg is not None:
+                # store decoded address as addr in PD document: cpu_addr - MSGU_ADDRESS_OFFSET.
+                decoded_reg = REG.DecodedReg(reg_addr - cls.MSGU_ADDRESS_OFFSET, reg.reg_name, reg_val)
+                if verbose is True:
+                    print(hex(decoded_reg.reg_address))
+                    print(decoded_reg.reg_name)
 
-                            if cls.re_logic.search(bit_meaning) is not None:
-                                bit_meaning = ut.handle_logic_token(bit_val_str, bit_meaning)
-                            if cls.re_hex_token.search(bit_meaning) is not None:
-                                hex_digit = len(bit_val_str) >> 2
-                                if (len(bit_val_str) % 4) != 0:
-                                    hex_digit += 1
-                                hex_format = ''.join(['0x{:0', str(hex_digit), 'x}'])
-                                bit_meaning = cls.re_hex_token.sub(hex_format.format(bit_val), bit_meaning)
-                            bit_meaning = cls.re_dec_token.sub(str(bit_val), bit_meaning)
-                            if cls.DEBUG_MODE is True:
-                                print(bit_pos)
-                                print(bit_val_str)
-                                print(bit_meaning)
-                            # add bit_val_str instead of bit_val
-                            decoded_reg.add_bit_des(bit_pos, bit_name, bit_val_str, bit_meaning)
-                    decoded_reg_dict[decoded_reg.reg_address] = decoded_reg
+                if reg.has_bit_des is True:
+                    decoded_reg.set_shared_bit_des(ut.decode_reg_bits(reg, reg_val, cls._get_bit_meaning))
+                    if verbose is True:
+                        for bit_pos, (bit_name, bit_val_str, bit_meaning) in decoded_reg.bit_dict.items():
+                            print(bit_pos)
+                            print(bit_val_str)
+                            print(bit_meaning)
+                decoded_reg_dict[decoded_reg.reg_address] = decoded_reg
 
         # post handle special regs and change the meaning with the one defined in handler.
         # refer to [LINK]
@@ -254,41 +272,45 @@ class HWALog(cm.MSGULog):
         return decoded_reg_dict
 
     @classmethod
-    def save_result(cls, tag, decoded_reg_dict, standalone):
+    def save_result(cls, tag, ctx, decoded_reg_dict, standalone, out_fd=None):
         if standalone is True:
-            filename = ut.get_parsed_filename(cls.INPUT_DIR, cls.MODULE, cls.SECTION) + '.html'
-            filename = os.path.join(cls.OUTPUT_DIR, filename)
+            filename = ctx.get_out_filename(cls.MODULE, cls.SECTION)
             fd = open(filename, 'w')
-            fd.write(mhtml.get_hwa_standalone_header(cls.INPUT_DIR))
+            fd.write(mhtml.get_hwa_standalone_header(ctx.in_file))
             ut.save_decoded_reg_dict_to_html_table(decoded_reg_dict, fd, True)
             fd.write(mhtml.get_hwa_standalone_ending())
             fd.close()
             print(tag + 'result saved in ' + filename)
         else:
-            fd = open(cls.out_filename, 'a')
+            fd = open(ctx.out_filename, 'a') if out_fd is None else out_fd
             fd.write(mhtml.get_hwa_group_header())
-            ut.save_decoded_reg_dict_to_html_table(decoded_reg_dict, fd, cls.DEBUG_MODE)
+            ut.save_decoded_reg_dict_to_html_table(decoded_reg_dict, fd, ctx.debug_mode)
             fd.write(mhtml.get_hwa_group_ending())
-            fd.close()
+            if out_fd is None:
+                fd.close()
 
-    def run(self, standalone=True):
-        if standalone is True:
-            self.set_input_params()
-        tag, tag_next_level = ut.get_debug_tags(None, self.MODULE, self.SECTION, 'run')
-
-        print(tag + 'parser starts')
-        reg_list = self.get_reg_val_list(tag_next_level, self.LOG_HEADER, self.LOG_ENDING, self.BYTE_PER_REG)
+    def decode(self, ctx):
+        ''' Decode HWA registers
+            @param ctx: ut.ParseContext
+            @return dict[reg_addr] = REG.DecodedReg, or None if HWA log is not found
+        '''
+        tag_next_level = ut.get_debug_tags(None, self.MODULE, self.SECTION, 'run')[1]
+        reg_list = self.get_reg_val_list(tag_next_level, ctx, self.LOG_HEADER, self.LOG_ENDING, self.BYTE_PER_REG)
         if not reg_list:
-            print(tag + 'parser ends, no log for this section')
-            return False
+            return None
+
+        definition_reg_dict = self.get_def_dict(ctx.debug_mode)
 
-        definition_reg_list = self.get_def_list()
+        return self.get_reg_meaning(tag_next_level, reg_list, definition_reg_dict, ctx.debug_mode)
 
-        decoded_reg_dict = self.get_reg_meaning(tag_next_level, reg_list, definition_reg_list)
-        self.save_result(tag_next_level, decoded_reg_dict, standalone)
+    def save(self, ctx, result, standalone=True, out_fd=None):
+        ''' Save result returned by decode(), see MSGULog.run '''
+        tag_next_level = ut.get_debug_tags(None, self.MODULE, self.SECTION, 'run')[1]
+        self.save_result(tag_next_level, ctx, result, standalone, out_fd)
 
-        print(tag + 'parser ends')
-        return True
+    def save_records(self, ctx, result, writer):
+        ''' Write result returned by decode() as records, see MSGULog.run '''
+        ut.save_decoded_reg_dict_to_records(result, writer, section=self.SECTION)
 
 # if entry point is this script, then run this script independently from other parsers.
 if __name__ == '__main__':
@@ -62,11 +62,16 @@ class LBALBBLog(cm.MSGULog):
     LBB_LOG_HEADER = '# LBB Memory'
     LBB_LOG_ENDING = '# MSGU HWA Registers'
     LBB_ADDRESS_OFFSET = 0xbf668000
+    LOG_MARKER_LIST = [LBA_LOG_HEADER, LBA_LOG_ENDING, LBB_LOG_HEADER, LBB_LOG_ENDING]
     
     @classmethod
-    def get_def_iu_dict(cls, tag, def_file_dir, verbose=False):
-        tag, tag_next_level = ut.get_debug_tags(None, cls.MODULE, cls.SECTION, 'get_def_list')
-        lines = ut.get_data_from_file(tag_next_level, def_file_dir)
+    def _build_def_iu_dict(cls, tag, def_file_dir):
+        ''' Build dict of DefIU from def file
+            @param tag: tag from caller
+            @param def_file_dir: path to def file
+            @return def_iu_dict: dict[iu_code] = IU.DefIU
+        '''
+        lines = ut.get_data_from_file(tag, def_file_dir)
         ''' Header in def file
             Example: [HBA_IU_TYPE_SCSI_TM_REQ, 0x16] '''
         re_iu_cfg = re.compile('\[([A-Z0-9_]+),(\s)?(0[xX])([0-9a-f]+)\]')
@@ -119,6 +124,14 @@ class LBALBBLog(cm.MSGULog):
             def_iu_dict[this_iu.iu_code] = this_iu
             del this_iu
             flag_add_iu_to_dict = False
+        return def_iu_dict
+
+    @classmethod
+    def get_def_iu_dict(cls, tag, def_file_dir, verbose=False):
+        tag, tag_next_level = ut.get_debug_tags(None, cls.MODULE, cls.SECTION, 'get_def_list')
+        # parse def file only if it is not in def cache
+        def_iu_dict = ut.DefCache.get(tag_next_level, 'lba_lbb_def_iu_dict', def_file_dir, \
+        lambda filename: cls._build_def_iu_dict(tag_next_level, filename))
 
         # print out all ius in iu dict if verbose is enabled
         if verbose is True:
@@ -147,12 +160,13 @@ class LBALBBLog(cm.MSGULog):
             # with function code 0x3c
             reg = iu.reg_dict[sgl_des_reg_addr]
             if reg.has_bit_des is True:
-                for bit_pos in reg.bit_dict:
-                    bit_name, bit_val, bit_meaning = reg.bit_dict[bit_pos]
+                bit_dict = reg.bit_dict
+                for bit_pos in bit_dict:
+                    bit_name, bit_val, bit_meaning = bit_dict[bit_pos]
                     if 'When set to logic:' in bit_meaning \
                     and 'SGL type is' in bit_meaning:
                         bit_meaning = 'Reserved'
-                        reg.bit_dict[bit_pos] = [bit_name, bit_val, bit_meaning]
+                        reg.add_bit_des(bit_pos, bit_name, bit_val, bit_meaning)
                         break
         except KeyError:
             print('special_handler_admin_iu_func_code_0x00: Warning, register 0x{:02x} not found'.format(sgl_des_reg_addr))
@@ -175,7 +189,7 @@ class LBALBBLog(cm.MSGULog):
             reg_addr -= addr_offset
             if reg_addr == start_addr:
                 flag_start_list = True
-                total_length = ut.bit_shift(reg_val, '31:16')[0] + common_iu_header_length_in_byte
+                total_length = ut.get_bit_field('31:16').extract(reg_val) + common_iu_header_length_in_byte
             if flag_start_list is True:
                 # useful_reg_idx_offset defines offset for
                 # registers actually used in an IU buffer
@@ -229,7 +243,7 @@ class LBALBBLog(cm.MSGULog):
                 start_addr += iu_buf_size
                 continue
             elif reg_addr == start_addr:
-                length = ut.bit_shift(reg_val, '31:16')[0]
+                length = ut.get_bit_field('31:16').extract(reg_val)
                 # Rewrite this if statement once spanning is fixed in log and uses the full buffer size
                 if length > iu_spanning_threshold:
                     list_of_ius.append(cls.special_reg_list_handler_spanning_iu(tag_next_level, start_addr, addr_offset, reg_list))
@@ -290,8 +304,8 @@ class LBALBBLog(cm.MSGULog):
         if not reg_list_for_iu:
             return []
         first_reg_val = reg_list_for_iu[0][1]
-        iu_code = ut.bit_shift(first_reg_val, '7:0')[0]
-        iu_length = ut.bit_shift(first_reg_val, '32:16')[0]
+        iu_code = ut.get_bit_field('7:0').extract(first_reg_val)
+        iu_length = ut.get_bit_field('32:16').extract(first_reg_val)
 
         if iu_code in cls.AIO_IU_LIST:
             return cls.decode_aio_iu(tag_next_level, iu_code, iu_length, reg_list_for_iu, def_iu_dict)
@@ -318,20 +332,7 @@ class LBALBBLog(cm.MSGULog):
                     if iu_def_reg.has_bit_des is True:
                         # only add reg if it has bit des
                         decoded_reg = IU.DecodedReg(reg_addr, 'N/A', reg_val)
-                        for bit_pos in iu_def_reg.bit_dict.keys():
-                            bit_name, raw_bit_meaning = iu_def_reg.bit_dict[bit_pos]
-                            bit_val, bit_val_str = ut.bit_shift(reg_val, bit_pos)
-                            bit_meaning = raw_bit_meaning
-                            if cls.re_logic.search(bit_meaning) is not None:
-                                bit_meaning = ut.handle_logic_token(bit_val_str, bit_meaning)
-                            if cls.re_hex_token.search(bit_meaning) is not None:
-                                hex_digit = len(bit_val_str) >> 2
-                                if (len(bit_val_str) % 4) != 0:
-                                    hex_digit += 1
-                                hex_format = ''.join(['0x{:0', str(hex_digit), 'x}'])
-                                bit_meaning = cls.re_hex_token.sub(hex_format.format(bit_val), bit_meaning)
-                            bit_meaning = cls.re_dec_token.sub(str(bit_val), bit_meaning)
-                            decoded_reg.add_bit_des(bit_pos, bit_name, bit_val_str, bit_meaning)
+                        decoded_reg.set_shared_bit_des(ut.decode_reg_bits(iu_def_reg, reg_val))
                         decoded_reg_dict[decoded_reg.reg_address] = decoded_reg
             ut.handle_parse_math_token(tag_next_level, decoded_reg_dict)
             # after decoding all meanings for this iu, create a new decoded iu object and return it
@@ -350,7 +351,7 @@ class LBALBBLog(cm.MSGULog):
         # the function code is stored at 3rd 32-bit field, position '23:16'
         if len(reg_list_for_iu) >= 3:
             func_code_val = reg_list_for_iu[2][1]
-            func_code = ut.bit_shift(func_code_val, '23:16')[0]
+            func_code = ut.get_bit_field('23:16').extract(func_code_val)
             iu_func_part = cls.decode_normal_iu(tag_next_level, func_code, iu_length, reg_list_for_iu, admin_func_code_dict)
             # this special function code contains a bit meaning that can not easily
             # handled by common decoding function, use a special function to
@@ -527,7 +528,8 @@ class LBALBBLog(cm.MSGULog):
                 if reg.has_bit_des is True:
                     expected_bit_pos = 0
                     new_bit_list = []
-                    for bit_pos in reg.bit_dict.keys():
+                    bit_dict = reg.bit_dict
+                    for bit_pos in bit_dict.keys():
                         if ':' in bit_pos:
                             hi, low = bit_pos.split(':')
                             hi = int(hi)
@@ -568,7 +570,7 @@ class LBALBBLog(cm.MSGULog):
                         # high bit position, because between low and high bit are meaning
                         # for current bit field
                         expected_bit_pos = hi + 1
-                        bit_name, bit_val, bit_meaning = reg.bit_dict[bit_pos]
+                        bit_name, bit_val, bit_meaning = bit_dict[bit_pos]
                         new_bit_list.append([bit_pos, bit_name, bit_val, bit_meaning])
                     # once we loop over all bit fields, if expected_bit_pos is still
                     # less than max_bit_per_reg, then fill the remaing bits with dummy staff
@@ -752,8 +754,9 @@ class LBALBBLog(cm.MSGULog):
         for reg_addr in sorted(iu.reg_dict.keys()):
             reg = iu.reg_dict[reg_addr]
             if reg.has_bit_des is True:
-                for bit_pos in reg.bit_dict.keys():
-                    bit_name, bit_val, bit_meaning = reg.bit_dict[bit_pos]
+                bit_dict = reg.bit_dict
+                for bit_pos in bit_dict.keys():
+                    bit_name, bit_val, bit_meaning = bit_dict[bit_pos]
                     bit_val_hex = hex(int(bit_val, 2))
                     bit_val = ut.add_mark_to_word(bit_val, '_', 4)
                     str_write = '    <p style="font-size:14px;color:#679c3e"><b>%s [%s] %s: %s</b></p>\n' % \
@@ -762,14 +765,13 @@ class LBALBBLog(cm.MSGULog):
         fd.write('</div>\n</div>\n')
 
     @classmethod
-    def save_result(cls, tag, lba_decoded_iu_list, lbb_decoded_iu_list, standalone):
+    def save_result(cls, tag, ctx, lba_decoded_iu_list, lbb_decoded_iu_list, standalone, out_fd=None):
         if standalone is True:
-            filename = ut.get_parsed_filename(cls.INPUT_DIR, cls.MODULE, cls.SECTION) + '.html'
-            filename = os.path.join(cls.OUTPUT_DIR, filename)
+            filename = ctx.get_out_filename(cls.MODULE, cls.SECTION)
             fd = open(filename, 'w')
-            fd.write(mhtml.get_lba_lbb_standalone_header(cls.INPUT_DIR))
+            fd.write(mhtml.get_lba_lbb_standalone_header(ctx.in_file))
         else:
-            fd = open(cls.out_filename, 'a')
+            fd = open(ctx.out_filename, 'a') if out_fd is None else out_fd
             fd.write(mhtml.get_lba_lbb_group_header())
         
         iu_count = 0
@@ -799,42 +801,58 @@ class LBALBBLog(cm.MSGULog):
             print(tag + 'result saved in ' + filename)
         else:
             fd.write(mhtml.get_lba_lbb_group_ending())
-            fd.close()
-
-    def run(self, standalone=True):
-        if standalone is True:
-            self.set_input_params()
-        tag, tag_next_level = ut.get_debug_tags(None, self.MODULE, self.SECTION, 'run')
-
-        print(tag + 'parser starts')
+            if out_fd is None:
+                fd.close()
+
+    def decode(self, ctx):
+        ''' Decode LBA and LBB IUs
+            @param ctx: ut.ParseContext
+            @return tuple of [lba_decoded_iu_list, lbb_decoded_iu_list], where each one is
+                    list of REG.DecodedIU, or None if neither LBA nor LBB log is found
+        '''
+        tag_next_level = ut.get_debug_tags(None, self.MODULE, self.SECTION, 'run')[1]
+        lba_decoded_iu_list = []
+        lbb_decoded_iu_list = []
 
         # LBA section
-        lba_reg_list = self.get_reg_val_list(tag_next_level, self.LBA_LOG_HEADER, self.LBA_LOG_ENDING, self.BYTE_PER_REG)
-        if not lba_reg_list:
-            pass
-        else:
-            lba_def_iu_dict = self.get_def_iu_dict(tag_next_level, self.LBA_DEFINITION_IU_DIR, self.DEBUG_MODE)
-            lba_admin_func_code_dict = self.get_def_iu_dict(tag_next_level, self.LBA_DEFINITION_FUNC_DIR, self.DEBUG_MODE)
+        lba_reg_list = self.get_reg_val_list(tag_next_level, ctx, self.LBA_LOG_HEADER, self.LBA_LOG_ENDING, self.BYTE_PER_REG)
+        if lba_reg_list:
+            lba_def_iu_dict = self.get_def_iu_dict(tag_next_level, self.LBA_DEFINITION_IU_DIR, ctx.debug_mode)
+            lba_admin_func_code_dict = self.get_def_iu_dict(tag_next_level, self.LBA_DEFINITION_FUNC_DIR, ctx.debug_mode)
             lba_decoded_iu_list = self.get_reg_meaning(tag_next_level, lba_reg_list, self.LBA_ADDRESS_OFFSET, \
-            lba_def_iu_dict, lba_admin_func_code_dict, self.DEBUG_MODE)
+            lba_def_iu_dict, lba_admin_func_code_dict, ctx.debug_mode)
         
         # LBB section
-        lbb_reg_list = self.get_reg_val_list(tag_next_level, self.LBB_LOG_HEADER, self.LBB_LOG_ENDING, self.BYTE_PER_REG)
+        lbb_reg_list = self.get_reg_val_list(tag_next_level, ctx, self.LBB_LOG_HEADER, self.LBB_LOG_ENDING, self.BYTE_PER_REG)
         if not lbb_reg_list and not lba_reg_list:
-            print(tag + 'parser ends, no log for this section')
-            return False
-        elif not lbb_reg_list:
-            pass
-        else:
-            lbb_def_iu_dict = self.get_def_iu_dict(tag_next_level, self.LBB_DEFINITION_IU_DIR, self.DEBUG_MODE)
+            return None
+        if lbb_reg_list:
+            lbb_def_iu_dict = self.get_def_iu_dict(tag_next_level, self.LBB_DEFINITION_IU_DIR, ctx.debug_mode)
             lbb_decoded_iu_list = self.get_reg_meaning(tag_next_level, lbb_reg_list, self.LBB_ADDRESS_OFFSET, \
-            lbb_def_iu_dict, None, self.DEBUG_MODE)
-
-        # save both LBA and LBB result
-        self.save_result(tag_next_level, lba_decoded_iu_list, lbb_decoded_iu_list, standalone)
-
-        print(tag + 'parser ends')
-        return True
+            lbb_def_iu_dict, None, ctx.debug_mode)
+        return lba_decoded_iu_list, lbb_decoded_iu_list
+
+    def save(self, ctx, result, standalone=True, out_fd=None):
+        ''' Save result returned by decode(), see MSGULog.run '''
+        tag_next_level = ut.get_debug_tags(None, self.MODULE, self.SECTION, 'run')[1]
+        lba_decoded_iu_list, lbb_decoded_iu_list = result
+        self.save_result(tag_next_level, ctx, lba_decoded_iu_list, lbb_decoded_iu_list, standalone, out_fd)
+
+    def save_records(self, ctx, result, writer):
+        ''' Write result returned by decode() as records, see MSGULog.run '''
+        lba_decoded_iu_list, lbb_decoded_iu_list = result
+        for buf, addr_offset, iu_list in [['lba', self.LBA_ADDRESS_OFFSET, lba_decoded_iu_list], \
+        ['lbb', self.LBB_ADDRESS_OFFSET, lbb_decoded_iu_list]]:
+            for iu_idx, iu in enumerate(iu_list):
+                writer.write('iu', section=self.SECTION, buffer=buf, iu=iu_idx, name=iu.iu_name, \
+                code=iu.iu_code, length=iu.iu_length, \
+                raw=[[reg_addr + addr_offset, reg_val] for reg_addr, reg_val in iu.raw_reg_list])
+                if iu.reg_dict is not None:
+                    ut.save_decoded_reg_dict_to_records(iu.reg_dict, writer, \
+                    section=self.SECTION, buffer=buf, iu=iu_idx)
+                for sgl_idx, (addr_lo, addr_hi, length, ctrl) in enumerate(iu.sgl_list):
+                    writer.write('sgl', section=self.SECTION, buffer=buf, iu=iu_idx, sgl=sgl_idx, \
+                    addr_lo=addr_lo, addr_hi=addr_hi, length=length, ctrl=ctrl)
 
 # if entry point is this script, then run this script independently from other parsers.
 if __name__ == '__main__':
@@ -1,39 +1,486 @@
 import os
+import sys
+import time
+import collections
+import multiprocessing
 from src.msgu import *
 from ..shared import dutil as ut
 
-def run():
+def _get_logs():
+    ''' @return list of all MSGU parsers, result of each parser is saved in this order '''
+    logs = []
+    logs.append(msgu_fw_log.FWLog())
+    logs.append(msgu_hwa_log.HWALog())
+    logs.append(msgu_hqa_log.HQALog())
+    logs.append(msgu_lba_lbb_log.LBALBBLog())
+    return logs
+
+# key to select a section, in the same order as parsers in _get_logs()
+SECTION_KEY_LIST = ['fw', 'hwa', 'hqa', 'lba_lbb']
+
+def _select_logs(section_list=None):
+    ''' @param section_list: optional, list of keys in SECTION_KEY_LIST, select all parsers if None
+        @return list of [section_key, parser], in the same order as _get_logs()
+    '''
+    if section_list is not None:
+        for section in section_list:
+            if section not in SECTION_KEY_LIST:
+                raise ValueError('Unknown MSGU section [{}], valid sections are {}'.format(section, SECTION_KEY_LIST))
+    return [[section, log_module] for section, log_module in zip(SECTION_KEY_LIST, _get_logs()) \
+    if section_list is None or section in section_list]
+
+def preload(workspace='', sections=None):
+    ''' Load MSGU definitions, definitions are cached after loading
+        @param workspace: optional, path to BC workspace for FW log header file
+        @param sections: optional, list of keys in SECTION_KEY_LIST, load all sections if None
+    '''
+    tag = ut.get_debug_tags(None, msgu_common.MSGULog.MODULE, None, 'preload')[1]
+    section_list = [section for section, log_module in _select_logs(sections)]
+    if 'fw' in section_list:
+        msgu_fw_log.FWLog.get_def_list(tag, workspace)
+    if 'hwa' in section_list:
+        msgu_hwa_log.HWALog.get_def_dict()
+    if 'hqa' in section_list:
+        msgu_hqa_log.HQALog.get_def_table(tag)
+    if 'lba_lbb' in section_list:
+        lba_lbb = msgu_lba_lbb_log.LBALBBLog
+        for def_file_dir in [lba_lbb.LBA_DEFINITION_IU_DIR, lba_lbb.LBA_DEFINITION_FUNC_DIR, lba_lbb.LBB_DEFINITION_IU_DIR]:
+            lba_lbb.get_def_iu_dict(tag, def_file_dir)
+
+def _decode_section(args):
+    ''' Decode one MSGU section in a worker process
+        @param args: tuple of [section_idx, in_file, out_dir, debug_mode, workspace, out_format, out_name],
+                     where section_idx is index of the parser in _get_logs()
+        @return tuple of [found_log_flag, fragment], where fragment is result in str, records are
+                in ndjson format if out_format is not html, fragment is empty for html in debug mode
+                since result is saved in its own file
+    '''
+    section_idx, in_file, out_dir, debug_mode, workspace, out_format, out_name = args
+    ctx = msgu_common.MSGULog.new_context(in_file, out_dir, debug_mode, workspace, out_name)
+    log_module = _get_logs()[section_idx]
+    if out_format != ut.FORMAT_HTML:
+        fragment = ut.FragmentFile()
+        found_log_flag = log_module.run(ctx, writer=ut.RecordWriter(fragment, ut.FORMAT_NDJSON, dump=in_file))
+        ctx.close()
+        return found_log_flag, fragment.getvalue()
+    if debug_mode:
+        found_log_flag = log_module.run(ctx, True)
+        ctx.close()
+        return found_log_flag, ''
+    fragment = ut.FragmentFile()
+    found_log_flag = log_module.run(ctx, False, fragment)
+    ctx.close()
+    return found_log_flag, fragment.getvalue()
+
+def decode(in_file, out_dir, debug_mode=False, workspace='', jobs=1, sections=None, out_format=ut.FORMAT_HTML, \
+sqlite_db=None, out_name=None):
+    ''' Decode all MSGU sections in a dump file and save the result
+        @param in_file: path to input dump file
+        @param out_dir: path to output dir
+        @param debug_mode: optional, save each section in its own html file if True
+        @param workspace: optional, path to BC workspace
+        @param jobs: optional, number of processes to decode sections in parallel,
+                     decode sections one by one in this process if jobs is 1
+        @param sections: optional, list of keys in SECTION_KEY_LIST, decode all sections if None
+        @param out_format: optional, one of ut.FORMAT_LIST, records of all sections are saved
+                           in one file if format is not html
+        @param sqlite_db: optional, path to SQLite database, records of all sections are saved
+                          in this database instead of files if given
+        @param out_name: optional, name of the dump used in output filenames, see ut.ParseContext
+        @return tuple of [found_log_flag, section_found_list, out_path], where section_found_list
+                is list of [section, found_flag], out_path is path to result file, output dir
+                if each section is saved in its own file, SQLite database, or None if nothing is saved
+    '''
     found_log_flag = False
+    section_found_list = []
+
+    ctx = msgu_common.MSGULog.new_context(in_file, out_dir, debug_mode, workspace, out_name)
 
-    msgu_common.MSGULog().set_input_params()
-    out_filename = ut.get_parsed_filename(msgu_common.MSGULog().INPUT_DIR, msgu_common.MSGULog().MODULE) + '.html'
-    out_filename = os.path.join(msgu_common.MSGULog().OUTPUT_DIR, out_filename)
+    logs = [log_module for section, log_module in _select_logs(sections)]
 
-    if msgu_common.MSGULog().DEBUG_MODE:
+    writer = None
+    fd = None
+    if sqlite_db is not None:
+        standalone = False
+        # workers send records in ndjson
+        out_format = ut.FORMAT_NDJSON
+        ctx.out_filename = sqlite_db
+        writer = ut.SqliteWriter(sqlite_db, msgu_common.MSGULog.MODULE, ctx.in_file)
+    elif out_format != ut.FORMAT_HTML:
+        standalone = False
+        ctx.out_filename = ctx.get_out_filename(msgu_common.MSGULog.MODULE, None, '.' + out_format)
+        fd = open(ctx.out_filename, 'w')
+        writer = ut.RecordWriter(fd, out_format, dump=ctx.in_file)
+    elif ctx.debug_mode:
         standalone = True
     else:
         standalone = False
-        with open(out_filename, 'w') as fd:
-            fd.write(msgu_html.get_top_level_header(msgu_common.MSGULog().INPUT_DIR))
+        fd = open(ctx.out_filename, 'w')
+        fd.write(msgu_html.get_top_level_header(ctx.in_file))
 
-    logs = []
-    logs.append(msgu_fw_log.FWLog())
-    logs.append(msgu_hwa_log.HWALog())
-    logs.append(msgu_hqa_log.HQALog())
-    logs.append(msgu_lba_lbb_log.LBALBBLog())
     print('======================================')
-    for log_module in logs:
-        if log_module.run(standalone):
-            found_log_flag = True
+    if jobs > 1 and len(logs) > 1:
+        # each section is decoded into a fragment by a worker,
+        # fragments are saved in the same order as sequential decoding
+        pool = multiprocessing.Pool(min(jobs, len(logs)))
+        try:
+            result_list = pool.map(_decode_section, \
+            [(SECTION_KEY_LIST.index(section), in_file, out_dir, debug_mode, workspace, out_format, out_name) \
+            for section, log_module in _select_logs(sections)], 1)
+        finally:
+            pool.close()
+            pool.join()
+        for log_module, (this_found_flag, fragment) in zip(logs, result_list):
+            if writer is not None:
+                writer.write_fragment(fragment)
+            elif fd is not None:
+                fd.write(fragment)
+            section_found_list.append([log_module.SECTION, this_found_flag])
+            if this_found_flag:
+                found_log_flag = True
         print('======================================')
+    else:
+        # scan input file once, all parsers read their sections from this index
+        marker_list = []
+        for log_module in logs:
+            marker_list.extend(log_module.LOG_MARKER_LIST)
+        msgu_common.MSGULog.set_dump_index(ctx, marker_list)
+        for log_module in logs:
+            this_found_flag = log_module.run(ctx, standalone, fd, writer)
+            section_found_list.append([log_module.SECTION, this_found_flag])
+            if this_found_flag:
+                found_log_flag = True
+            print('======================================')
+        ctx.close()
 
+    out_path = None
     if found_log_flag:
+        out_path = ctx.out_dir if standalone else ctx.out_filename
         if not standalone:
-            with open(out_filename, 'a') as fd:
+            if writer is not None:
+                writer.close()
+            else:
                 fd.write(msgu_html.get_top_level_ending())
-            print('result is saved in ' + out_filename)
+            if fd is not None:
+                fd.close()
+            print('result is saved in ' + ctx.out_filename)
             print('======================================')
     else:
-        if not standalone:
-            os.remove(out_filename)
-    return found_log_flag
+        if fd is not None:
+            fd.close()
+            os.remove(ctx.out_filename)
+        elif writer is not None:
+            # dump is still recorded in database
+            writer.close()
+            out_path = sqlite_db
+    return found_log_flag, section_found_list, out_path
+
+def decode_msgu(source, sections=None, output=None, workspace='', debug_mode=False, output_format=ut.FORMAT_HTML, \
+sqlite_db=None, def_cache=True):
+    ''' Decode MSGU register dump without reading sys argv. Result is not saved in files,
+        but parsed definitions are cached on disk(see ut.DefCache) unless def_cache is False
+        @param source: path to dump file, dump content in bytes, or a file-like object
+        @param sections: optional, list of keys in SECTION_KEY_LIST, decode all sections if None
+        @param output: optional, file-like object to write result to
+        @param workspace: optional, path to BC workspace for FW log header file
+        @param debug_mode: optional, True to print out addition log
+        @param output_format: optional, format of result written to output, one of ut.FORMAT_LIST
+        @param sqlite_db: optional, path to SQLite database to save records to, output is not used if given
+        @param def_cache: optional, False to not read or write definition cache files in this call
+        @return OrderedDict, key is section key, value is result returned by decode() of that parser,
+                or None if that section is not found in dump
+    '''
+    previous_def_cache = ut.DefCache.set_enable(ut.DefCache.ENABLE and def_cache)
+    try:
+        return _decode_msgu(source, sections, output, workspace, debug_mode, output_format, sqlite_db)
+    finally:
+        ut.DefCache.set_enable(previous_def_cache)
+
+def _decode_msgu(source, sections, output, workspace, debug_mode, output_format, sqlite_db):
+    ''' Decode MSGU register dump, see decode_msgu '''
+    in_file, data = ut.read_dump_source(source)
+    ctx = msgu_common.MSGULog.new_context(in_file, '', debug_mode, workspace)
+    ctx.data = data
+    logs = _select_logs(sections)
+
+    # scan input once for all selected sections
+    marker_list = []
+    for section, log_module in logs:
+        marker_list.extend(log_module.LOG_MARKER_LIST)
+    msgu_common.MSGULog.set_dump_index(ctx, marker_list)
+
+    writer = None
+    if sqlite_db is not None:
+        output = None
+        writer = ut.SqliteWriter(sqlite_db, msgu_common.MSGULog.MODULE, ctx.in_file)
+    elif output is not None:
+        if output_format != ut.FORMAT_HTML:
+            writer = ut.RecordWriter(output, output_format, dump=ctx.in_file)
+        else:
+            output.write(msgu_html.get_top_level_header(ctx.in_file))
+    section_result_dict = collections.OrderedDict()
+    try:
+        for section, log_module in logs:
+            result = log_module.decode(ctx)
+            if result is not None:
+                if writer is not None:
+                    log_module.save_records(ctx, result, writer)
+                elif output is not None:
+                    log_module.save(ctx, result, False, output)
+            section_result_dict[section] = result
+    finally:
+        ctx.close()
+    if writer is not None:
+        writer.close()
+    elif output is not None:
+        output.write(msgu_html.get_top_level_ending())
+    return section_result_dict
+
+class MSGUFollower(object):
+    ''' Decode MSGU sections in a growing dump file.
+        FW log entries are decoded and appended to FW log file as they arrive,
+        other sections are decoded and saved in their own files once they are complete.
+        If format is not html, all of them are appended to one records file instead.
+        Only lines appended since last poll are read.
+    '''
+    def __init__(self, in_file, out_dir, debug_mode=False, workspace='', sections=None, out_format=ut.FORMAT_HTML, \
+    sqlite_db=None):
+        ''' @param in_file: path to input dump file
+            @param out_dir: path to output dir
+            @param debug_mode: optional, True to enable additional log
+            @param workspace: optional, path to BC workspace
+            @param sections: optional, list of keys in SECTION_KEY_LIST, follow all sections if None
+            @param out_format: optional, one of ut.FORMAT_LIST
+            @param sqlite_db: optional, path to SQLite database, records are saved in this database
+                              instead of files if given, records read in a poll are saved in one transaction
+        '''
+        self.in_file = in_file
+        self.out_dir = out_dir
+        self.debug_mode = debug_mode
+        self.workspace = workspace
+        self.reader = ut.DumpFollower(None, in_file)
+        self.fw_log = None
+        # list of [parser, pair_list, open_dict, done_dict] for sections other than FW log,
+        # pair_list is list of [header, ending], open_dict[header] = byte offset of header,
+        # done_dict[header] = [start, end] byte offsets of a completed section
+        self.state_list = []
+        for section, log_module in _select_logs(sections):
+            if isinstance(log_module, msgu_fw_log.FWLog):
+                self.fw_log = log_module
+            else:
+                marker_list = log_module.LOG_MARKER_LIST
+                pair_list = [marker_list[idx:idx + 2] for idx in range(0, len(marker_list), 2)]
+                self.state_list.append([log_module, pair_list, {}, {}])
+        # fd to FW log file, opened when FW log is found
+        self.fw_fd = None
+        # fd to records file and ut.RecordWriter on it, None if format is html
+        self.record_fd = None
+        self.writer = None
+        if sqlite_db is not None:
+            self.writer = ut.SqliteWriter(sqlite_db, msgu_common.MSGULog.MODULE, in_file)
+            print(ut.get_debug_tags(None, msgu_common.MSGULog.MODULE, None, 'follow')[0] + \
+            'result is saved in ' + sqlite_db)
+        elif out_format != ut.FORMAT_HTML:
+            filename = ut.get_parsed_filename(in_file, msgu_common.MSGULog.MODULE)
+            self.record_filename = ut.get_unique_filename(os.path.join(out_dir, filename), '.' + out_format)
+            self.record_fd = open(self.record_filename, 'w')
+            self.writer = ut.RecordWriter(self.record_fd, out_format, dump=in_file)
+            print(ut.get_debug_tags(None, msgu_common.MSGULog.MODULE, None, 'follow')[0] + \
+            'result is appended to ' + self.record_filename)
+        self.found_log_flag = False
+        self._reset()
+
+    def _reset(self):
+        ''' Clear section state, called when starting from beginning of file '''
+        # line with chipset name
+        self.asic_line = None
+        # ut.SectionLineJoiner of current FW log section, None if not in FW log section
+        self.fw_joiner = None
+        # clock frequency of current FW log section
+        self.fw_clk_freq = None
+        for log_module, pair_list, open_dict, done_dict in self.state_list:
+            open_dict.clear()
+            done_dict.clear()
+
+    def poll(self):
+        ''' Read and decode lines appended since last poll
+            @return True if any line is read
+        '''
+        tag = ut.get_debug_tags(None, msgu_common.MSGULog.MODULE, None, 'follow')[0]
+        truncated, line_list = self.reader.read_lines()
+        if truncated:
+            print(tag + 'Warning, input file is truncated, follow from beginning of file')
+            self._reset()
+        if not line_list:
+            return False
+        for line_start, line_end, line in line_list:
+            if self.asic_line is None and msgu_common.MSGULog.ASIC_FAMILY_WORD in line:
+                self.asic_line = line
+            if self.fw_log is not None:
+                self._feed_fw_log(line)
+            for state in self.state_list:
+                self._feed_section(state, line_start, line_end, line)
+        if self.fw_joiner is not None:
+            self._decode_fw_log()
+        if self.writer is not None:
+            self.writer.flush()
+        return True
+
+    def _feed_fw_log(self, line):
+        ''' Track FW log section, decode FW log when its ending is found '''
+        fw_log = self.fw_log
+        if line == fw_log.LOG_HEADER:
+            if self.fw_joiner is not None:
+                self._decode_fw_log()
+            if self.writer is None and self.fw_fd is None:
+                filename = ut.get_parsed_filename(self.in_file, fw_log.MODULE, fw_log.SECTION)
+                filename = ut.get_unique_filename(os.path.join(self.out_dir, filename), '.log')
+                self.fw_fd = open(filename, 'w')
+                self.fw_fd.write('Decoded ' + fw_log.MODULE + fw_log.SECTION + \
+                'from dump file ' + self.in_file + ':\n')
+                print(ut.get_debug_tags(None, fw_log.MODULE, fw_log.SECTION, 'follow')[0] + \
+                'result is appended to ' + filename)
+            if self.writer is None:
+                self.fw_fd.write('Follow FW log section, log is in the order in dump file\n')
+            tag = ut.get_debug_tags(None, fw_log.MODULE, fw_log.SECTION, 'follow')[0]
+            self.fw_joiner = ut.SectionLineJoiner(tag, fw_log.LOG_HEADER, fw_log.LOG_ENDING, \
+            fw_log.LOG_LINE_LENGTH, False)
+            self.fw_joiner.feed(line)
+            self.fw_clk_freq = None
+        elif self.fw_joiner is not None:
+            if self.fw_joiner.feed(line):
+                self._decode_fw_log()
+                self.fw_joiner = None
+
+    def _decode_fw_log(self):
+        ''' Decode FW log lines completed since last decode in current FW log section and append them to FW log file '''
+        fw_log = self.fw_log
+        tag_next_level = ut.get_debug_tags(None, fw_log.MODULE, fw_log.SECTION, 'follow')[1]
+        # only the last incomplete line is kept in joiner, completed lines are decoded once
+        line_list = self.fw_joiner.line_list
+        if not line_list:
+            return
+        self.fw_joiner.line_list = []
+        definition_list = fw_log.get_def_list(tag_next_level, self.workspace, self.debug_mode)
+        time_list = []
+        log_list = []
+        for line in line_list:
+            item_1, item_2 = fw_log.decode_line(tag_next_level, line, definition_list, self.debug_mode)
+            if item_1 is None or item_2 is None:
+                continue
+            if type(item_2) is int and type(item_1) is int:
+                # first line of FW log, write entries before it with old clock frequency
+                self._write_fw_entries(time_list, log_list)
+                time_list = []
+                log_list = []
+                self.fw_clk_freq = item_2
+                if self.writer is not None:
+                    self.writer.write('fw_info', section=fw_log.SECTION, clk_freq=self.fw_clk_freq, warning=None)
+                else:
+                    fw_log.write_clock(self.fw_fd, self.fw_clk_freq)
+            else:
+                time_list.append(item_1)
+                log_list.append(item_2)
+        self._write_fw_entries(time_list, log_list)
+        if self.fw_fd is not None:
+            self.fw_fd.flush()
+        self.found_log_flag = True
+
+    def _write_fw_entries(self, time_list, log_list):
+        ''' Write decoded FW log entries to FW log file or records file '''
+        if self.writer is not None:
+            self.fw_log.write_entry_records(self.writer, self.fw_clk_freq, time_list, log_list)
+        else:
+            self.fw_log.write_entries(self.fw_fd, self.fw_clk_freq, time_list, log_list)
+
+    def _feed_section(self, state, line_start, line_end, line):
+        ''' Track sections of a parser, decode them when all of them are complete '''
+        log_module, pair_list, open_dict, done_dict = state
+        for header, ending in pair_list:
+            if line == header:
+                open_dict[header] = line_start
+            elif line == ending and header in open_dict:
+                done_dict[header] = [open_dict.pop(header), line_end]
+        if len(done_dict) == len(pair_list):
+            self._decode_section(state)
+
+    def _decode_section(self, state):
+        ''' Decode completed sections of a parser and save the result in its own file '''
+        log_module, pair_list, open_dict, done_dict = state
+        # read from first header to last ending, with chipset line in front
+        start = min(start for start, end in done_dict.values())
+        end = max(end for start, end in done_dict.values())
+        data = self.reader.read(start, end)
+        if self.asic_line is not None:
+            data = self.asic_line.encode('utf-8') + b'\n' + data
+        done_dict.clear()
+        # a new parser for each decode, nothing is carried over from earlier sections
+        log_module = log_module.__class__()
+        ctx = msgu_common.MSGULog.new_context(self.in_file, self.out_dir, self.debug_mode, self.workspace)
+        ctx.data = data
+        try:
+            if log_module.run(ctx, True, None, self.writer):
+                self.found_log_flag = True
+        finally:
+            ctx.close()
+
+    def close(self):
+        ''' Decode sections that are partly found, and release input and output files '''
+        for state in self.state_list:
+            if state[3]:
+                self._decode_section(state)
+        if self.fw_fd is not None:
+            self.fw_fd.close()
+            self.fw_fd = None
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+        if self.record_fd is not None:
+            self.record_fd.close()
+            self.record_fd = None
+        self.reader.close()
+
+def follow(in_file, out_dir, debug_mode=False, workspace='', sections=None, interval=1.0, out_format=ut.FORMAT_HTML, \
+sqlite_db=None):
+    ''' Follow a growing dump file and decode MSGU sections as they arrive, stop by Ctrl-C
+        @param in_file: path to input dump file
+        @param out_dir: path to output dir
+        @param debug_mode: optional, True to enable additional log
+        @param workspace: optional, path to BC workspace
+        @param sections: optional, list of keys in SECTION_KEY_LIST, follow all sections if None
+        @param interval: optional, seconds to wait before reading again if no new line
+        @param out_format: optional, one of ut.FORMAT_LIST
+        @param sqlite_db: optional, path to SQLite database to save records to instead of files
+        @return True if log is found
+    '''
+    tag = ut.get_debug_tags(None, msgu_common.MSGULog.MODULE, None, 'follow')[0]
+    follower = MSGUFollower(in_file, out_dir, debug_mode, workspace, sections, out_format, sqlite_db)
+    print(tag + 'follow ' + in_file + ', press Ctrl-C to stop')
+    try:
+        while True:
+            if not follower.poll():
+                time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        follower.close()
+    print(tag + 'stopped')
+    return follower.found_log_flag
+
+def run():
+    argv = msgu_common._MSGU_DUMP_WORKER()
+    argv.parse()
+    try:
+        _select_logs(argv.SECTION_LIST)
+    except ValueError as e:
+        print('Error, {}'.format(e))
+        sys.exit(1)
+    if argv.INPUT_LIST:
+        return ut.run_batch(None, msgu_common.MSGULog.MODULE, argv.INPUT_LIST, argv.OUTPUT_DIR, argv.JOBS, \
+        decode, (argv.OUTPUT_DIR, argv.DEBUG_MODE, argv.WORKSPACE, 1, argv.SECTION_LIST, argv.FORMAT, \
+        argv.SQLITE_DB), preload, (argv.WORKSPACE, argv.SECTION_LIST))
+    if argv.FOLLOW:
+        return follow(argv.INPUT_DIR, argv.OUTPUT_DIR, argv.DEBUG_MODE, argv.WORKSPACE, \
+        argv.SECTION_LIST, argv.INTERVAL, argv.FORMAT, argv.SQLITE_DB)
+    return decode(argv.INPUT_DIR, argv.OUTPUT_DIR, argv.DEBUG_MODE, argv.WORKSPACE, argv.JOBS, \
+    argv.SECTION_LIST, argv.FORMAT, argv.SQLITE_DB)[0]
@@ -63,8 +63,10 @@ def _get_ossp_nav_tab(hide_tbl_fcn_name, ossp_list):
 
 PER_PHY_TBL_PREFIX = 'ossp_per_phy'
 PER_OSSP_TBL_PREFIX = 'per_ossp'
-global_phy_nav_tab = ''
 def get_top_level_header(input_filename, section_list, per_phy_section_list, ossp_phy_list):
+    ''' @return tuple of [header, phy_nav_tab], where phy_nav_tab is nav bar for
+            per PHY sections, it is empty if ossp_phy_list is empty
+    '''
     common_scripts = html.get_common_scripts()
     hide_sec_scripts = ''
     click_link = ''
@@ -72,7 +74,7 @@ def get_top_level_header(input_filename, section_list, per_phy_section_list, oss
     phy_hide_tbl_script = ''
     ossp_nav_tab = ''
     hqa_nav_tab = ''
-    global global_phy_nav_tab
+    phy_nav_tab_container = ''
     if not section_list and not per_phy_section_list:
         raise AssertionError('No section list specified')
 
@@ -99,9 +101,9 @@ def get_top_level_header(input_filename, section_list, per_phy_section_list, oss
             if ossp_phy_list:
                 hide_tbl_fcn_name, phy_hide_tbl_script = _get_hide_tbl_script(PER_PHY_TBL_PREFIX, per_phy_section_s_list, 0)
                 phy_nav_tab = _get_phy_nav_tab(hide_tbl_fcn_name, ossp_phy_list)
-                global_phy_nav_tab = '<div class="container">{}</div>'.format(phy_nav_tab)
+                phy_nav_tab_container = '<div class="container">{}</div>'.format(phy_nav_tab)
                 del hide_tbl_fcn_name
-    return \
+    header = \
 '''<!DOCTYPE html>
 <html lang="en">
 <head>
@@ -152,6 +154,7 @@ def get_top_level_header(input_filename, section_list, per_phy_section_list, oss
 <p style="color:red;">Internet Explore may not correctly display the result, consider using a modern browser, such as Microsoft Edge or Google Chrome.</p>
 %s
 </div>''' % (common_scripts, hide_sec_scripts, ossp_hide_tbl_script, phy_hide_tbl_script, input_filename, click_link, ossp_nav_tab)
+    return header, phy_nav_tab_container
 
 def get_top_level_ending():
     return html.get_top_level_ending()
@@ -1,5 +1,6 @@
 import os
 import re
+import sys
 import itertools
 import collections
 import xml.etree.ElementTree as ET
@@ -27,6 +28,10 @@ class OSSPLog(ut.XMLREToken):
     # log ending, currently all SAS reg dump sections use the following line
     LOG_ENDING = '======================================================='
 
+    # key to select a section, value is log header of that section
+    SECTION_KEY_DICT = collections.OrderedDict([('hsst_glb', LOG_HEADER_HSST_GLB), \
+    ('hsst_xport', LOG_HEADER_HSST_XPORT), ('sspa', LOG_HEADER_SSPA), ('sspl', LOG_HEADER_SSPL)])
+
     # common line length in SAS reg dump, some SAS reg dump sections have
     # a different line length, override this param if that is the case
     LOG_LINE_LENGTH_COMMON = 78
@@ -43,10 +48,9 @@ class OSSPLog(ut.XMLREToken):
     DEFAULT_PHY_COUNT = 8
 
     @classmethod
-    def _get_def_reg_dict(cls, xml_filename, debug=False):
-        ''' Get register def from xml file
+    def _build_def_reg_dict(cls, xml_filename):
+        ''' Build register def from xml file
             @param xml_filename: name of xml file
-            @param debug: optional, True to print out addition log
             @return reg_dict: dict of def register in DefReg struct
         '''
         tree = ET.parse(xml_filename)
@@ -78,6 +82,16 @@ class OSSPLog(ut.XMLREToken):
                     #print(bit_meaning)
                     this_reg.add_bit_des(bit_pos, bit_name, bit_meaning)
             reg_dict[reg_addr] = this_reg
+        return reg_dict
+
+    @classmethod
+    def _get_def_reg_dict(cls, xml_filename, debug=False):
+        ''' Get register def from xml file, xml file is parsed only if it is not in def cache
+            @param xml_filename: name of xml file
+            @param debug: optional, True to print out addition log
+            @return reg_dict: dict of def register in DefReg struct
+        '''
+        reg_dict = ut.DefCache.get(None, 'ossp_def_reg_dict', xml_filename, cls._build_def_reg_dict)
         if debug is True:
             for reg_addr in reg_dict.keys():
                 reg = reg_dict[reg_addr]
@@ -109,26 +123,14 @@ class OSSPLog(ut.XMLREToken):
                     print(decoded_reg.reg_name)
 
                 if reg.has_bit_des is True:
-                    for bit_pos in reg.bit_dict.keys():
-                        bit_name, raw_bit_meaning = reg.bit_dict[bit_pos]
-                        bit_val, bit_val_str = ut.bit_shift(reg_val, bit_pos)
-                        bit_meaning = raw_bit_meaning
-
-                        if cls.re_logic.search(bit_meaning) is not None:
-                            bit_meaning = ut.handle_logic_token(bit_val_str, bit_meaning)
-                        if cls.re_hex_token.search(bit_meaning) is not None:
-                            hex_digit = len(bit_val_str) >> 2
-                            if (len(bit_val_str) % 4) != 0:
-                                hex_digit += 1
-                            hex_format = ''.join(['0x{:0', str(hex_digit), 'x}'])
-                            bit_meaning = cls.re_hex_token.sub(hex_format.format(bit_val), bit_meaning)
-                        bit_meaning = cls.re_dec_token.sub(str(bit_val), bit_meaning)
-                        if debug is True:
+                    # same reg with the same value in other OSSPs/PHYs shares decoded bits,
+                    # meaning is rendered from template when result is saved
+                    decoded_reg.set_shared_bit_des(ut.decode_reg_bits(reg, reg_val))
+                    if debug is True:
+                        for bit_pos, (bit_name, bit_val_str, bit_meaning) in decoded_reg.bit_dict.items():
                             print(bit_pos)
                             print(bit_val_str)
                             print(bit_meaning)
-                        # add bit_val_str instead of bit_val
-                        decoded_reg.add_bit_des(bit_pos, bit_name, bit_val_str, bit_meaning)
                 decoded_reg_dict[decoded_reg.reg_address] = decoded_reg
         if not decoded_reg_dict:
             print(tag + 'Warnning, empty decoded reg dict')
@@ -138,33 +140,69 @@ class OSSPLog(ut.XMLREToken):
         return decoded_reg_dict
 
     @classmethod
-    def _get_ossp_phy_list(cls, tag, log_header, dump_file):
+    def _get_ossp_header(cls, log_header, ossp_id):
+        ''' @return header of the log for one OSSP in dump file '''
+        return log_header + ' (OSSP_%d):' % (ossp_id)
+
+    @classmethod
+    def _index_reg_dump(cls, tag, ctx, log_header_list):
+        ''' Find all OSSP blocks of all sections in one scan of dump file
+            @param tag
+            @param ctx: ut.ParseContext of dump file to decode
+            @param log_header_list: list of log headers of sections to find
+            @return tuple of [dump_index, block_dict], where dump_index is ut.DumpIndex to read
+                    the blocks from, caller must close it after decoding, and
+                    block_dict[log_header] = list of [ossp_id, start, end, line_num] for each OSSP
+                    found in dump file, where start and end are byte offsets of lines from
+                    OSSP header to log ending, line_num is line number of OSSP header
+        '''
+        marker_list = [cls.LOG_ENDING]
+        for log_header in log_header_list:
+            for ossp_id in range(cls.MAX_NUM_OSSP):
+                marker_list.append(cls._get_ossp_header(log_header, ossp_id))
+        dump_index = ut.DumpIndex(tag, ctx.in_file, marker_list, data=ctx.data)
+        # only byte ranges are kept, lines of a block are read when the block is decoded
+        block_dict = collections.OrderedDict()
+        for log_header in log_header_list:
+            block_dict[log_header] = []
+            for ossp_id in range(cls.MAX_NUM_OSSP):
+                header = cls._get_ossp_header(log_header, ossp_id)
+                section_range = dump_index.get_section_range(header, cls.LOG_ENDING)
+                if section_range is None:
+                    continue
+                start, end = section_range
+                block_dict[log_header].append([ossp_id, start, end, dump_index.get_line_num(header)])
+        return dump_index, block_dict
+
+    @classmethod
+    def _get_phy_count(cls, dump_index, start, end):
+        ''' @param dump_index: ut.DumpIndex returned by _index_reg_dump()
+            @param start, end: byte offsets of an OSSP block, starts from OSSP header
+            @return tuple of [phy_count, has_phy_line], phy_count is read from the line after
+                    OSSP header, 0 if not found, has_phy_line is False if there is no such line
+        '''
+        line_list = list(itertools.islice(dump_index.iter_lines(start, end), 2))
+        if len(line_list) < 2:
+            return 0, False
+        phy_count = line_list[1].count('PHY')
+        if phy_count <= 0:
+            phy_count = line_list[1].count('phy')
+        return phy_count, True
+
+    @classmethod
+    def _get_ossp_phy_list(cls, tag, log_header, dump_index, block_list):
         ''' Get OSSP-PHY list from dump file
             @param tag
             @param log_header: header of the log in dump file
-            @param dump_file: input dump file
+            @param dump_index: ut.DumpIndex returned by _index_reg_dump()
+            @param block_list: OSSP blocks of this section returned by _index_reg_dump()
             @return ossp_phy_list: list of [ossp_id, phy_list], where phy_list is list of phy
         '''
         tag = ut.get_debug_tags(tag, cls.MODULE, log_header, '_get_ossp_phy_list')[0]
         ossp_phy_list = []
         total_phy_count = 0
-        for ossp_id in range(cls.MAX_NUM_OSSP):
-            header = log_header + ' (OSSP_%d):' % (ossp_id)
-            found_header = False
-            phy_count = 0
-            for line in dump_file:
-                if found_header is True:
-                    phy_count = line.count('PHY')
-                    if phy_count <= 0:
-                        phy_count = line.count('phy')
-                    break
-                if line == header:
-                    found_header = True
-
-            # this OSSP/reg dump not in file
-            if found_header is False:
-                continue
-
+        for ossp_id, start, end, line_num in block_list:
+            phy_count = cls._get_phy_count(dump_index, start, end)[0]
             if phy_count <= 0:
                 print(tag + 'Warning, PHY count not found for OSSP %d, use default PHY count = %d for this OSSP' % \
                 (ossp_id, cls.DEFAULT_PHY_COUNT))
@@ -180,27 +218,27 @@ class OSSPLog(ut.XMLREToken):
         return ossp_phy_list
 
     @classmethod
-    def _decode_per_ossp_reg_dump(cls, tag, log_header, dump_file, \
-    def_reg_dict, fd, line_len = LOG_LINE_LENGTH_COMMON, target_list=[], debug=False):
+    def _decode_per_ossp_reg_dump(cls, tag, log_header, dump_index, block_list, \
+    def_reg_dict, line_len = LOG_LINE_LENGTH_COMMON, target_list=[], debug=False):
         ''' Decode per OSSP register dump in OSSP section
             @param tag
             @param log_header: header of the log in dump file
-            @param dump_file: input dump file
+            @param dump_index: ut.DumpIndex returned by _index_reg_dump()
+            @param block_list: OSSP blocks of this section returned by _index_reg_dump()
             @param  def_reg_dict: definition reg dict
-            @output fd: fd to output file
             @param target_list: Optional, only translate regs in target list if given
             @param line_len: Optional, line length in this section
-            @note: fd contains dump for the corresponding reg section after this function being called 
+            @return DecodedRegDump with per OSSP registers, or None if this section is not found
         '''
         tag, tag_next_level = ut.get_debug_tags(tag, cls.MODULE, log_header, '_decode_per_ossp_reg_dump')
         ossp_reg_dump_dict = {}
         ossp_count = 0
         found_log_flag = False
-        for ossp_id in range(cls.MAX_NUM_OSSP):
-            header = log_header + ' (OSSP_%d):' % (ossp_id)
-            re_line_token = re.compile('(0x[0-9a-fA-F]{3}:)((\s[0-9a-fA-F]{%d}){%d})' % (cls.BYTE_PER_REG, 1))
+        re_line_token = re.compile('(0x[0-9a-fA-F]{3}:)((\s[0-9a-fA-F]{%d}){%d})' % (cls.BYTE_PER_REG, 1))
+        for ossp_id, start, end, line_num in block_list:
+            header = cls._get_ossp_header(log_header, ossp_id)
             lines = ut.save_line_to_list(tag_next_level, header, cls.LOG_ENDING, \
-            'DUMMY', line_len, False, dump_file)
+            'DUMMY', line_len, False, dump_index.iter_lines(start, end), line_num)
             if lines:
                 found_log_flag = True
                 ossp_reg_dump_dict[ossp_id] = []
@@ -227,7 +265,7 @@ class OSSPLog(ut.XMLREToken):
                 ossp_count += 1
 
         if found_log_flag is False:
-            return found_log_flag
+            return None
         # filter out common registers
         # bypass if we only have 1 ossp
         common_reg_list = []
@@ -249,67 +287,67 @@ class OSSPLog(ut.XMLREToken):
                 except KeyError:
                     pass
         
-        fd.write(ohtml.get_section_header(log_header))
-        first_ossp_id = -1
+        result = DecodedRegDump(log_header)
         for ossp_id in range(cls.MAX_NUM_OSSP):
-            try:
+            if ossp_id in ossp_reg_dump_dict:
                 dump_reg_list = ossp_reg_dump_dict[ossp_id]
-                #print(dump_reg_list)
-                if first_ossp_id == -1:
-                    first_ossp_id = ossp_id
                 decoded_reg_dict = cls._get_reg_meaning(tag_next_level, dump_reg_list, def_reg_dict, debug)
-                fd.write(ohtml.get_per_ossp_tbl_header(log_header, ossp_id, first_ossp_id))
-                ut.save_reg_dump_to_html(dump_reg_list, 0, 1, fd)
-                ut.save_decoded_reg_dict_to_html_table(decoded_reg_dict, fd, debug)
-                fd.write(ohtml.get_tbl_ending())
-            except KeyError:
-                pass
+                result.reg_dump_dict[ossp_id] = [dump_reg_list, decoded_reg_dict]
         if common_reg_list:
-            fd.write(ohtml.get_common_reg_header(log_header))
             decoded_reg_dict = cls._get_reg_meaning(tag_next_level, common_reg_list, def_reg_dict, debug)
+            result.common_reg_dump = [common_reg_list, decoded_reg_dict]
+        return result
+
+    @classmethod
+    def _save_per_ossp_reg_dump(cls, result, fd, debug=False):
+        ''' Save per OSSP register dump in html
+            @param result: DecodedRegDump returned by _decode_per_ossp_reg_dump()
+            @output fd: fd to output file
+            @param debug: optional, True to save all bits
+        '''
+        log_header = result.log_header
+        fd.write(ohtml.get_section_header(log_header))
+        first_ossp_id = -1
+        for ossp_id, (dump_reg_list, decoded_reg_dict) in result.reg_dump_dict.items():
+            if first_ossp_id == -1:
+                first_ossp_id = ossp_id
+            fd.write(ohtml.get_per_ossp_tbl_header(log_header, ossp_id, first_ossp_id))
+            ut.save_reg_dump_to_html(dump_reg_list, 0, 1, fd)
+            ut.save_decoded_reg_dict_to_html_table(decoded_reg_dict, fd, debug)
+            fd.write(ohtml.get_tbl_ending())
+        if result.common_reg_dump is not None:
+            common_reg_list, decoded_reg_dict = result.common_reg_dump
+            fd.write(ohtml.get_common_reg_header(log_header))
             ut.save_reg_dump_to_html(common_reg_list, 0, 1, fd)
             ut.save_decoded_reg_dict_to_html_table(decoded_reg_dict, fd, debug)
         # finally write section ending
         fd.write(ohtml.get_section_ending(log_header))
-        return found_log_flag
 
     @classmethod
-    def _decode_per_phy_reg_dump(cls, tag, log_header, dump_file, \
-    def_reg_dict, fd, line_len = LOG_LINE_LENGTH_COMMON, target_list=[], debug=False):
+    def _decode_per_phy_reg_dump(cls, tag, log_header, dump_index, block_list, \
+    def_reg_dict, line_len = LOG_LINE_LENGTH_COMMON, target_list=[], debug=False):
         ''' Decode per PHY register dump in OSSP section
             @param tag
             @param log_header: header of the log in dump file
-            @param dump_file: input dump file
+            @param dump_index: ut.DumpIndex returned by _index_reg_dump()
+            @param block_list: OSSP blocks of this section returned by _index_reg_dump()
             @param  def_reg_dict: definition reg dict
-            @output fd: fd to output file
             @param target_list: Optional, only translate regs in target list if given
             @param line_len: Optional, line length in this section
-            @note: fd contains dump for the corresponding reg section after this function being called 
+            @return DecodedRegDump with per PHY registers, or None if this section is not found
         '''
         tag, tag_next_level = ut.get_debug_tags(tag, cls.MODULE, log_header, '_decode_per_phy_reg_dump')
         found_log_flag = False
         ossp_phy_list = []
         total_phy_count = 0
         phy_reg_dump_dict = {}
-        for ossp_id in range(cls.MAX_NUM_OSSP):
-            header = log_header + ' (OSSP_%d):' % (ossp_id)
-            found_header = False
-            phy_count = 0
-            for line in dump_file:
-                if found_header is True:
-                    phy_count = line.count('PHY')
-                    if phy_count <= 0:
-                        phy_count = line.count('phy')
-                    if phy_count > 0:
-                        line_len = 6 + phy_count*(cls.BYTE_PER_REG + 1)
-                    print(tag + 'OSSP %d has line length %d' % (ossp_id, line_len))
-                    break
-                if line == header:
-                    found_header = True
-
-            # this OSSP/reg dump not in file
-            if found_header is False:
-                continue
+        for ossp_id, start, end, line_num in block_list:
+            header = cls._get_ossp_header(log_header, ossp_id)
+            phy_count, has_phy_line = cls._get_phy_count(dump_index, start, end)
+            if has_phy_line:
+                if phy_count > 0:
+                    line_len = 6 + phy_count*(cls.BYTE_PER_REG + 1)
+                print(tag + 'OSSP %d has line length %d' % (ossp_id, line_len))
 
             if phy_count <= 0:
                 print(tag + 'Warning, PHY count not found for OSSP %d, assume default PHY count = %d from this OSSP' % (ossp_id, cls.DEFAULT_PHY_COUNT))
@@ -317,7 +355,7 @@ class OSSPLog(ut.XMLREToken):
 
             re_line_token = re.compile('(0x[0-9a-fA-F]{3}:)((\s[0-9a-fA-F]{%d}){%d})' % (cls.BYTE_PER_REG, phy_count))
             lines = ut.save_line_to_list(tag_next_level, header, cls.LOG_ENDING, \
-            'DUMMY', line_len, False, dump_file)
+            'DUMMY', line_len, False, dump_index.iter_lines(start, end), line_num)
             if lines:
                 found_log_flag = True
                 this_phy_list = []
@@ -352,7 +390,7 @@ class OSSPLog(ut.XMLREToken):
                 total_phy_count += phy_count
 
         if found_log_flag is False:
-            return found_log_flag
+            return None
         
         # sanity check
         for phy_id in range(total_phy_count):
@@ -377,116 +415,327 @@ class OSSPLog(ut.XMLREToken):
                 phy_reg_dump_dict[phy_id] = list(filter(lambda reg: reg[0] in unique_reg_addr_set, dump_reg_list))
             except KeyError:
                 pass
-        if ossp_phy_list:
-            first_phy_id = ossp_phy_list[0][1][0]
-            fd.write(ohtml.get_section_header(log_header))
-            for ossp_id, phy_list in ossp_phy_list:
-                for phy_id in phy_list:
-                    try:
-                        dump_reg_list = phy_reg_dump_dict[phy_id]
-                        #print(dump_reg_list)
-                        decoded_reg_dict = cls._get_reg_meaning(tag_next_level, dump_reg_list, def_reg_dict, debug)
-                        fd.write(ohtml.get_per_phy_tbl_header(log_header, ossp_id, phy_id, first_phy_id))
-                        ut.save_reg_dump_to_html(dump_reg_list, 0, 1, fd)
-                        ut.save_decoded_reg_dict_to_html_table(decoded_reg_dict, fd, debug)
-                        fd.write(ohtml.get_tbl_ending())
-                    except KeyError:
-                        pass
-            if common_reg_list:
-                '''fd.write('<p>Common Register between PHY {} - PHY {} for {}</p>'\
-                .format(ossp_phy_list[0][1][0], ossp_phy_list[-1][1][-1], log_header))
-                fd.write('<a href="#top_section">Back To Top</a>')'''
-                fd.write(ohtml.get_common_reg_header(log_header))
-                decoded_reg_dict = cls._get_reg_meaning(tag_next_level, common_reg_list, def_reg_dict, debug)
-                ut.save_reg_dump_to_html(common_reg_list, 0, 1, fd)
-                ut.save_decoded_reg_dict_to_html_table(decoded_reg_dict, fd, debug)
-
-            fd.write(ohtml.get_section_ending(log_header))
-        return found_log_flag
-
-    def run(self):
-        ''' Run this parser and save the result in an html file
-            @return True if log is found
+        result = DecodedRegDump(log_header)
+        result.ossp_phy_list = ossp_phy_list
+        for ossp_id, phy_list in ossp_phy_list:
+            for phy_id in phy_list:
+                if phy_id in phy_reg_dump_dict:
+                    dump_reg_list = phy_reg_dump_dict[phy_id]
+                    decoded_reg_dict = cls._get_reg_meaning(tag_next_level, dump_reg_list, def_reg_dict, debug)
+                    result.reg_dump_dict[phy_id] = [dump_reg_list, decoded_reg_dict]
+        if common_reg_list:
+            decoded_reg_dict = cls._get_reg_meaning(tag_next_level, common_reg_list, def_reg_dict, debug)
+            result.common_reg_dump = [common_reg_list, decoded_reg_dict]
+        return result
+
+    @classmethod
+    def _save_per_phy_reg_dump(cls, result, fd, debug=False):
+        ''' Save per PHY register dump in html
+            @param result: DecodedRegDump returned by _decode_per_phy_reg_dump()
+            @output fd: fd to output file
+            @param debug: optional, True to save all bits
         '''
-        argv = ut.DumpArgvWorker()
-        argv.parse()
-        in_file = argv.INPUT_DIR
-        out_dir = argv.OUTPUT_DIR
-        debug = argv.DEBUG_MODE
+        log_header = result.log_header
+        first_phy_id = result.ossp_phy_list[0][1][0]
+        fd.write(ohtml.get_section_header(log_header))
+        for ossp_id, phy_list in result.ossp_phy_list:
+            for phy_id in phy_list:
+                if phy_id in result.reg_dump_dict:
+                    dump_reg_list, decoded_reg_dict = result.reg_dump_dict[phy_id]
+                    fd.write(ohtml.get_per_phy_tbl_header(log_header, ossp_id, phy_id, first_phy_id))
+                    ut.save_reg_dump_to_html(dump_reg_list, 0, 1, fd)
+                    ut.save_decoded_reg_dict_to_html_table(decoded_reg_dict, fd, debug)
+                    fd.write(ohtml.get_tbl_ending())
+        if result.common_reg_dump is not None:
+            common_reg_list, decoded_reg_dict = result.common_reg_dump
+            fd.write(ohtml.get_common_reg_header(log_header))
+            ut.save_reg_dump_to_html(common_reg_list, 0, 1, fd)
+            ut.save_decoded_reg_dict_to_html_table(decoded_reg_dict, fd, debug)
+        fd.write(ohtml.get_section_ending(log_header))
 
-        tag, tag_next_level = ut.get_debug_tags(None, self.MODULE, self.SECTION, 'run')
-        print(tag + 'parser starts')
+    @classmethod
+    def get_section_header_list(cls, section_list):
+        ''' Get log headers of selected sections
+            @param section_list: list of keys in SECTION_KEY_DICT
+            @return list of log headers
+        '''
+        header_list = []
+        for section in section_list:
+            if section not in cls.SECTION_KEY_DICT:
+                raise ValueError('Unknown OSSP section [{}], valid sections are {}'.format(section, \
+                list(cls.SECTION_KEY_DICT.keys())))
+            header_list.append(cls.SECTION_KEY_DICT[section])
+        return header_list
 
+    @classmethod
+    def get_def_dict(cls, debug=False, section_list=None):
+        ''' Get register definition for all sections
+            @param debug: optional, True to print out addition log
+            @param section_list: optional, list of keys in SECTION_KEY_DICT, get all sections if None
+            @return tuple of [per_ossp_log_dict, per_phy_log_dict], where key is log header
+                    and value is def reg dict for that section
+        '''
         '''Update per_ossp and per_phy dicts if a new register section is
            added to OSSP register dump.
         '''
+        if section_list is None:
+            header_list = list(cls.SECTION_KEY_DICT.values())
+        else:
+            header_list = cls.get_section_header_list(section_list)
 
         # Get register definition for per OSSP reg dump
         per_ossp_log_dict = collections.OrderedDict()
-        per_ossp_log_dict[self.LOG_HEADER_HSST_GLB] = self._get_def_reg_dict(self.DEF_FILE_DIR_HSST_GLB, debug)
+        for log_header, def_file_dir in [[cls.LOG_HEADER_HSST_GLB, cls.DEF_FILE_DIR_HSST_GLB]]:
+            if log_header in header_list:
+                per_ossp_log_dict[log_header] = cls._get_def_reg_dict(def_file_dir, debug)
 
         # Get register definition for per PHY reg dump
         per_phy_log_dict = collections.OrderedDict()
-        per_phy_log_dict[self.LOG_HEADER_HSST_XPORT] = self._get_def_reg_dict(self.DEF_FILE_DIR_HSST_XPORT, debug)
-        per_phy_log_dict[self.LOG_HEADER_SSPA] = self._get_def_reg_dict(self.DEF_FILE_DIR_SSPA, debug)
-        per_phy_log_dict[self.LOG_HEADER_SSPL] = self._get_def_reg_dict(self.DEF_FILE_DIR_SSPL, debug)
+        for log_header, def_file_dir in [[cls.LOG_HEADER_HSST_XPORT, cls.DEF_FILE_DIR_HSST_XPORT], \
+        [cls.LOG_HEADER_SSPA, cls.DEF_FILE_DIR_SSPA], [cls.LOG_HEADER_SSPL, cls.DEF_FILE_DIR_SSPL]]:
+            if log_header in header_list:
+                per_phy_log_dict[log_header] = cls._get_def_reg_dict(def_file_dir, debug)
+        return per_ossp_log_dict, per_phy_log_dict
+
+    def decode_reg_dump(self, ctx, per_ossp_log_dict, per_phy_log_dict):
+        ''' Decode register dump sections without saving the result
+            @param ctx: ut.ParseContext of dump file to decode
+            @param per_ossp_log_dict: dict[log_header] = def reg dict for per OSSP sections
+            @param per_phy_log_dict: dict[log_header] = def reg dict for per PHY sections
+            @return tuple of [ossp_phy_list, result_dict], where result_dict[log_header] is
+                    DecodedRegDump, or None if that section is not found
+        '''
+        tag_next_level = ut.get_debug_tags(None, self.MODULE, self.SECTION, 'run')[1]
+        debug = ctx.debug_mode
+        result_dict = collections.OrderedDict()
+
+        # 1. find OSSP blocks of all sections in one scan of input dump file
+        dump_index, block_dict = self._index_reg_dump(tag_next_level, ctx, \
+        list(per_ossp_log_dict.keys()) + list(per_phy_log_dict.keys()))
+        try:
+            # 2. get max ossp_phy_list, this is used by html header
+            ossp_phy_list = []
+            for log_header, def_reg_dict in per_phy_log_dict.items():
+                return_ossp_phy_list = self._get_ossp_phy_list(tag_next_level, log_header, dump_index, block_dict[log_header])
+                if ossp_phy_list:
+                    if return_ossp_phy_list:
+                        if ut.llen(return_ossp_phy_list, 1) > ut.llen(ossp_phy_list, 1):
+                            ossp_phy_list = return_ossp_phy_list
+                else:
+                    ossp_phy_list = return_ossp_phy_list
+
+            # 3. translate per OSSP register dump
+            for log_header, def_reg_dict in per_ossp_log_dict.items():
+                result_dict[log_header] = self._decode_per_ossp_reg_dump(tag_next_level, log_header, \
+                dump_index, block_dict[log_header], def_reg_dict, 15, debug=debug)
+
+            # 4. translate per PHY register dump
+            for log_header, def_reg_dict in per_phy_log_dict.items():
+                result_dict[log_header] = self._decode_per_phy_reg_dump(tag_next_level, log_header, \
+                dump_index, block_dict[log_header], def_reg_dict, debug=debug)
+        finally:
+            dump_index.close()
+        return ossp_phy_list, result_dict
+
+    def save_reg_dump(self, ctx, fd, per_ossp_header_list, per_phy_header_list, ossp_phy_list, result_dict):
+        ''' Save result of decode_reg_dump() in html
+            @param ctx: ut.ParseContext of decoded dump file
+            @output fd: fd to output file
+            @param per_ossp_header_list: list of log headers of per OSSP sections
+            @param per_phy_header_list: list of log headers of per PHY sections
+            @param ossp_phy_list: ossp_phy_list returned by decode_reg_dump()
+            @param result_dict: result_dict returned by decode_reg_dump()
+        '''
+        # 1. write html header
+        header, phy_nav_tab = ohtml.get_top_level_header(ctx.in_file, per_ossp_header_list, \
+            per_phy_header_list, ossp_phy_list)
+        fd.write(header)
+
+        # 2. write per OSSP register dump
+        for log_header in per_ossp_header_list:
+            if result_dict[log_header] is not None:
+                self._save_per_ossp_reg_dump(result_dict[log_header], fd, ctx.debug_mode)
+
+        # 3. write per PHY register dump, nav bar for per PHY sections is put before them
+        fd.write(phy_nav_tab)
+        for log_header in per_phy_header_list:
+            if result_dict[log_header] is not None:
+                self._save_per_phy_reg_dump(result_dict[log_header], fd, ctx.debug_mode)
+
+        # 4. write html ending
+        fd.write(ohtml.get_top_level_ending())
 
-        ''' Do NOT modify anything below this line.
+    def save_reg_dump_records(self, writer, result_dict):
+        ''' Write result of decode_reg_dump() as records
+            @param writer: ut.RecordWriter
+            @param result_dict: result_dict returned by decode_reg_dump()
+        '''
+        section_dict = dict((log_header, section) for section, log_header in self.SECTION_KEY_DICT.items())
+        for log_header, result in result_dict.items():
+            if result is None:
+                continue
+            section = section_dict[log_header]
+            # empty for per OSSP section
+            phy_ossp_dict = dict((phy_id, ossp_id) for ossp_id, phy_list in result.ossp_phy_list for phy_id in phy_list)
+            for reg_dump_id, (dump_reg_list, decoded_reg_dict) in result.reg_dump_dict.items():
+                if reg_dump_id in phy_ossp_dict:
+                    ut.save_decoded_reg_dict_to_records(decoded_reg_dict, writer, section=section, \
+                    ossp=phy_ossp_dict[reg_dump_id], phy=reg_dump_id)
+                else:
+                    ut.save_decoded_reg_dict_to_records(decoded_reg_dict, writer, section=section, ossp=reg_dump_id)
+            if result.common_reg_dump is not None:
+                ut.save_decoded_reg_dict_to_records(result.common_reg_dump[1], writer, section=section, common=True)
+
+    def decode(self, ctx, section_list=None, out_format=ut.FORMAT_HTML, sqlite_db=None):
+        ''' Decode a dump file and save the result in an html file, or a records file
+            @param ctx: ut.ParseContext of dump file to decode
+            @param section_list: optional, list of keys in SECTION_KEY_DICT, decode all sections if None
+            @param out_format: optional, one of ut.FORMAT_LIST
+            @param sqlite_db: optional, path to SQLite database to save records to instead of a file
+            @return tuple of [found_log_flag, section_found_list, out_path], where section_found_list
+                    is list of [log_header, found_flag], out_path is path to result file or
+                    SQLite database, or None if nothing is saved
         '''
+        tag = ut.get_debug_tags(None, self.MODULE, self.SECTION, 'run')[0]
+        print(tag + 'parser starts')
+
+        per_ossp_log_dict, per_phy_log_dict = self.get_def_dict(ctx.debug_mode, section_list)
 
+        ''' Do NOT modify anything below this line.
+        '''
         # get output filename base on input file and output dir
-        filename = ut.get_parsed_filename(in_file, self.MODULE, self.SECTION) + '.html'
-        filename = os.path.join(out_dir, filename)
+        if sqlite_db is not None:
+            filename = sqlite_db
+        else:
+            filename = ctx.get_out_filename(self.MODULE, self.SECTION, '.' + out_format)
 
         # Main parser logic starts here
-        found_log_flag = False
-
-        # 1. read input dump file
-        dump_file = ut.get_data_from_file(tag_next_level, in_file)
-
-        # 2. get max ossp_phy_list, this is used by html header
-        ossp_phy_list = []
-        for log_header, def_reg_dict in per_phy_log_dict.items():
-            return_ossp_phy_list = self._get_ossp_phy_list(tag_next_level, log_header, dump_file)
-            if ossp_phy_list:
-                if return_ossp_phy_list:
-                    if ut.llen(return_ossp_phy_list, 1) > ut.llen(ossp_phy_list, 1):
-                        ossp_phy_list = return_ossp_phy_list
+        ossp_phy_list, result_dict = self.decode_reg_dump(ctx, per_ossp_log_dict, per_phy_log_dict)
+        section_found_list = [[log_header, result is not None] for log_header, result in result_dict.items()]
+        found_log_flag = any(found_flag for log_header, found_flag in section_found_list)
+
+        if sqlite_db is not None:
+            # dump is recorded in database even if no log is found
+            writer = ut.SqliteWriter(sqlite_db, self.MODULE, ctx.in_file)
+            self.save_reg_dump_records(writer, result_dict)
+            writer.close()
+        elif found_log_flag is True:
+            fd = open(filename, 'w')
+            if out_format != ut.FORMAT_HTML:
+                writer = ut.RecordWriter(fd, out_format, dump=ctx.in_file)
+                self.save_reg_dump_records(writer, result_dict)
+                writer.close()
             else:
-                ossp_phy_list = return_ossp_phy_list
-
-        # 3. write html header
-        fd = open(filename, 'w')
-        fd.write(ohtml.get_top_level_header(in_file, list(per_ossp_log_dict.keys()), \
-            list(per_phy_log_dict.keys()), ossp_phy_list))
-
-        # 4. translate per OSSP register dump and write the result in fd
-        for log_header, def_reg_dict in per_ossp_log_dict.items():
-            if self._decode_per_ossp_reg_dump(tag_next_level, log_header, dump_file, def_reg_dict, fd, 15, debug=debug):
-                found_log_flag = True
-
-        # 5. translate per PHY register dump and write the result in fd
-        ''' TODO: the following line is a bit hacky, it is here
-            to put nav bar at proper position.
-            This must be called after ohtml.get_top_level_header is called.
-            Otherwise global_phy_nav_tab is just an empty str'''
-        fd.write(ohtml.global_phy_nav_tab)
-        for log_header, def_reg_dict in per_phy_log_dict.items():
-            if self._decode_per_phy_reg_dump(tag_next_level, log_header, dump_file, def_reg_dict, fd, debug=debug):
-                found_log_flag = True
-
-        # 6. write html ending
-        fd.write(ohtml.get_top_level_ending())
-        fd.close()
-
-        if found_log_flag is False:
-            os.remove(filename)
-
-        print(tag + 'result is saved in ' + filename)
-        if not ossp_phy_list:
+                self.save_reg_dump(ctx, fd, list(per_ossp_log_dict.keys()), list(per_phy_log_dict.keys()), \
+                ossp_phy_list, result_dict)
+            fd.close()
+
+        out_path = filename if found_log_flag is True or sqlite_db is not None else None
+        if out_path is not None:
+            print(tag + 'result is saved in ' + out_path)
+        if per_phy_log_dict and not ossp_phy_list:
             print(tag + 'Warning, ossp_phy_list is empty, result for all per-phy sections might be wrong.')
         print(tag + 'parser ends')
-        return found_log_flag
+        return found_log_flag, section_found_list, out_path
+
+    def run(self, ctx=None):
+        ''' Run this parser and save the result in an html file
+            @param ctx: optional, ut.ParseContext of dump file to decode,
+                        read input params from sys argv if None
+            @return True if log is found
+        '''
+        section_list = None
+        out_format = ut.FORMAT_HTML
+        sqlite_db = None
+        if ctx is None:
+            argv = ut.DumpArgvWorker()
+            argv.parse()
+            section_list = argv.SECTION_LIST
+            out_format = argv.FORMAT
+            if section_list is not None:
+                try:
+                    self.get_section_header_list(section_list)
+                except ValueError as e:
+                    print('Error, {}'.format(e))
+                    sys.exit(1)
+            if argv.INPUT_LIST:
+                return ut.run_batch(None, self.MODULE, argv.INPUT_LIST, argv.OUTPUT_DIR, argv.JOBS, \
+                decode, (argv.OUTPUT_DIR, argv.DEBUG_MODE, section_list, out_format, argv.SQLITE_DB), \
+                preload, (section_list,))
+            ctx = ut.ParseContext(argv.INPUT_DIR, argv.OUTPUT_DIR, argv.DEBUG_MODE)
+            sqlite_db = argv.SQLITE_DB
+        return self.decode(ctx, section_list, out_format, sqlite_db)[0]
+
+class DecodedRegDump(object):
+    ''' Decoded register dump of an OSSP section '''
+    def __init__(self, log_header):
+        self.log_header = log_header
+        # list of [ossp_id, phy_list] for per PHY section, empty for per OSSP section
+        self.ossp_phy_list = []
+        # dict[ossp_id] for per OSSP section or dict[phy_id] for per PHY section,
+        # value is [dump_reg_list, decoded_reg_dict] of registers with different value
+        # between OSSPs/PHYs, where decoded_reg_dict[reg_addr] = REG.DecodedReg
+        self.reg_dump_dict = collections.OrderedDict()
+        # [dump_reg_list, decoded_reg_dict] of registers with the same value
+        # in all OSSPs/PHYs, None if there is no such register
+        self.common_reg_dump = None
+
+def preload(sections=None):
+    ''' Load OSSP definitions, definitions are cached after loading
+        @param sections: optional, list of keys in OSSPLog.SECTION_KEY_DICT, load all sections if None
+    '''
+    OSSPLog.get_def_dict(False, sections)
+
+def decode(in_file, out_dir, debug=False, sections=None, out_format=ut.FORMAT_HTML, sqlite_db=None, out_name=None):
+    ''' Decode a dump file, see OSSPLog.decode
+        @param out_name: optional, name of the dump used in output filenames, see ut.ParseContext
+    '''
+    return OSSPLog().decode(ut.ParseContext(in_file, out_dir, debug, out_name=out_name), sections, out_format, sqlite_db)
+
+def decode_ossp(source, sections=None, output=None, debug_mode=False, output_format=ut.FORMAT_HTML, sqlite_db=None, \
+def_cache=True):
+    ''' Decode OSSP register dump without reading sys argv. Result is not saved in files,
+        but parsed definitions are cached on disk(see ut.DefCache) unless def_cache is False
+        @param source: path to dump file, dump content in bytes, or a file-like object
+        @param sections: optional, list of keys in OSSPLog.SECTION_KEY_DICT, decode all sections if None
+        @param output: optional, file-like object to write result to
+        @param debug_mode: optional, True to print out addition log
+        @param output_format: optional, format of result written to output, one of ut.FORMAT_LIST
+        @param sqlite_db: optional, path to SQLite database to save records to, output is not used if given
+        @param def_cache: optional, False to not read or write definition cache files in this call
+        @return OrderedDict, key is section key, value is DecodedRegDump of that section,
+                or None if that section is not found in dump
+    '''
+    previous_def_cache = ut.DefCache.set_enable(ut.DefCache.ENABLE and def_cache)
+    try:
+        return _decode_ossp(source, sections, output, debug_mode, output_format, sqlite_db)
+    finally:
+        ut.DefCache.set_enable(previous_def_cache)
+
+def _decode_ossp(source, sections, output, debug_mode, output_format, sqlite_db):
+    ''' Decode OSSP register dump, see decode_ossp '''
+    in_file, data = ut.read_dump_source(source)
+    ctx = ut.ParseContext(in_file, '', debug_mode, data=data)
+    this = OSSPLog()
+    per_ossp_log_dict, per_phy_log_dict = this.get_def_dict(debug_mode, sections)
+    ossp_phy_list, result_dict = this.decode_reg_dump(ctx, per_ossp_log_dict, per_phy_log_dict)
+    if sqlite_db is not None:
+        writer = ut.SqliteWriter(sqlite_db, this.MODULE, in_file)
+        this.save_reg_dump_records(writer, result_dict)
+        writer.close()
+    elif output is not None:
+        if output_format != ut.FORMAT_HTML:
+            writer = ut.RecordWriter(output, output_format, dump=in_file)
+            this.save_reg_dump_records(writer, result_dict)
+            writer.close()
+        else:
+            this.save_reg_dump(ctx, output, list(per_ossp_log_dict.keys()), list(per_phy_log_dict.keys()), \
+            ossp_phy_list, result_dict)
+    section_result_dict = collections.OrderedDict()
+    for section, log_header in OSSPLog.SECTION_KEY_DICT.items():
+        if log_header in result_dict:
+            section_result_dict[section] = result_dict[log_header]
+    return section_result_dict
 
 def run():
     this = OSSPLog()
@@ -0,0 +1,339 @@
+import os
+import stat
+import json
+import errno
+import time
+import socket
+import argparse
+import threading
+import traceback
+import multiprocessing
+try:
+    import socketserver
+except ImportError:
+    import SocketServer as socketserver
+from .shared import dutil as ut
+from .msgu import msgu_log
+from .ossp import ossp_log
+
+MODULE_NAME = 'server'
+
+# parsers that can be requested
+PARSER_LIST = ['msgu', 'ossp']
+# output formats that can be requested
+FORMAT_LIST = ut.FORMAT_LIST
+
+''' Protocol: client sends one json request per line, server replies one json response per line.
+    Decode request:
+        {"parser": "msgu" or "ossp", "input": path to dump file, "output_dir": optional path to output dir,
+         "sections": optional list of section keys, "format": optional output format,
+         "sqlite": optional path to SQLite database to save result to instead of files,
+         "workspace": optional path to BC workspace(msgu only), "debug": optional true/false}
+    Other requests:
+        {"command": "ping"} or {"command": "shutdown"}
+    Response:
+        {"ok": true, "found": true/false, "sections": [[section, found_flag], ...], "output_dir": path,
+         "output": path to result or null if nothing is saved, "time": seconds},
+        where output_dir is path to SQLite database if "sqlite" is given
+        or {"ok": false, "error": error message}
+'''
+
+def preload(workspace=''):
+    ''' Load all definitions, called once in server and once in each worker
+        @param workspace: optional, path to BC workspace for MSGU FW log header file
+    '''
+    msgu_log.preload(workspace)
+    ossp_log.preload()
+
+def _decode_request(request):
+    ''' Decode one dump file in a worker process
+        @param request: decode request in dict
+        @return response in dict
+    '''
+    try:
+        parser = request.get('parser')
+        if parser not in PARSER_LIST:
+            raise ValueError('Unknown parser [{}], valid parsers are {}'.format(parser, PARSER_LIST))
+        in_file = request.get('input')
+        if not in_file or not os.path.isfile(in_file):
+            raise ValueError('[{}] is not a valid input file'.format(in_file))
+        out_format = request.get('format') or FORMAT_LIST[0]
+        if out_format not in FORMAT_LIST:
+            raise ValueError('Unknown format [{}], valid formats are {}'.format(out_format, FORMAT_LIST))
+        out_dir = request.get('output_dir') or os.path.dirname(os.path.abspath(in_file))
+        try:
+            os.makedirs(out_dir)
+        except OSError as e:
+            # another worker may create the same output dir at the same time
+            if e.errno != errno.EEXIST or not os.path.isdir(out_dir):
+                raise
+        sections = request.get('sections')
+        sqlite_db = request.get('sqlite') or None
+        debug_mode = request.get('debug') is True
+
+        start_time = time.time()
+        if parser == 'msgu':
+            found_log_flag, section_found_list, out_path = msgu_log.decode(in_file, out_dir, debug_mode, \
+            request.get('workspace') or '', 1, sections, out_format, sqlite_db)
+        else:
+            found_log_flag, section_found_list, out_path = ossp_log.decode(in_file, out_dir, debug_mode, sections, \
+            out_format, sqlite_db)
+        return {'ok': True, 'found': found_log_flag, 'sections': section_found_list, \
+        'output_dir': sqlite_db or out_dir, 'output': out_path, 'time': time.time() - start_time}
+    except Exception:
+        return {'ok': False, 'error': traceback.format_exc()}
+
+class _DecodeHandler(socketserver.StreamRequestHandler):
+    ''' Handle requests on one connection, a connection can send many requests '''
+    def handle(self):
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                break
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                request = json.loads(line.decode('utf-8'))
+                if not isinstance(request, dict):
+                    raise ValueError('request must be a json object')
+            except ValueError as e:
+                self._reply({'ok': False, 'error': 'Invalid request: {}'.format(e)})
+                continue
+            command = request.get('command')
+            if command == 'ping':
+                self._reply({'ok': True})
+            elif command == 'shutdown':
+                self._reply({'ok': True})
+                # shutdown() waits for serve_forever() to exit, so call it from another thread
+                threading.Thread(target=self.server.shutdown).start()
+                break
+            else:
+                self._reply(self.server.decode(request))
+
+    def _reply(self, response):
+        self.wfile.write((json.dumps(response) + '\n').encode('utf-8'))
+        self.wfile.flush()
+
+class DecodeServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    ''' Decode server on a Unix socket. Definitions are loaded once and kept in worker processes,
+        each connection is handled in its own thread and requests are decoded by the process pool.
+    '''
+    daemon_threads = True
+
+    def __init__(self, socket_path, jobs=1, workspace=''):
+        ''' @param socket_path: path to Unix socket, an existing socket file is replaced
+                                if no server is listening on it
+            @param jobs: optional, number of worker processes
+            @param workspace: optional, path to BC workspace for MSGU FW log header file to preload
+        '''
+        tag = ut.get_debug_tags(None, MODULE_NAME, None, 'init')[0]
+        if os.path.exists(socket_path):
+            if not stat.S_ISSOCK(os.stat(socket_path).st_mode):
+                raise ValueError('[{}] exists and is not a socket'.format(socket_path))
+            if self._is_socket_alive(socket_path):
+                raise ValueError('a server is already listening on [{}]'.format(socket_path))
+            # stale socket file left by a server that is not running
+            os.remove(socket_path)
+        self.socket_path = socket_path
+        self.pool = None
+        # socket file is removed on close only if this server has bound it
+        self.socket_bound = False
+        # bind before starting workers, a failed bind closes the server and raises here
+        socketserver.UnixStreamServer.__init__(self, socket_path, _DecodeHandler)
+        self.socket_bound = True
+        start_time = time.time()
+        try:
+            # load definitions once, workers forked after this inherit them
+            preload(workspace)
+            self.pool = multiprocessing.Pool(jobs, preload, (workspace,))
+        except BaseException:
+            self.server_close()
+            raise
+        print(tag + 'definitions loaded in {:.2f} s, {} worker(s)'.format(time.time() - start_time, jobs))
+
+    @classmethod
+    def _is_socket_alive(cls, socket_path):
+        ''' @return True if a server accepts connections on socket_path '''
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(socket_path)
+        except socket.error as e:
+            if e.errno in (errno.ECONNREFUSED, errno.ENOENT):
+                return False
+            raise
+        finally:
+            sock.close()
+        return True
+
+    def decode(self, request):
+        ''' Decode a request by the process pool, block until it is done
+            @param request: decode request in dict
+            @return response in dict
+        '''
+        tag = ut.get_debug_tags(None, MODULE_NAME, None, 'decode')[0]
+        print(tag + 'decode {} for {}'.format(request.get('input'), request.get('parser')))
+        return self.pool.apply(_decode_request, (request,))
+
+    def server_close(self):
+        ''' @Override '''
+        socketserver.UnixStreamServer.server_close(self)
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+        if self.socket_bound is True:
+            self.socket_bound = False
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+
+def serve(socket_path, jobs=1, workspace=''):
+    ''' Run decode server until shutdown request or Ctrl-C
+        @param socket_path: path to Unix socket
+        @param jobs: optional, number of worker processes
+        @param workspace: optional, path to BC workspace for MSGU FW log header file to preload
+    '''
+    tag = ut.get_debug_tags(None, MODULE_NAME, None, 'serve')[0]
+    server = DecodeServer(socket_path, jobs, workspace)
+    print(tag + 'listening on ' + socket_path)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    print(tag + 'stopped')
+
+class DecodeClient(object):
+    ''' One connection to decode server, requests are sent one by one on the connection '''
+    def __init__(self, socket_path):
+        ''' @param socket_path: path to Unix socket of decode server '''
+        self.socket_path = socket_path
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self.sock.connect(socket_path)
+        except Exception:
+            self.sock.close()
+            raise
+        self.fd = self.sock.makefile('rb')
+
+    def submit(self, request):
+        ''' Send a request and wait for the response
+            @param request: request in dict
+            @return response in dict
+        '''
+        self.sock.sendall((json.dumps(request) + '\n').encode('utf-8'))
+        line = self.fd.readline()
+        if not line:
+            raise IOError('No response from server on [{}]'.format(self.socket_path))
+        return json.loads(line.decode('utf-8'))
+
+    def close(self):
+        self.fd.close()
+        self.sock.close()
+
+def submit(socket_path, request):
+    ''' Send a request to decode server on a new connection and wait for the response
+        @param socket_path: path to Unix socket of decode server
+        @param request: request in dict
+        @return response in dict
+    '''
+    client = DecodeClient(socket_path)
+    try:
+        return client.submit(request)
+    finally:
+        client.close()
+
+def run_server():
+    ''' Run decode server with params from sys argv '''
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--socket', help='path to Unix socket to listen on', required=True)
+    parser.add_argument('-j', '--jobs', help='number of worker processes', type=int, \
+    default=multiprocessing.cpu_count())
+    parser.add_argument('-w', '--workspace', help='path to BaseCode workspace, its FW log header file is preloaded', default='')
+    args = parser.parse_args()
+    serve(args.socket, max(1, args.jobs), args.workspace)
+    return True
+
+def run_client():
+    ''' Submit decode requests to decode server with params from sys argv,
+        dump files are submitted on -j connections in parallel, one by one on each connection
+        @return True if log is found in any of the files
+    '''
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--socket', help='path to Unix socket of decode server', required=True)
+    parser.add_argument('parser', help='parser to run', choices=PARSER_LIST + ['ping', 'shutdown'])
+    parser.add_argument('-i', '--inFile', help='path to input dump file(s)', nargs='+', default=[])
+    parser.add_argument('-o', '--outDir', help='path to output folder for result')
+    parser.add_argument('-w', '--workspace', help='path to BaseCode workspace')
+    parser.add_argument('--sections', help='comma separated sections to decode, decode all sections if not given')
+    parser.add_argument('--format', help='output format', choices=FORMAT_LIST, default=FORMAT_LIST[0])
+    parser.add_argument('--sqlite', help='path to SQLite database to save result to instead of files')
+    parser.add_argument('-d', '--debug', help='enable additional log', dest='debug_mode', action='store_true')
+    parser.add_argument('-j', '--jobs', help='number of requests in progress at the same time', type=int, \
+    default=multiprocessing.cpu_count())
+    args = parser.parse_args()
+
+    if args.parser in ['ping', 'shutdown']:
+        response = submit(args.socket, {'command': args.parser})
+        print(json.dumps(response))
+        return response.get('ok') is True
+    if not args.inFile:
+        parser.error('-i/--inFile is required for parser ' + args.parser)
+
+    # server may run in another dir, so send absolute paths
+    request_list = []
+    for in_file in args.inFile:
+        request_list.append({'parser': args.parser, 'input': os.path.abspath(in_file), \
+        'output_dir': os.path.abspath(args.outDir) if args.outDir else None, \
+        'sections': ut.get_section_list(args.sections), 'format': args.format, \
+        'sqlite': os.path.abspath(args.sqlite) if args.sqlite else None, \
+        'workspace': os.path.abspath(args.workspace) if args.workspace else '', 'debug': args.debug_mode})
+    response_list = [None] * len(request_list)
+    # index of next request to send, shared by all connections
+    next_idx_list = [0]
+    # error of connections that cannot be opened
+    connect_error_list = []
+    lock = threading.Lock()
+
+    def _submit():
+        idx = None
+        try:
+            client = DecodeClient(args.socket)
+            try:
+                while True:
+                    with lock:
+                        idx = next_idx_list[0]
+                        if idx >= len(request_list):
+                            return
+                        next_idx_list[0] += 1
+                    response_list[idx] = client.submit(request_list[idx])
+            finally:
+                client.close()
+        except (IOError, socket.error) as e:
+            if idx is None:
+                connect_error_list.append(str(e))
+            elif idx < len(request_list):
+                response_list[idx] = {'ok': False, 'error': str(e)}
+
+    thread_list = [threading.Thread(target=_submit) for idx in range(min(max(1, args.jobs), len(request_list)))]
+    for thread in thread_list:
+        thread.start()
+    for thread in thread_list:
+        thread.join()
+
+    found_log_flag = False
+    for request, response in zip(request_list, response_list):
+        if response is None:
+            # all connections failed before this request is sent
+            response = {'ok': False, 'error': 'request not sent, cannot connect to server on [{}]: {}'.format(args.socket, \
+            connect_error_list[-1] if connect_error_list else 'unknown error')}
+        if response.get('ok') is not True:
+            print('{}: error\n{}'.format(request['input'], response.get('error', '').rstrip()))
+            continue
+        if response.get('found') is True:
+            found_log_flag = True
+        found_list = [section for section, found_flag in response['sections'] if found_flag is True]
+        print('{}: found [{}], result is saved in {}, {:.2f} s'.format(request['input'], \
+        ', '.join(found_list), response.get('output') or response['output_dir'], response['time']))
+    return found_log_flag
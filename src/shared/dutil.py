@@ -3,14 +3,33 @@ import sys
 import os
 import argparse
 import re
+import json
+import sqlite3
+import numbers
 import ntpath
+import collections
 import operator
-import itertools
+import mmap
+import array
+import binascii
+import pickle
+import hashlib
+import glob
+import time
+import traceback
+import multiprocessing
 from datetime import datetime
 from random import randint
 from functools import reduce
 
 MODULE_NAME = 'dutil'
+
+# output formats of decoded result
+FORMAT_HTML = 'html'
+FORMAT_NDJSON = 'ndjson'
+FORMAT_JSON = 'json'
+FORMAT_LIST = [FORMAT_HTML, FORMAT_NDJSON, FORMAT_JSON]
+
 def get_debug_tags(tag_upper_level, module, section, func_name):
     ''' Get data from a input file and split data on line
         @param tag_upper_level: Nullable tag from caller
@@ -53,6 +72,21 @@ def get_filename(path):
     head, tail = ntpath.split(path)
     return tail or ntpath.basename(head)
 
+try:
+    _intern = intern
+except NameError:
+    _intern = sys.intern
+
+def intern_text(text):
+    ''' Intern a str read from definition file, so equal names and meanings share one object
+        @param text: str to intern
+        @return interned str, or text itself if it cannot be interned, such as unicode in python 2
+    '''
+    try:
+        return _intern(text)
+    except TypeError:
+        return text
+
 def get_timestamp():
     ''' Get the current timestamp
         @return: a str of current timestamp
@@ -61,6 +95,10 @@ def get_timestamp():
     '''
     return datetime.now().strftime('%Y_%m_%d_%H_%M_%S')
 
+# prefix of output files, files with these prefixes are not taken as input in batch mode
+PARSED_FILE_PREFIX = 'decoded_'
+BATCH_SUMMARY_PREFIX = 'batch_summary_'
+
 def get_parsed_filename(filepath, module, section=None):
     ''' Get output filename based on full filepath to input dump file,
         module name and section name. A timestamp is attached too.
@@ -71,7 +109,7 @@ def get_parsed_filename(filepath, module, section=None):
     '''
     filename = get_filename(filepath)
     timestamp = get_timestamp()
-    decoded = 'decoded_'
+    decoded = PARSED_FILE_PREFIX
     if '.' in filename:
         head = filename.split('.')[0]
     else:
@@ -81,6 +119,19 @@ def get_parsed_filename(filepath, module, section=None):
     else:
         return decoded + module + '_' + section + '_' + head + '_' + timestamp
 
+def get_unique_filename(filename, ext):
+    ''' Get a path to a file that does not exist yet
+        @param filename: path to file without extension
+        @param ext: extension of file, such as '.html'
+        @return filename + ext, or filename + '_N' + ext if filename + ext already exists
+    '''
+    path = filename + ext
+    idx = 1
+    while os.path.exists(path):
+        path = '{}_{}{}'.format(filename, idx, ext)
+        idx += 1
+    return path
+
 def add_mark_to_word(word, mark, interval, from_left=False):
     ''' Add a given mark to a str at given interval
         @param word: a word in str format
@@ -143,24 +194,49 @@ def replace_word_in_line_from_logh(word_list, first_log_word_idx, line_from_log_
         @return line_from_log_h: with 0x%x, %u, %d, %08x etc replaced by word
                                  in word_list
     '''
-    need_replace = re.compile('%([ud]{1})|0x0[1-8]x|(0x)?%(0[1-8])?x')
-    is_decimal = re.compile('%([ud]{1})')
-    # replace %u/d/x one by one, from left to right
-    idx = first_log_word_idx
-    while idx < len(word_list):
-        # Replace %u, %d, %0(x0[1-8])x with [word]
-        match_from_left = need_replace.search(line_from_log_h)
-        if match_from_left is not None:
-            word = match_from_left.group(0)
-            if is_decimal.search(word) is not None:
-                new_word = str(int(word_list[idx], 16))
+    return LogFormat(line_from_log_h).render(word_list, first_log_word_idx)
+
+class LogFormat(object):
+    ''' A line from .h file compiled to literal fragments and slots for 0x%x, %u, %d, %08x etc,
+        so a log can be translated by a single join.
+    '''
+    re_slot = re.compile('%([ud]{1})|0x0[1-8]x|(0x)?%(0[1-8])?x')
+
+    def __init__(self, line_from_log_h):
+        ''' @param line_from_log_h: a line from .h file '''
+        self.line_from_log_h = line_from_log_h
+        # literal fragments around slots, there is one more fragment than slots
+        self.fragment_list = []
+        # True if a slot is %u or %d, otherwise the slot is hex
+        self.is_decimal_list = []
+        pos = 0
+        for match in self.re_slot.finditer(line_from_log_h):
+            self.fragment_list.append(line_from_log_h[pos:match.start()])
+            self.is_decimal_list.append(match.group(1) is not None)
+            pos = match.end()
+        self.fragment_list.append(line_from_log_h[pos:])
+
+    def render(self, word_list, first_log_word_idx):
+        ''' Fill slots by word in a list from left to right
+            @param word_list: word list stores word in hex
+            @param first_log_word_idx: offset in word list, things stored in word_list
+                                       before this idx is dummy to this function
+            @return translated line, slot without a word is replaced by 'Unknown'
+        '''
+        fragment_list = self.fragment_list
+        line_list = [fragment_list[0]]
+        idx = first_log_word_idx
+        for slot_idx, is_decimal in enumerate(self.is_decimal_list):
+            if idx < len(word_list):
+                if is_decimal is True:
+                    line_list.append(str(int(word_list[idx], 16)))
+                else:
+                    line_list.append(''.join(['0x', word_list[idx]]))
+                idx += 1
             else:
-                new_word = '0x' + word_list[idx]
-            line_from_log_h = need_replace.sub(new_word, line_from_log_h, 1)
-        else:
-            break
-        idx += 1
-    return need_replace.sub('Unknown', line_from_log_h)
+                line_list.append('Unknown')
+            line_list.append(fragment_list[slot_idx + 1])
+        return ''.join(line_list)
 
 def create_def_list_from_logh(tag, filename, definition_prefix, verbose=False):
     ''' Get definition list from a header file
@@ -198,6 +274,16 @@ def create_def_list_from_logh(tag, filename, definition_prefix, verbose=False):
         print(tag + 'end of def_list.')
     return def_list
 
+def create_log_format_list_from_logh(tag, filename, definition_prefix, verbose=False):
+    ''' Get list of compiled LogFormat from a header file
+        @param tag: tag from caller
+        @param filename: filename to the header file
+        @param definition_prefix: prefix to entry in the header file
+        @param verbose: optional, print additional log if True
+        @return list of LogFormat, index is the same as definition list created from the header file
+    '''
+    return [LogFormat(line) for line in create_def_list_from_logh(tag, filename, definition_prefix, verbose)]
+
 def get_scsi_code_dict(tag, section, def_file_dir, verbose=False):
     ''' Get defined SCSI code from definition file and save the result to a dict
         @param tag: tag from caller
@@ -226,19 +312,11 @@ def get_scsi_code_dict(tag, section, def_file_dir, verbose=False):
             scsi_code_dict[scsi_code] = scsi_name
     return scsi_code_dict
 
-def save_line_to_list(tag, header, ending, filename, line_length, debug = True, dump_file = None):
-    ''' Save lines that are under a section from log to a list.
-        @params tag: tag from caller
-        @params header: starting line belongs to this section
-        @params ending: last line belongs to this section
-        @params filename: path to input file. Not used if dump_file is not None.
-        @params line_length: how long an expected line is under this section
-        @params debug: Optional debug info
-        @params dump_file: Optional opened input file, param filename not used if dump file is given
-		@return line_list: list of lines of reg_addr reg_val, can be empty
+class SectionLineJoiner(object):
+    ''' Join lines under a section from log into lines of expected length.
+        Lines are fed one by one, so a section can be joined while it is being read,
+        only the last incomplete line is kept between lines.
     '''
-    tag, tag_next_level = get_debug_tags(tag, MODULE_NAME, None, 'save_line_to_list')
-
     # regexp tokens to be removed under the section goes here
     re_token_to_rm_list = []
     # timestamp may appear unexpectly, such as '2017-09-09 12:57:23'
@@ -248,72 +326,82 @@ def save_line_to_list(tag, header, ending, filename, line_length, debug = True,
     re_token_to_rm_list.append(re.compile('Heartbeat wasn\'t running. delta=[0-9]+ seconds'))
     re_token_to_rm_list.append(re.compile('(\(BC:[0-9]+\) )([0-9A-Z]+:).*'))
 
-    line_list = []
-
-    # Use dump_file from caller if exist, otherwise read from filename
-    if dump_file is not None:
-        print(tag + 'Use dump file from caller, input {} is ignored.'.format(filename))
-        lines = dump_file
-    else:
-        lines = get_data_from_file(tag_next_level, filename)
-
-    # Line number starts from 1(can be set to 0)
-    line_num = 1
-    print(tag + 'line number starts from:', line_num)
-
-    # flag_process_line is set to 1 within the desired dump file section
-    flag_process_line = False
-
-    pre_line = ''
+    def __init__(self, tag, header, ending, line_length, debug=True, line_num=1):
+        ''' @param tag: tag printed in front of messages
+            @param header: starting line belongs to this section
+            @param ending: last line belongs to this section
+            @param line_length: how long an expected line is under this section
+            @param debug: optional debug info
+            @param line_num: optional line number of the first line fed
+        '''
+        self.tag = tag
+        self.header = header
+        self.ending = ending
+        self.line_length = line_length
+        self.debug = debug
+        self.line_num = line_num
+        # lines of expected length joined so far, caller can take lines from this list
+        self.line_list = []
+        # flag_process_line is set to True within the desired dump file section
+        self.flag_process_line = False
+        # last line, not added to line_list yet if it is shorter than line_length
+        self.pre_line = ''
 
-    for line in lines:
+    def feed(self, line):
+        ''' Feed next line in log
+            @param line: line without line break
+            @return True if section ending is found, lines after ending do not belong to this section
+        '''
+        tag = self.tag
+        header = self.header
+        ending = self.ending
+        line_length = self.line_length
         if line == header:
-            if flag_process_line is True:
+            if self.flag_process_line is True:
                 # empty everything and begin again
-                line_list = []
-                pre_line = ''
+                self.line_list = []
+                self.pre_line = ''
                 print(tag + 'Warnning, find 2nd section header [' + header+ '] on line ', \
-                line_num, ' before section ending ' + ending)
+                self.line_num, ' before section ending ' + ending)
             else:
                 # begining of desired section, set flag_process_line to True
-                flag_process_line = True
-                print(tag + 'Find section header: ['+ header + '] on line: ', line_num)
-            line_num += 1
+                self.flag_process_line = True
+                print(tag + 'Find section header: ['+ header + '] on line: ', self.line_num)
+            self.line_num += 1
         elif line == ending:
-            if flag_process_line is False:
-                if debug:
+            if self.flag_process_line is False:
+                if self.debug:
                     print(tag + 'Warnning, section ending [' + ending + '] appears on line ', \
-                    line_num, ' before section header [' + header + '], skip this ending')
-                line_num += 1
+                    self.line_num, ' before section header [' + header + '], skip this ending')
+                self.line_num += 1
             else:
                  # ending of desired section, set flag_process_line to False
-                flag_process_line = False
-                print(tag + 'Find section ending: ['+ ending + '] on line: ', line_num)
-                ''' Currently in our dump file, the log is printed out more than one time,
-                    but we only have to process the log once. Therefore break after line
-                    ending is found. '''
-                break
+                self.flag_process_line = False
+                print(tag + 'Find section ending: ['+ ending + '] on line: ', self.line_num)
+                return True
         else:
-            line_num += 1
+            self.line_num += 1
 
         # bug fix: add the following if statement so the line just before header
         # cannot be added to line_list by accident
         if line == header:
-            pre_line = ''
-            continue
+            self.pre_line = ''
+            return False
         # empty line in dump file is ignored, date stamp such as '2017-09-09 12:57:19' is ignored
         if line != '' and line != header and line != ending:
 
             # remove undesired tokens
-            for re_token_rm in re_token_to_rm_list:
+            for re_token_rm in self.re_token_to_rm_list:
                 line = re_token_rm.sub('', line)
             # do not use "line.strip()" because whitespace may from last line and can affect line length
             if line == '':
-                continue
+                return False
 
+            pre_line = self.pre_line
+            line_list = self.line_list
             # only add a line to line_list if the line belongs to the section defined
             # by header and ending
-            if flag_process_line is True:
+            if self.flag_process_line is True:
                 #log $verbose '$tag add line: \[$line]'
                 if len(line) == line_length:
                     # Case 1: line is a completed line, add it
@@ -356,8 +444,45 @@ def save_line_to_list(tag, header, ending, filename, line_length, debug = True,
                     ' exceeds max length, add it to line_list with longer length')
                     line_list.append(line)
             # move to next line
-            pre_line = line
-    return line_list
+            self.pre_line = line
+        return False
+
+def save_line_to_list(tag, header, ending, filename, line_length, debug = True, dump_file = None, line_num = 1):
+    ''' Save lines that are under a section from log to a list.
+        @params tag: tag from caller
+        @params header: starting line belongs to this section
+        @params ending: last line belongs to this section
+        @params filename: path to input file. Not used if dump_file is not None.
+        @params line_length: how long an expected line is under this section
+        @params debug: Optional debug info
+        @params dump_file: Optional opened input file, param filename not used if dump file is given
+        @params line_num: Optional line number of the first line in dump_file
+		@return line_list: list of lines of reg_addr reg_val, can be empty
+    '''
+    tag, tag_next_level = get_debug_tags(tag, MODULE_NAME, None, 'save_line_to_list')
+
+    # Use dump_file from caller if exist, otherwise read from filename
+    dump_reader = None
+    if dump_file is not None:
+        print(tag + 'Use dump file from caller, input {} is ignored.'.format(filename))
+        lines = dump_file
+    else:
+        dump_reader = DumpReader(tag_next_level, filename)
+        lines = dump_reader
+
+    # Line number starts from 1(can be set to 0)
+    print(tag + 'line number starts from:', line_num)
+
+    joiner = SectionLineJoiner(tag, header, ending, line_length, debug, line_num)
+    for line in lines:
+        ''' Currently in our dump file, the log is printed out more than one time,
+            but we only have to process the log once. Therefore break after line
+            ending is found. '''
+        if joiner.feed(line):
+            break
+    if dump_reader is not None:
+        dump_reader.close()
+    return joiner.line_list
 
 def register_walk(first_reg_addr, byte_per_reg, val_per_reg, endianness, log_word_list_idx, log_word_list):
     ''' Generate a [list] of "regAddr-regValue" pairs from [log_word_list],
@@ -485,6 +610,199 @@ def reg_dump_line_to_addr_val_pair(tag, reg_dump_line, endianness, byte_per_reg,
         return []
     return register_walk(first_reg_addr, byte_per_reg, val_per_reg, endianness, 1, log_word_list)
 
+# array typecode for each item size, used to combine reg values in bulk
+_ARRAY_TYPECODE_DICT = {}
+for _typecode in 'BHILQ':
+    try:
+        _ARRAY_TYPECODE_DICT.setdefault(array.array(_typecode).itemsize, _typecode)
+    except ValueError:
+        # 'Q' is not supported before python 3.3
+        pass
+
+def _hex_bytes_to_reg_val_list(raw, endianness, byte_per_reg, byte_per_val):
+    ''' Combine bytes of register values to a list of register values
+        @param raw: bytes of all values in a section, each value is in big endian
+                    as it is printed in dump file
+        @param endianness: 'little' or 'big', order of values in one register
+        @param byte_per_reg: how many bytes are stored statring at a register address
+        @param byte_per_val: how many bytes are stored in one value
+        @return list of reg values
+    '''
+    if endianness == 'little' and byte_per_reg != byte_per_val:
+        # reverse bytes in each value, then all bytes of a register are in little endian
+        data = bytearray(len(raw))
+        for i in range(byte_per_val):
+            data[i::byte_per_val] = raw[byte_per_val - 1 - i::byte_per_val]
+        data_is_big = False
+    else:
+        data = bytearray(raw)
+        data_is_big = True
+    typecode = _ARRAY_TYPECODE_DICT.get(byte_per_reg)
+    if typecode is None:
+        # no native int of this size, convert each register from hex
+        reg_val_list = []
+        for i in range(0, len(data), byte_per_reg):
+            reg_bytes = data[i:i + byte_per_reg]
+            if data_is_big is False:
+                reg_bytes.reverse()
+            reg_val_list.append(int(binascii.hexlify(reg_bytes), 16))
+        return reg_val_list
+    reg_val_array = array.array(typecode)
+    if hasattr(reg_val_array, 'frombytes'):
+        reg_val_array.frombytes(bytes(data))
+    else:
+        reg_val_array.fromstring(bytes(data))
+    if data_is_big != (sys.byteorder == 'big'):
+        reg_val_array.byteswap()
+    return reg_val_array.tolist()
+
+def reg_dump_lines_to_addr_val_list(tag, reg_dump_lines, endianness, byte_per_reg, byte_per_val, val_per_line):
+    ''' Generate a [list] of "regAddr-regValue" pairs from all lines in a register dump section
+        @param tag: tag from caller
+        @param reg_dump_lines: lines of hex code from dump file's register dump
+        @param endianness: 'little' or 'big'
+        @param byte_per_reg: how many bytes are stored statring at this register address
+        @param byte_per_val: how many bytes are stored in one value
+        @param val_per_line: how many values on this line
+        @return: list of "regAddr-regValue" pair, same as calling reg_dump_line_to_addr_val_pair
+                 on each line
+        @note: values of all valid lines are converted to bytes and combined to register
+               values in bulk, a line that does not fit falls back to reg_dump_line_to_addr_val_pair
+    '''
+    val_per_reg = int(byte_per_reg/byte_per_val)
+    if val_per_reg <= 0:
+        raise ValueError(tag + 'val_per_reg/byte_per_val) must > 0')
+    if endianness != 'big' and endianness != 'little':
+        raise AssertionError('In reg_dump_lines_to_addr_val_list, expect endianness to be either "big" or "little", but actual endianness is ' + endianness)
+    pair_list = []
+    # registers do not fit on a line, let register_walk handle the leftover
+    if val_per_line % val_per_reg != 0:
+        for line in reg_dump_lines:
+            pair_list.extend(reg_dump_line_to_addr_val_pair(tag, line, endianness, byte_per_reg, byte_per_val, val_per_line))
+        return pair_list
+
+    # a line fits bulk convert if it has a reg address and val_per_line hex values of byte_per_val bytes
+    re_line_token = re.compile(r'\s*([0-9a-fA-F]+):\s+' + \
+    r'\s+'.join(['([0-9a-fA-F]{%d})' % (byte_per_val << 1)] * val_per_line) + r'\s*$')
+    reg_addr_offset_list = [i * byte_per_reg for i in range(val_per_line // val_per_reg)]
+    # lines waiting for bulk convert
+    batch_addr_list = []
+    batch_hex_list = []
+
+    def flush():
+        if not batch_hex_list:
+            return
+        raw = binascii.unhexlify(''.join(batch_hex_list))
+        reg_val_list = _hex_bytes_to_reg_val_list(raw, endianness, byte_per_reg, byte_per_val)
+        reg_addr_list = [reg_addr + offset for reg_addr in batch_addr_list for offset in reg_addr_offset_list]
+        pair_list.extend([[reg_addr, reg_val] for reg_addr, reg_val in zip(reg_addr_list, reg_val_list)])
+        del batch_addr_list[:]
+        del batch_hex_list[:]
+
+    for line in reg_dump_lines:
+        match = re_line_token.match(line)
+        if match is not None:
+            word_tuple = match.groups()
+            batch_addr_list.append(int(word_tuple[0], 16))
+            batch_hex_list.append(''.join(word_tuple[1:]))
+        else:
+            # keep the order of regs, convert lines before this line first
+            flush()
+            pair_list.extend(reg_dump_line_to_addr_val_pair(tag, line, endianness, byte_per_reg, byte_per_val, val_per_line))
+    flush()
+    return pair_list
+
+class LRUCache(object):
+    ''' Bounded cache, least recently used item is dropped first when the cache is full '''
+    def __init__(self, max_size):
+        ''' @param max_size: max number of items kept '''
+        self.max_size = max_size
+        self.item_dict = collections.OrderedDict()
+
+    def get(self, key):
+        ''' @return value of key, or None if not found '''
+        value = self.item_dict.pop(key, None)
+        if value is not None:
+            # put it back as the most recently used one
+            self.item_dict[key] = value
+        return value
+
+    def put(self, key, value):
+        ''' @param key: key of item
+            @param value: value of item, must not be None
+        '''
+        self.item_dict[key] = value
+        if len(self.item_dict) > self.max_size:
+            self.item_dict.popitem(last=False)
+
+    def __len__(self):
+        return len(self.item_dict)
+
+    def clear(self):
+        self.item_dict.clear()
+
+class BitField(object):
+    ''' Bit position compiled to shift, mask and width, so a bit field
+        can be extracted from a num without parsing the position again.
+    '''
+    def __init__(self, position):
+        ''' @param position: a single bit position or in "high:low" format '''
+        self.position = position
+        width = 0
+        if type(position) is str:
+            if ':' in position:
+                hi, low = position.split(':')
+                hi = int(hi)
+                low = int(low)
+                if hi < low:
+                    raise ValueError('position must be a single number or in "high:low" format')
+                width = hi - low + 1
+                shift = low
+            else:
+                shift = int(position)
+        else:
+            shift = position
+        self.shift = shift
+        # bit_shift only supports max 64 bit shift
+        self.is_out_of_range = shift > 63
+        if width == 0:
+            self.mask = 1
+            self.width = 1
+            self.bin_format = '01b'
+        else:
+            self.mask = ~(~0 << width)
+            self.width = width
+            # format length of bin(keep leading 0s)
+            self.bin_format = '0{}b'.format(width)
+
+    def extract(self, num):
+        ''' @return value of this bit field in num '''
+        if self.is_out_of_range is True:
+            return num
+        return (num >> self.shift) & self.mask
+
+    def get(self, num):
+        ''' @return tuple of [val, val_in_bin_str], same as bit_shift(num, position) '''
+        if self.is_out_of_range is True:
+            print('support max 64 bit shift, return the original num')
+            return num, format(num, '064b')
+        num_ret = (num >> self.shift) & self.mask
+        return num_ret, format(num_ret, self.bin_format)
+
+# compiled bit fields, key is bit position
+BIT_FIELD_CACHE_SIZE = 1 << 12
+_bit_field_cache = LRUCache(BIT_FIELD_CACHE_SIZE)
+def get_bit_field(position):
+    ''' Get compiled bit field for a bit position, recently used positions are not compiled again
+        @param position: a single bit position or in "high:low" format
+        @return BitField for position
+    '''
+    bit_field = _bit_field_cache.get(position)
+    if bit_field is None:
+        bit_field = BitField(position)
+        _bit_field_cache.put(position, bit_field)
+    return bit_field
+
 def bit_shift(num, position):
     ''' Shift a num to the right by position
         @param num: num to be shifted
@@ -494,37 +812,7 @@ def bit_shift(num, position):
             bit_shift(32, '5:3') output [4, '100'] (32 is 0010_0000)
             bit_shift(32, 5) output [1, '1']
     '''
-    mask = 0
-    flag_mask = False
-    len = 0
-    if type(position) is str:
-        if ':' in position:
-            hi, low = position.split(':')
-            hi = int(hi)
-            low = int(low)
-            len = hi - low + 1
-            if hi >= low:
-                flag_mask = True
-                mask = ~(~0 << (len))
-                shift = low
-            else:
-                raise ValueError('position must be a single number or in "high:low" format')
-        else:
-            shift = int(position)
-    else:
-        shift = position
-    if shift > 63:
-        print('support max 64 bit shift, return the original num')
-        return num, format(num, '064b')
-
-    if flag_mask is False:
-        num_ret = (num & (1 << shift)) >> (shift)
-        return num_ret, format(num_ret, '01b') 
-    else:
-        # format length of bin(keep leading 0s)
-        format_arg = '0{}b'.format(len)
-        num_ret = (num >> shift) & mask
-        return num_ret, format(num_ret, format_arg)
+    return get_bit_field(position).get(num)
 
 def handle_logic_token(str_val, raw_meaning):
     ''' Compare str_val and raw_meaning
@@ -541,13 +829,171 @@ def handle_logic_token(str_val, raw_meaning):
              11: aaa'
             return: 'yyy'
     '''
-    re_val = re.compile(''.join([str_val, ':']))
+    logic_val = ''.join([str_val, ':'])
     for line in raw_meaning.splitlines():
-        if re_val.match(line) is not None:
+        if line.startswith(logic_val):
             #print("handle logic " + line)
-            return re_val.sub('', line)
+            return line.replace(logic_val, '')
     return raw_meaning
 
+# value of a line in 'When set to logic' table, for example '01:' in '01: yyy'
+_re_logic_val = re.compile('([01]+):')
+
+class BitMeaning(object):
+    ''' Bit description compiled to a template.
+        'When set to logic' table is split to a dict of bin str to meaning, and hex/decimal
+        tokens are located once, so rendering a meaning does not need any regular expression.
+    '''
+    # kind of a fragment in a template
+    LITERAL = 0
+    HEX = 1
+    DEC = 2
+
+    def __init__(self, raw_meaning):
+        ''' @param raw_meaning: bit description read from def file '''
+        self.raw_meaning = raw_meaning
+        self.template = self._compile(raw_meaning)
+        # key is bin str, value is template for the matched line
+        self.logic_dict = None
+        if XMLREToken.re_logic.search(raw_meaning) is not None:
+            self.logic_dict = {}
+            for line in raw_meaning.splitlines():
+                match = _re_logic_val.match(line)
+                if match is not None and match.group(1) not in self.logic_dict:
+                    self.logic_dict[match.group(1)] = self._compile(line.replace(match.group(0), ''))
+
+    @classmethod
+    def _compile(cls, text):
+        ''' @return text if it has no hex/decimal token, otherwise list of [kind, text] fragments '''
+        fragment_list = []
+        pos = 0
+        for match in XMLREToken.re_value_token.finditer(text):
+            if match.start() > pos:
+                fragment_list.append([cls.LITERAL, text[pos:match.start()]])
+            if match.group('hex') is not None:
+                fragment_list.append([cls.HEX, match.group(0)])
+            else:
+                fragment_list.append([cls.DEC, match.group(0)])
+            pos = match.end()
+        if not fragment_list:
+            return text
+        if pos < len(text):
+            fragment_list.append([cls.LITERAL, text[pos:]])
+        return fragment_list
+
+    def render(self, bit_val, bit_val_str):
+        ''' Get meaning of this bit for a value, same as handling logic, hex and decimal tokens
+            on raw meaning by regular expression
+            @param bit_val: value of the bit field
+            @param bit_val_str: value of the bit field in bin str
+            @return meaning of this bit
+        '''
+        template = self.template
+        if self.logic_dict is not None:
+            template = self.logic_dict.get(bit_val_str, template)
+        if not isinstance(template, list):
+            return template
+        meaning_list = []
+        for kind, text in template:
+            if kind == self.LITERAL:
+                meaning_list.append(text)
+            elif kind == self.HEX:
+                hex_digit = len(bit_val_str) >> 2
+                if (len(bit_val_str) % 4) != 0:
+                    hex_digit += 1
+                meaning_list.append(''.join(['0x', format(bit_val, '0%dx' % hex_digit)]))
+            else:
+                meaning_list.append(str(bit_val))
+        return ''.join(meaning_list)
+
+# compiled bit meanings, key is raw meaning. Meanings expanded by reg value, such as
+# HWA queue expansion and HQA status, are compiled here too, so the cache is bounded
+BIT_MEANING_CACHE_SIZE = 1 << 14
+_bit_meaning_cache = LRUCache(BIT_MEANING_CACHE_SIZE)
+def get_bit_meaning(raw_meaning):
+    ''' Get compiled bit meaning for a raw meaning, recently used raw meanings are not compiled again
+        @param raw_meaning: bit description read from def file
+        @return BitMeaning for raw_meaning
+    '''
+    bit_meaning = _bit_meaning_cache.get(raw_meaning)
+    if bit_meaning is None:
+        bit_meaning = BitMeaning(raw_meaning)
+        _bit_meaning_cache.put(raw_meaning, bit_meaning)
+    return bit_meaning
+
+class DecodeMemo(object):
+    ''' Bounded LRU memo of decoded bits. A result is keyed by id of the definition it is decoded from
+        and values it depends on, such as reg address and reg value. Definition is kept with the result,
+        so a result is never returned for another definition that reuses the id.
+    '''
+    def __init__(self, max_size):
+        ''' @param max_size: max number of results kept, least recently used result is dropped first '''
+        self.max_size = max_size
+        self.memo_dict = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, definition, key):
+        ''' @param definition: definition object the result is decoded from
+            @param key: tuple of values the result depends on
+            @return result, or None if not found
+        '''
+        full_key = (id(definition),) + key
+        entry = self.memo_dict.pop(full_key, None)
+        if entry is None or entry[0] is not definition:
+            self.misses += 1
+            return None
+        # put it back as the most recently used one
+        self.memo_dict[full_key] = entry
+        self.hits += 1
+        return entry[1]
+
+    def put(self, definition, key, result):
+        ''' @param definition: definition object the result is decoded from
+            @param key: tuple of values the result depends on
+            @param result: decoded result, must not be modified after this call
+        '''
+        self.memo_dict[(id(definition),) + key] = (definition, result)
+        if len(self.memo_dict) > self.max_size:
+            self.memo_dict.popitem(last=False)
+
+    def get_stats(self):
+        ''' @return tuple of [hits, misses, size] '''
+        return self.hits, self.misses, len(self.memo_dict)
+
+    def clear(self):
+        self.memo_dict.clear()
+        self.hits = 0
+        self.misses = 0
+
+# memo of decoded bits shared by all sections and all dumps decoded in this process
+DECODE_MEMO_SIZE = 1 << 16
+decode_memo = DecodeMemo(DECODE_MEMO_SIZE)
+
+def decode_reg_bits(def_reg, reg_val, meaning_cb=None):
+    ''' Decode bits of a register by its definition, result is memoized in decode_memo
+        @param def_reg: struct.DefReg with bit des
+        @param reg_val: reg value
+        @param meaning_cb: optional, meaning_cb(def_reg, bit_pos, bit_val_str) returns BitMeaning of a bit,
+                           use compiled meaning in def_reg if None, result must only depend on its params
+        @return OrderedDict, bit_des_dict[bit_pos] = tuple of [bit_name, bit_val_str, BitMeaning],
+                shared by all callers and must not be modified
+    '''
+    key = (def_reg.reg_address, reg_val)
+    bit_des_dict = decode_memo.get(def_reg, key)
+    if bit_des_dict is not None:
+        return bit_des_dict
+    bit_des_dict = collections.OrderedDict()
+    for bit_pos, (bit_name, raw_bit_meaning) in def_reg.bit_dict.items():
+        bit_val, bit_val_str = def_reg.bit_field_dict[bit_pos].get(reg_val)
+        if meaning_cb is not None:
+            bit_meaning = meaning_cb(def_reg, bit_pos, bit_val_str)
+        else:
+            bit_meaning = def_reg.bit_meaning_dict[bit_pos]
+        bit_des_dict[bit_pos] = (bit_name, intern_text(bit_val_str), bit_meaning)
+    decode_memo.put(def_reg, key, bit_des_dict)
+    return bit_des_dict
+
 def handle_parse_math_token(tag, decoded_reg_dict, verbose = False):
     ''' Replace words between @PARSE_MATH_START@ and @PARSE_MATH_END@ token with computed value.
         words in between math token must be a(+-*/)b, where a/b can be a number or a var name
@@ -572,9 +1018,11 @@ def handle_parse_math_token(tag, decoded_reg_dict, verbose = False):
     re_math_token = re.compile('(@PARSE_MATH_START@)([0-9]+)([\+\-\/\*])([0-9a-zA-Z_\s]+?)(@PARSE_MATH_END@)')
     re_num = re.compile('^[0-9]+$')
     for idx, decoded_reg in decoded_reg_dict.items():
-        if decoded_reg.has_bit_des is True:
-            for bit_pos in decoded_reg.bit_dict.keys():
-                bit_name, bit_val, bit_meaning = decoded_reg.bit_dict[bit_pos]
+        # only render meanings of regs with math token
+        if decoded_reg.bit_meaning_contains('@PARSE_MATH_START@'):
+            bit_dict = decoded_reg.bit_dict
+            for bit_pos in bit_dict.keys():
+                bit_name, bit_val, bit_meaning = bit_dict[bit_pos]
                 match = re_math_token.search(bit_meaning)
                 if match is None:
                     continue
@@ -617,8 +1065,8 @@ def handle_parse_math_token(tag, decoded_reg_dict, verbose = False):
                         if verbose is True:
                             print('b = ' + b + ' is not a num')
                         flag_b_is_num = False
-                    for bit_pos_inner in decoded_reg.bit_dict.keys():
-                        bit_name_inner, bit_val_inner, bit_meaning_inner = decoded_reg.bit_dict[bit_pos_inner]
+                    for bit_pos_inner in bit_dict.keys():
+                        bit_name_inner, bit_val_inner, bit_meaning_inner = bit_dict[bit_pos_inner]
                         if flag_a_is_num is False:
                             if a in bit_name_inner:
                                 for word_inner in bit_meaning_inner.split():
@@ -655,6 +1103,7 @@ def handle_parse_math_token(tag, decoded_reg_dict, verbose = False):
                             if verbose is True:
                                 print(tag + 'aft ' + bit_meaning)
                     match = re_math_token.search(bit_meaning)
+                bit_dict[bit_pos] = (bit_name, bit_val, bit_meaning)
                 decoded_reg.add_bit_des(bit_pos, bit_name, bit_val, bit_meaning)
 
 
@@ -679,7 +1128,8 @@ def save_decoded_reg_dict_to_html_table(reg_dict, fd, debug=False):
         fd.write('    <td>0x{:06x}</td>\n    <td>{}</td>\n    <td>0x{}</td>\n'.format(reg.reg_address, reg.reg_name, reg_val_str))
         if reg.has_bit_des is True:
             fd.write('    <td>\n')
-            for bit_pos in reg.bit_dict.keys():
+            bit_dict = reg.bit_dict
+            for bit_pos in bit_dict.keys():
                 if debug is False:
                     rand_color_idx = randint(0, len(color_list) - 1)
                     if  rand_color_idx == last_rand_color_idx:
@@ -692,7 +1142,7 @@ def save_decoded_reg_dict_to_html_table(reg_dict, fd, debug=False):
                     bg = ' style="background-color:%s;"' % (color_list[last_rand_color_idx])
                 else:
                     bg = ''
-                bit_name, bit_val, bit_meaning = reg.bit_dict[bit_pos]
+                bit_name, bit_val, bit_meaning = bit_dict[bit_pos]
                 bit_val = add_mark_to_word(bit_val, '_', 4)
                 # e.g. <pre><b>bit[3:0]=[0000] IB_FLB_Q_AP:</b></pre>
                 fd.write('        <pre{}><b>bit[{}]=[{}] {}:</b></pre>\n'.format(bg, bit_pos, bit_val, bit_name))
@@ -703,6 +1153,19 @@ def save_decoded_reg_dict_to_html_table(reg_dict, fd, debug=False):
         fd.write('  </tr>\n')
     fd.write('\t</tbody>\n  </table>\n')
 
+def save_decoded_reg_dict_to_records(reg_dict, writer, **fields):
+    ''' Write content in reg_dict as records, one record for each register and each bit
+        @param reg_dict: dict contains all decoded registers
+        @param writer: RecordWriter to which the records to be written
+        @param fields: fields added to every record, such as section name
+    '''
+    for reg_addr in sorted(reg_dict.keys()):
+        reg = reg_dict[reg_addr]
+        writer.write('reg', fields, address=reg.reg_address, name=reg.reg_name, value=reg.reg_val)
+        if reg.has_bit_des is True:
+            for bit_pos, (bit_name, bit_val, bit_meaning) in reg.bit_dict.items():
+                writer.write('bit', fields, address=reg.reg_address, bit=bit_pos, name=bit_name, \
+                value=bit_val, meaning=bit_meaning)
 
 def save_reg_dump_to_html(reg_list, addr_offset, value_per_line, fd):
     ''' Save reg dump to html text center to the page horizontally
@@ -804,44 +1267,759 @@ def find_unique_reg(tag, reg_dump_dict):
                and ignore the same config(same reg val) by calling this function.
     '''
     tag = get_debug_tags(tag, MODULE_NAME, None, 'find_unique_reg')[0]
+    # key is reg addr, val is list of reg vals of that addr in the first ID that has the addr
+    first_val_dict = {}
     unique_reg_addr_set = set()
-    max_num = len(reg_dump_dict)
-    for base_id in range(max_num):
-        if base_id in reg_dump_dict:
-            base_reg_dump_list = reg_dump_dict[base_id]
-            for curr_id in range(base_id + 1, max_num):
-                try:
-                    dump_reg_list = reg_dump_dict[curr_id]
-                    flag_fast_compare = True
-                    if len(dump_reg_list) == len(base_reg_dump_list):
-                        # if 2 lists have the same reg dump, only need to cmp values at the same index
-                        # O(n)
-                        for i in range(len(dump_reg_list)):
-                            if dump_reg_list[i][0] == base_reg_dump_list[i][0]:
-                                if dump_reg_list[i][1] != base_reg_dump_list[i][1]:
-                                    unique_reg_addr_set.add(base_reg_dump_list[i][0])
-                            else:
-                                print((tag + 'Warning, mismatched register address %d and %d on ID %d and ID %d' \
-                                % (dump_reg_list[i][0], base_reg_dump_list[i][0], curr_id, base_id)))
-                                flag_fast_compare = False
-                                break
-                    # fast_compare cannot be used due to a mismatch in [list length]/[reg address at a index],
-                    # most likely caused by incompleted dump on one or more PHY(s)
-                    # O(n2)
-                    if flag_fast_compare is False:
-                        temp_unique_list = [] 
-                        for item in itertools.product(dump_reg_list, base_reg_dump_list):
-                            # item[0] and item[1] are two pairs of [reg_addr, reg_val]
-                            if item[0][0] == item[1][0] and item[0][1] != item[1][1]:
-                                temp_unique_list.append(item[0][0])
-                        unique_reg_addr_set.update(temp_unique_list)
-                except KeyError:
-                    pass
-            del base_reg_dump_list
+    base_id = None
+    base_addr_list = None
+    for curr_id in sorted(reg_dump_dict.keys()):
+        dump_reg_list = reg_dump_dict[curr_id]
+        # an addr can appear more than once in one ID, its vals are only compared with other IDs
+        val_dict = {}
+        for reg_addr, reg_val in dump_reg_list:
+            val_dict.setdefault(reg_addr, []).append(reg_val)
+        for reg_addr, val_list in val_dict.items():
+            if reg_addr not in first_val_dict:
+                first_val_dict[reg_addr] = val_list
+            elif first_val_dict[reg_addr] != val_list:
+                unique_reg_addr_set.add(reg_addr)
+        # mismatch is most likely caused by incompleted dump on one or more PHY(s),
+        # regs only in some of the dumps are compared among those dumps
+        addr_list = [reg[0] for reg in dump_reg_list]
+        if base_addr_list is None:
+            base_id = curr_id
+            base_addr_list = addr_list
+        elif addr_list != base_addr_list:
+            print(tag + 'Warning, mismatched register address list on ID %d and ID %d' % (curr_id, base_id))
     return unique_reg_addr_set
 
+def _bytes_to_str(data):
+    ''' Convert data read from a file opened in binary mode to str
+        @param data: bytes read from file
+        @return data in str
+    '''
+    if isinstance(data, str):
+        return data
+    return data.decode('utf-8', 'replace')
+
+# line breaks other than '\n' and '\r\n' that str.splitlines() splits on, in utf-8
+_re_other_line_break = re.compile(b'\r(?!\n)|[\x0b\x0c\x1c\x1d\x1e]|\xc2\x85|\xe2\x80[\xa8\xa9]')
+
+class DumpReader(object):
+    ''' Read lines from a dump file lazily.
+        The file is memory-mapped, so lines are not kept in memory and
+        reading can start at any byte offset.
+        Lines are split the same way as str.splitlines(). A dump with line breaks
+        other than '\n' and '\r\n', such as a lone '\r', is read into memory with
+        those line breaks replaced by '\n', byte offsets refer to that content.
+    '''
+    def __init__(self, tag, filename, data=None):
+        ''' Open and memory-map filename
+            @param tag: tag from caller, set to None to disable printing in this function
+            @param filename: file to read
+            @param data: optional, dump content in bytes, filename is only used
+                         as name of the dump and not opened if data is given
+        '''
+        if tag is not None:
+            tag = get_debug_tags(tag, MODULE_NAME, None, 'DumpReader')[0]
+            print(tag + 'input file is ' + filename)
+        self.filename = filename
+        if data is not None:
+            self._f_d = None
+            if _re_other_line_break.search(data) is not None:
+                data = self._normalize_line_breaks(data)
+            self.buf = data
+            self.size = len(data)
+            return
+        self._f_d = open(filename, 'rb')
+        size = os.fstat(self._f_d.fileno()).st_size
+        # an empty file cannot be mapped
+        if size > 0:
+            self.buf = mmap.mmap(self._f_d.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self.buf = b''
+        self.size = size
+        if _re_other_line_break.search(self.buf) is not None:
+            if tag is not None:
+                print(tag + 'Warning, input file has line breaks other than \\n, read it into memory')
+            data = self._normalize_line_breaks(self.buf)
+            self.close()
+            self._f_d = None
+            self.buf = data
+            self.size = len(data)
+
+    @classmethod
+    def _normalize_line_breaks(cls, data):
+        ''' @param data: dump content in bytes
+            @return data with lines split by str.splitlines() and joined by '\n'
+        '''
+        line_list = _bytes_to_str(data[:]).splitlines()
+        line_list.append('')
+        return '\n'.join(line_list).encode('utf-8')
+
+    def __iter__(self):
+        return self.iter_lines()
+
+    def iter_lines(self, start=0, end=None):
+        ''' Yield lines without line break one by one
+            @param start: optional, byte offset to start reading from
+            @param end: optional, byte offset to stop reading at, default is end of file
+        '''
+        buf = self.buf
+        if end is None:
+            end = self.size
+        pos = start
+        while pos < end:
+            line_end = buf.find(b'\n', pos, end)
+            if line_end < 0:
+                line = buf[pos:end]
+                pos = end
+            else:
+                line = buf[pos:line_end]
+                pos = line_end + 1
+            if line[-1:] == b'\r':
+                line = line[:-1]
+            yield _bytes_to_str(line)
+
+    def find_line(self, line, start=0):
+        ''' Find a line equals to [line] from offset start
+            @param line: content of the line in bytes, without line break
+            @param start: optional, byte offset to start searching from
+            @return tuple of [line_start, line_end] byte offsets, or None if not found
+        '''
+        buf = self.buf
+        pos = buf.find(line, start)
+        while pos >= 0:
+            line_end = pos + len(line)
+            if (pos == 0 or buf[pos - 1:pos] == b'\n') and \
+            (buf[line_end:line_end + 1] in (b'\n', b'') or buf[line_end:line_end + 2] == b'\r\n'):
+                next_line = buf.find(b'\n', line_end)
+                if next_line < 0:
+                    return pos, self.size
+                return pos, next_line + 1
+            pos = buf.find(line, pos + 1)
+        return None
+
+    def find_keyword(self, keyword):
+        ''' @return first line contains keyword in bytes, or None if not found '''
+        buf = self.buf
+        pos = buf.find(keyword)
+        if pos < 0:
+            return None
+        line_start = buf.rfind(b'\n', 0, pos) + 1
+        line_end = buf.find(b'\n', pos)
+        if line_end < 0:
+            line_end = self.size
+        return buf[line_start:line_end].rstrip(b'\r')
+
+    def count_lines(self, start, end):
+        ''' @return number of line breaks between byte offsets start and end '''
+        return self.buf[start:end].count(b'\n')
+
+    def close(self):
+        if self._f_d is None:
+            return
+        if self.size > 0:
+            self.buf.close()
+        self._f_d.close()
+
+class DumpIndex(object):
+    ''' Index of section markers in a dump file.
+        Markers are searched in the memory-mapped dump file once, byte offsets of
+        every line equals to a marker are saved, so a section can be read without
+        reading the whole file again.
+    '''
+    def __init__(self, tag, filename, marker_list, keyword_list=[], data=None):
+        ''' Search filename for markers and keywords
+            @param tag: tag from caller, set to None to disable printing in this function
+            @param filename: path to input dump file
+            @param marker_list: list of section headers/endings, a line must be
+                                the same as a marker to be indexed
+            @param keyword_list: optional, first line contains a keyword is saved
+            @param data: optional, dump content in bytes, see DumpReader
+        '''
+        if tag is not None:
+            tag = get_debug_tags(tag, MODULE_NAME, None, 'DumpIndex')[0]
+            print(tag + 'index input file ' + filename)
+        self.filename = filename
+        self.reader = DumpReader(None, filename, data)
+        # key is marker, value is list of [line_start, line_end, line_num],
+        # where line_start and line_end are byte offsets
+        self.marker_dict = {}
+        # key is keyword, value is first line contains the keyword
+        self.keyword_dict = {}
+        all_marker_list = []
+        for marker in marker_list:
+            if marker in self.marker_dict:
+                continue
+            self.marker_dict[marker] = []
+            marker_b = marker.encode('utf-8')
+            found = self.reader.find_line(marker_b)
+            while found is not None:
+                this_marker = [found[0], found[1], 0]
+                self.marker_dict[marker].append(this_marker)
+                all_marker_list.append(this_marker)
+                found = self.reader.find_line(marker_b, found[1])
+        # line number is only needed for markers, count line breaks in between
+        offset = 0
+        line_num = 1
+        for this_marker in sorted(all_marker_list):
+            line_num += self.reader.count_lines(offset, this_marker[0])
+            this_marker[2] = line_num
+            offset = this_marker[0]
+        for keyword in keyword_list:
+            line = self.reader.find_keyword(keyword.encode('utf-8'))
+            if line is not None:
+                self.keyword_dict[keyword] = _bytes_to_str(line)
+
+    def has_markers(self, marker_list):
+        ''' @return True if all markers in marker_list are indexed '''
+        for marker in marker_list:
+            if marker not in self.marker_dict:
+                return False
+        return True
+
+    def get_keyword_line(self, keyword):
+        ''' @return first line contains keyword, or None if not found '''
+        return self.keyword_dict.get(keyword)
+
+    def get_line_num(self, marker):
+        ''' @return line number of first marker in file, 1 if marker not found '''
+        if self.marker_dict[marker]:
+            return self.marker_dict[marker][0][2]
+        return 1
+
+    def get_section_range(self, header, ending):
+        ''' Get byte range from first header to first ending after that header
+            @param header: section header, must be indexed
+            @param ending: section ending, must be indexed
+            @return [start, end] byte offsets including header and ending, or None if header is not found,
+                    end is None if ending is not found
+        '''
+        header_list = self.marker_dict[header]
+        if not header_list:
+            return None
+        start = header_list[0][0]
+        for ending_start, ending_end, ending_line_num in self.marker_dict[ending]:
+            if ending_start > start:
+                return [start, ending_end]
+        return [start, None]
+
+    def get_section_lines(self, header, ending):
+        ''' Get lines from first header to first ending after that header
+            @param header: section header, must be indexed
+            @param ending: section ending, must be indexed
+            @return iterator of lines including header and ending, can be empty
+            @note: lines till end of file are returned if ending is not found
+        '''
+        section_range = self.get_section_range(header, ending)
+        if section_range is None:
+            return iter([])
+        return self.iter_lines(*section_range)
+
+    def iter_lines(self, start=0, end=None):
+        ''' @return iterator of lines between byte offsets start and end, see DumpReader.iter_lines '''
+        return self.reader.iter_lines(start, end)
+
+    def close(self):
+        self.reader.close()
+
+class DumpFollower(object):
+    ''' Read lines appended to a growing dump file.
+        Byte offset of the first unread line is kept, so each read only gets
+        lines appended since last read. A line is read only after its line break
+        is written, so a line being written is never split.
+    '''
+    def __init__(self, tag, filename):
+        ''' @param tag: tag from caller, set to None to disable printing in this function
+            @param filename: file to follow
+        '''
+        if tag is not None:
+            tag = get_debug_tags(tag, MODULE_NAME, None, 'DumpFollower')[0]
+            print(tag + 'follow input file ' + filename)
+        self.filename = filename
+        self._f_d = open(filename, 'rb')
+        # byte offset of the first unread line
+        self.offset = 0
+
+    def read_lines(self):
+        ''' Read complete lines appended since last read
+            @return tuple of [truncated, line_list], where truncated is True if file
+                    is truncated since last read and reading starts again from beginning of file,
+                    line_list is list of [line_start, line_end, line], line_start and line_end
+                    are byte offsets, line has no line break
+        '''
+        truncated = False
+        size = os.fstat(self._f_d.fileno()).st_size
+        if size < self.offset:
+            truncated = True
+            self.offset = 0
+        if size == self.offset:
+            return truncated, []
+        self._f_d.seek(self.offset)
+        buf = self._f_d.read(size - self.offset)
+        # only read till last line break
+        buf_end = buf.rfind(b'\n') + 1
+        line_list = []
+        pos = 0
+        while pos < buf_end:
+            line_end = buf.find(b'\n', pos, buf_end)
+            line = buf[pos:line_end]
+            if line[-1:] == b'\r':
+                line = line[:-1]
+            line_list.append([self.offset + pos, self.offset + line_end + 1, _bytes_to_str(line)])
+            pos = line_end + 1
+        self.offset += buf_end
+        return truncated, line_list
+
+    def read(self, start, end):
+        ''' @return bytes between byte offsets start and end '''
+        self._f_d.seek(start)
+        return self._f_d.read(end - start)
+
+    def close(self):
+        self._f_d.close()
+
+class RecordWriter(object):
+    ''' Write decoded records to a file-like object as they are produced.
+        A record is a json object with its type in field "type".
+        In ndjson format each record is on its own line, in json format
+        all records are in one json array.
+    '''
+    def __init__(self, fd, out_format=FORMAT_NDJSON, **fields):
+        ''' @param fd: file-like object to write records to, not closed by this writer
+            @param out_format: optional, FORMAT_NDJSON or FORMAT_JSON
+            @param fields: optional, fields added to every record, such as dump file name
+        '''
+        if out_format not in [FORMAT_NDJSON, FORMAT_JSON]:
+            raise ValueError('Unknown record format [{}]'.format(out_format))
+        self.fd = fd
+        self.out_format = out_format
+        self.fields = fields
+        # number of records written
+        self.count = 0
+        if self.out_format == FORMAT_JSON:
+            self.fd.write('[\n')
+
+    def write(self, record_type, *field_dict_list, **fields):
+        ''' Write a record
+            @param record_type: type of the record, such as "reg" or "bit"
+            @param field_dict_list: optional, dicts of fields put before fields in kwargs
+            @param fields: fields of the record, values must be json serializable
+        '''
+        record = collections.OrderedDict([('type', record_type)])
+        record.update(self.fields)
+        for field_dict in field_dict_list:
+            record.update(field_dict)
+        record.update(fields)
+        if self.out_format == FORMAT_NDJSON:
+            self.fd.write(json.dumps(record) + '\n')
+        else:
+            if self.count > 0:
+                self.fd.write(',\n')
+            self.fd.write(json.dumps(record))
+        self.count += 1
+
+    def write_fragment(self, fragment):
+        ''' Write records from another writer in ndjson format, such as a writer in a worker process
+            @param fragment: records in ndjson format
+        '''
+        if not fragment:
+            return
+        if self.out_format == FORMAT_NDJSON:
+            self.fd.write(fragment)
+        else:
+            # json.dumps() never writes a line break inside a record
+            if self.count > 0:
+                self.fd.write(',\n')
+            self.fd.write(fragment.rstrip('\n').replace('\n', ',\n'))
+        self.count += fragment.count('\n')
+
+    def flush(self):
+        if hasattr(self.fd, 'flush'):
+            self.fd.flush()
+
+    def close(self):
+        ''' Finish writing records, fd is left open '''
+        if self.out_format == FORMAT_JSON:
+            self.fd.write('\n]\n')
+
+class SqliteWriter(object):
+    ''' Write decoded records to a SQLite database, same interface as RecordWriter.
+        Records are buffered per table and inserted by executemany() in one transaction
+        when the writer is flushed or closed, rows of a dump decoded before are replaced.
+        Integer in a TEXT column is saved in hex, since register value can be wider than
+        SQLite INTEGER, dict and list are saved in json.
+    '''
+    # record type -> [table name, list of [column name, column type]], every table also has dump_id
+    TABLE_DICT = collections.OrderedDict([
+        ['fw_info', ['fw_info', [['section', 'TEXT'], ['clk_freq', 'INTEGER'], ['warning', 'TEXT']]]],
+        ['fw_log', ['fw_log', [['section', 'TEXT'], ['tick', 'INTEGER'], ['time_us', 'INTEGER'], ['log', 'TEXT']]]],
+        ['reg', ['registers', [['section', 'TEXT'], ['ossp', 'INTEGER'], ['phy', 'INTEGER'], ['common', 'INTEGER'], \
+        ['qid', 'INTEGER'], ['buffer', 'TEXT'], ['iu', 'INTEGER'], ['address', 'INTEGER'], ['name', 'TEXT'], \
+        ['value', 'TEXT']]]],
+        ['bit', ['bit_fields', [['section', 'TEXT'], ['ossp', 'INTEGER'], ['phy', 'INTEGER'], ['common', 'INTEGER'], \
+        ['qid', 'INTEGER'], ['buffer', 'TEXT'], ['iu', 'INTEGER'], ['address', 'INTEGER'], ['bit', 'TEXT'], \
+        ['name', 'TEXT'], ['value', 'TEXT'], ['meaning', 'TEXT']]]],
+        ['hqa_queue', ['hqa_queues', [['section', 'TEXT'], ['qid', 'INTEGER'], ['mode', 'TEXT'], \
+        ['queue_type', 'TEXT'], ['enabled', 'INTEGER'], ['bad', 'INTEGER'], ['raid_hba', 'TEXT'], \
+        ['int_num', 'INTEGER'], ['status', 'TEXT']]]],
+        ['iu', ['ius', [['section', 'TEXT'], ['buffer', 'TEXT'], ['iu', 'INTEGER'], ['name', 'TEXT'], \
+        ['code', 'INTEGER'], ['length', 'INTEGER'], ['raw', 'TEXT']]]],
+        ['sgl', ['sgls', [['section', 'TEXT'], ['buffer', 'TEXT'], ['iu', 'INTEGER'], ['sgl', 'INTEGER'], \
+        ['addr_lo', 'INTEGER'], ['addr_hi', 'INTEGER'], ['length', 'INTEGER'], ['ctrl', 'INTEGER']]]],
+    ])
+    # list of [table name, column name] to index
+    INDEX_LIST = [['registers', 'address'], ['registers', 'qid'], ['bit_fields', 'address'], \
+    ['bit_fields', 'qid'], ['hqa_queues', 'qid'], ['ius', 'code']]
+    # seconds to wait for a database locked by another process, such as another worker in batch mode
+    TIMEOUT = 60
+
+    def __init__(self, db_path, module, in_file):
+        ''' @param db_path: path to SQLite database, created if not exist
+            @param module: module name of the parser, such as "msgu"
+            @param in_file: path to input dump file
+        '''
+        self.db_path = db_path
+        self.module = module
+        # dumps are queried across runs, so save absolute path
+        self.in_file = os.path.abspath(in_file) if os.path.isfile(in_file) else in_file
+        # number of records written
+        self.count = 0
+        # id of this dump in table dumps, set on first flush
+        self.dump_id = None
+        # rows not inserted yet, row_dict[record_type] = list of rows
+        self.row_dict = collections.OrderedDict((record_type, []) for record_type in self.TABLE_DICT)
+        self.conn = sqlite3.connect(db_path, timeout=self.TIMEOUT, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self._create_tables()
+
+    def _create_tables(self):
+        self.conn.execute('CREATE TABLE IF NOT EXISTS dumps (id INTEGER PRIMARY KEY, path TEXT, parser TEXT, decoded_at TEXT)')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_dumps_path ON dumps (path, parser)')
+        for table, column_list in self.TABLE_DICT.values():
+            columns = ', '.join(['dump_id INTEGER'] + [' '.join(column) for column in column_list])
+            self.conn.execute('CREATE TABLE IF NOT EXISTS {} ({})'.format(table, columns))
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_{0}_dump_id ON {0} (dump_id)'.format(table))
+        for table, column in self.INDEX_LIST:
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_{0}_{1} ON {0} ({1})'.format(table, column))
+
+    @classmethod
+    def _to_column(cls, val, column_type):
+        ''' Convert a field to the value saved in a column '''
+        if isinstance(val, (dict, list)):
+            return json.dumps(val)
+        if column_type == 'TEXT' and isinstance(val, numbers.Integral) and not isinstance(val, bool):
+            return '0x{:x}'.format(val)
+        return val
+
+    def write(self, record_type, *field_dict_list, **fields):
+        ''' Buffer a record, see RecordWriter.write() '''
+        if record_type not in self.TABLE_DICT:
+            raise ValueError('Unknown record type [{}]'.format(record_type))
+        # same order as RecordWriter.write(), later dicts and kwargs win
+        record = {}
+        for field_dict in field_dict_list:
+            record.update(field_dict)
+        record.update(fields)
+        column_list = self.TABLE_DICT[record_type][1]
+        self.row_dict[record_type].append(tuple(self._to_column(record.get(column), column_type) \
+        for column, column_type in column_list))
+        self.count += 1
+
+    def write_fragment(self, fragment):
+        ''' Buffer records from a RecordWriter in ndjson format, such as a writer in a worker process
+            @param fragment: records in ndjson format
+        '''
+        for line in fragment.splitlines():
+            if line:
+                record = json.loads(line)
+                self.write(record.pop('type'), record)
+
+    def flush(self):
+        ''' Insert buffered records in one transaction '''
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            if self.dump_id is None:
+                for dump_id, in self.conn.execute('SELECT id FROM dumps WHERE path = ? AND parser = ?', \
+                (self.in_file, self.module)).fetchall():
+                    for table, column_list in self.TABLE_DICT.values():
+                        self.conn.execute('DELETE FROM {} WHERE dump_id = ?'.format(table), (dump_id,))
+                    self.conn.execute('DELETE FROM dumps WHERE id = ?', (dump_id,))
+                self.dump_id = self.conn.execute('INSERT INTO dumps (path, parser, decoded_at) VALUES (?, ?, ?)', \
+                (self.in_file, self.module, datetime.now().strftime('%Y-%m-%d %H:%M:%S'))).lastrowid
+            for record_type, row_list in self.row_dict.items():
+                if not row_list:
+                    continue
+                table, column_list = self.TABLE_DICT[record_type]
+                self.conn.executemany('INSERT INTO {} VALUES ({})'.format(table, ', '.join(['?'] * (len(column_list) + 1))), \
+                [(self.dump_id,) + row for row in row_list])
+                del row_list[:]
+            self.conn.execute('COMMIT')
+        except Exception:
+            self.conn.execute('ROLLBACK')
+            raise
+
+    def close(self):
+        ''' Insert buffered records and close database '''
+        try:
+            self.flush()
+        finally:
+            self.conn.close()
+
+class FragmentFile(object):
+    ''' File-like object keeping written str in memory.
+        Sections decoded in parallel write to a FragmentFile, and fragments
+        are written to the result file in section order afterwards.
+    '''
+    def __init__(self):
+        self.str_list = []
+
+    def write(self, data):
+        self.str_list.append(data)
+
+    def close(self):
+        pass
+
+    def getvalue(self):
+        ''' @return all str written so far '''
+        return ''.join(self.str_list)
+
+class DefCache(object):
+    ''' On-disk cache for objects built from definition files.
+        A cache entry is keyed by path, size, mtime and content hash of the
+        definition file, so a definition file is parsed only when it changes.
+        Cache dir can be set by env LOG_PARSER_CACHE_DIR, set env
+        LOG_PARSER_NO_CACHE or call set_enable(False) to disable the on-disk cache.
+    '''
+    # increase this number when format of any cached object changes
+    CACHE_VERSION = 4
+    CACHE_DIR = os.environ.get('LOG_PARSER_CACHE_DIR', \
+    os.path.join(os.path.expanduser('~'), '.cache', 'log_parser'))
+    ENABLE = 'LOG_PARSER_NO_CACHE' not in os.environ
+    # in-process cache, key is [kind, path], value is [size, mtime, obj]
+    _memo_dict = {}
+    # file found in a workspace, key is [workspace, name], value is path to the file
+    WORKSPACE_INDEX_FILENAME = 'workspace_index.pickle'
+    _workspace_index_dict = None
+
+    @classmethod
+    def set_enable(cls, enable):
+        ''' Enable or disable on-disk cache in this process, parsed definitions are still kept in memory
+            @param enable: True to read and write cache files
+            @return previous setting
+        '''
+        previous = cls.ENABLE
+        cls.ENABLE = enable
+        return previous
+
+    @classmethod
+    def _get_file_hash(cls, filename):
+        hash_obj = hashlib.sha1()
+        f_d = open(filename, 'rb')
+        for chunk in iter(lambda: f_d.read(1 << 20), b''):
+            hash_obj.update(chunk)
+        f_d.close()
+        return hash_obj.hexdigest()
+
+    @classmethod
+    def _get_cache_filename(cls, kind, filename):
+        key = '|'.join([kind, filename, str(cls.CACHE_VERSION), str(sys.version_info[0])])
+        return os.path.join(cls.CACHE_DIR, \
+        '_'.join([kind, hashlib.sha1(key.encode('utf-8')).hexdigest()]) + '.pickle')
+
+    @classmethod
+    def _load(cls, cache_filename):
+        try:
+            f_d = open(cache_filename, 'rb')
+            try:
+                return pickle.load(f_d)
+            finally:
+                f_d.close()
+        except Exception:
+            # missing or broken cache file is rebuilt
+            return None
+
+    @classmethod
+    def _save(cls, tag, cache_filename, entry):
+        tmp_filename = '%s.%d.tmp' % (cache_filename, os.getpid())
+        try:
+            if not os.path.isdir(cls.CACHE_DIR):
+                os.makedirs(cls.CACHE_DIR)
+            f_d = open(tmp_filename, 'wb')
+            pickle.dump(entry, f_d, pickle.HIGHEST_PROTOCOL)
+            f_d.close()
+            try:
+                os.rename(tmp_filename, cache_filename)
+            except OSError:
+                # rename cannot overwrite on Windows
+                os.remove(cache_filename)
+                os.rename(tmp_filename, cache_filename)
+        except (IOError, OSError) as e:
+            if tag is not None:
+                print(tag + 'Warning, cannot save cache file %s: %s' % (cache_filename, e))
+
+    @classmethod
+    def get(cls, tag, kind, filename, build_cb):
+        ''' Get object built from a definition file, build it only if not cached
+            @param tag: tag from caller, set to None to disable printing in this function
+            @param kind: name of the object, objects built from the same file by
+                         different build_cb must use different kind
+            @param filename: path to definition file
+            @param build_cb: callback build_cb(filename) to build the object,
+                             return value must be picklable
+            @return object built by build_cb
+        '''
+        if tag is not None:
+            tag = get_debug_tags(tag, MODULE_NAME, None, 'DefCache.get')[0]
+        filename = os.path.abspath(filename)
+        stat = os.stat(filename)
+        memo_key = (kind, filename)
+        if memo_key in cls._memo_dict:
+            size, mtime, obj = cls._memo_dict[memo_key]
+            if size == stat.st_size and mtime == stat.st_mtime:
+                return obj
+
+        obj = None
+        if cls.ENABLE is True:
+            cache_filename = cls._get_cache_filename(kind, filename)
+            entry = cls._load(cache_filename)
+            file_hash = None
+            if isinstance(entry, dict) and entry.get('version') == cls.CACHE_VERSION:
+                if entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime:
+                    obj = entry['obj']
+                elif entry['size'] == stat.st_size:
+                    # file is touched or copied, check content before rebuild
+                    file_hash = cls._get_file_hash(filename)
+                    if entry['hash'] == file_hash:
+                        obj = entry['obj']
+                        entry['mtime'] = stat.st_mtime
+                        cls._save(tag, cache_filename, entry)
+            if obj is None:
+                obj = build_cb(filename)
+                if file_hash is None:
+                    file_hash = cls._get_file_hash(filename)
+                entry = {'version': cls.CACHE_VERSION, 'size': stat.st_size, \
+                'mtime': stat.st_mtime, 'hash': file_hash, 'obj': obj}
+                cls._save(tag, cache_filename, entry)
+        else:
+            obj = build_cb(filename)
+        cls._memo_dict[memo_key] = [stat.st_size, stat.st_mtime, obj]
+        return obj
+
+    @classmethod
+    def get_workspace_file(cls, tag, workspace, name, search_cb):
+        ''' Get path to a file in a workspace, the workspace is searched only if
+            the file is not in workspace index or the indexed file is gone
+            @param tag: tag from caller, set to None to disable printing in this function
+            @param workspace: path to workspace
+            @param name: name of the file to find
+            @param search_cb: callback search_cb(workspace) to search the file in workspace
+            @return path to the file
+        '''
+        if tag is not None:
+            tag = get_debug_tags(tag, MODULE_NAME, None, 'DefCache.get_workspace_file')[0]
+        index_filename = os.path.join(cls.CACHE_DIR, cls.WORKSPACE_INDEX_FILENAME)
+        if cls._workspace_index_dict is None:
+            entry = None
+            if cls.ENABLE is True:
+                entry = cls._load(index_filename)
+            if isinstance(entry, dict) and entry.get('version') == cls.CACHE_VERSION:
+                cls._workspace_index_dict = entry['obj']
+            else:
+                cls._workspace_index_dict = {}
+        key = (os.path.abspath(workspace), name)
+        path = cls._workspace_index_dict.get(key)
+        if path is not None and os.path.isfile(path):
+            if tag is not None:
+                print(tag + 'use {} from workspace index'.format(path))
+            return path
+        path = search_cb(workspace)
+        cls._workspace_index_dict[key] = path
+        if cls.ENABLE is True:
+            cls._save(tag, index_filename, {'version': cls.CACHE_VERSION, 'obj': cls._workspace_index_dict})
+        return path
+
+def read_dump_source(source):
+    ''' Get name and content of a dump given by a library caller
+        @param source: path to dump file, dump content in bytes, or a file-like object
+        @return tuple of [name, data], where data is None if source is a path,
+                so the file is memory-mapped instead of being read
+    '''
+    if isinstance(source, bytes):
+        # in python 2, str is bytes, treat it as a path if such file exists
+        if bytes is not str or not os.path.isfile(source):
+            return '<bytes>', source
+        return source, None
+    if hasattr(source, 'read'):
+        data = source.read()
+        if not isinstance(data, bytes):
+            data = data.encode('utf-8')
+        name = getattr(source, 'name', None)
+        if not isinstance(name, str):
+            name = '<stream>'
+        return name, data
+    if os.path.isfile(source):
+        return source, None
+    raise ValueError('Dump source [{}] is not a file, bytes or file-like object'.format(source))
+
+class ParseContext(object):
+    ''' Input params and state for decoding one dump file.
+        A context is created per dump and passed to parser run(), parsers
+        keep no per-dump state on class or module, so dumps can be decoded
+        concurrently in one process.
+    '''
+    def __init__(self, in_file, out_dir, debug_mode=False, workspace='', data=None, out_name=None):
+        ''' @param in_file: path to input dump file
+            @param out_dir: path to output dir
+            @param debug_mode: optional, True to enable additional log
+            @param workspace: optional, path to BC workspace
+            @param data: optional, dump content in bytes, in_file is only used
+                         as name of the dump if data is given
+            @param out_name: optional, name of the dump used in output filenames,
+                             name of in_file is used if None
+        '''
+        self.in_file = in_file
+        self.out_name = out_name
+        self.data = data
+        self.out_dir = out_dir
+        self.debug_mode = debug_mode
+        self.workspace = workspace
+        # path to result file shared by all sections of a module
+        self.out_filename = ''
+        # DumpIndex of input dump file
+        self.dump_index = None
+        # chipset read from input dump file
+        self.chipset = None
+
+    def get_out_filename(self, module, section=None, ext='.html'):
+        ''' Get path to a new output file in out_dir, an existing file is not reused
+            @param module: module name
+            @param section: optional, section name under module
+            @param ext: optional, extension of output file
+            @return path to output file
+        '''
+        filename = get_parsed_filename(self.out_name or self.in_file, module, section)
+        return get_unique_filename(os.path.join(self.out_dir, filename), ext)
+
+    def close(self):
+        ''' Release input dump file, call this after decoding '''
+        if self.dump_index is not None:
+            self.dump_index.close()
+            self.dump_index = None
+
+def get_section_list(sections):
+    ''' @param sections: comma separated section names, or None
+        @return list of section names, or None to select all sections
+    '''
+    if sections is None:
+        return None
+    return [section.strip() for section in sections.split(',') if section.strip()]
+
 class DumpArgvWorker(object):
     ''' Handle argv for register dump.
+        Class attributes are default values, parsed args are stored in the instance.
     '''
     # Path to input dump file
     INPUT_DIR = ''
@@ -851,20 +2029,28 @@ class DumpArgvWorker(object):
     INCLUDE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'include')
     # Enable debugging if set to true
     DEBUG_MODE = False
+    # List of input dump files in batch mode, empty if not in batch mode
+    INPUT_LIST = []
+    # Number of processes, for dump files in batch mode, otherwise for sections of one dump
+    JOBS = 1
+    # List of sections to decode, decode all sections if None
+    SECTION_LIST = None
+    # Format of result, one of FORMAT_LIST
+    FORMAT = FORMAT_HTML
+    # Path to SQLite database to save result to instead of files, None to save result in files
+    SQLITE_DB = None
 
-    @classmethod
-    def _set_input_filename(cls, filename):
+    def _set_input_filename(self, filename):
         ''' Validate and set INPUT_DIR to filename
             @param filename: path to an input file, must exist
         '''
         if os.path.isfile(filename):
-            cls.INPUT_DIR = filename
+            self.INPUT_DIR = filename
         else:
             print('Error, [{}] is not a valid input file'.format(filename))
             sys.exit(1)
 
-    @classmethod
-    def _set_output_dir(cls, in_file, out_dir):
+    def _set_output_dir(self, in_file, out_dir):
         ''' Validate and set OUTPUT_DIR to out_dir
             @param in_file: path to input file
             @param out_dir: path to output dir
@@ -878,11 +2064,11 @@ class DumpArgvWorker(object):
             print('Warning, [{}] is not a valid output dirname'.format(out_dir))
             out_dir = os.path.join(os.path.dirname(os.path.abspath(in_file)))
             print('Warning, use default directory [{}] for output'.format(out_dir))
-        cls.OUTPUT_DIR = out_dir
+        self.OUTPUT_DIR = out_dir
         # check if dir exists is necessary in case
         # root for OUTPUT_DIR is read-only
-        if not os.path.exists(cls.OUTPUT_DIR):
-            os.makedirs(cls.OUTPUT_DIR)
+        if not os.path.exists(self.OUTPUT_DIR):
+            os.makedirs(self.OUTPUT_DIR)
 
     @classmethod
     def _build(cls):
@@ -892,13 +2078,38 @@ class DumpArgvWorker(object):
                    as build_cb to parse() 
         '''
         parser = argparse.ArgumentParser()
-        parser.add_argument("-i", "--inFile", help="path to input dump file", required=True)
+        in_group = parser.add_mutually_exclusive_group(required=True)
+        in_group.add_argument("-i", "--inFile", help="path to input dump file")
+        in_group.add_argument("--batch", help="decode all dump files in a folder or matching a glob pattern")
+        parser.add_argument("-j", "--jobs", help="number of processes, decode dumps in parallel in batch mode, otherwise decode sections in parallel", type=int, default=cls.JOBS)
         parser.add_argument("-o", "--outDir", help="path to output folder for result", default=cls.OUTPUT_DIR)
         parser.add_argument("-d", "--debug", help="enable additional log", dest='debug_mode', action='store_true')
+        parser.add_argument("--sections", help="comma separated sections to decode, decode all sections if not given")
+        parser.add_argument("--format", help="format of result, html or records in ndjson/json", \
+        choices=FORMAT_LIST, default=cls.FORMAT)
+        parser.add_argument("--sqlite", help="path to SQLite database to save result to instead of files, created if not exist")
         return parser
 
-    @classmethod
-    def parse(cls, build_cb=None):
+    def _set_input_list(self, batch, exclude_list=[]):
+        ''' Validate and set INPUT_LIST to files in batch
+            @param batch: path to a folder, or a glob pattern
+            @param exclude_list: optional, list of files not to take as input
+            @note: output files of this tool, such as result of a previous batch
+                   saved in the same folder, are not taken as input
+        '''
+        if os.path.isdir(batch):
+            input_list = [os.path.join(batch, filename) for filename in os.listdir(batch)]
+        else:
+            input_list = glob.glob(batch)
+        exclude_set = set(os.path.abspath(filename) for filename in exclude_list)
+        self.INPUT_LIST = sorted(filename for filename in input_list if os.path.isfile(filename) \
+        and not get_filename(filename).startswith((PARSED_FILE_PREFIX, BATCH_SUMMARY_PREFIX)) \
+        and os.path.abspath(filename) not in exclude_set)
+        if not self.INPUT_LIST:
+            print('Error, [{}] has no input file'.format(batch))
+            sys.exit(1)
+
+    def parse(self, build_cb=None):
         ''' Get args from argparse and ensure that all args defined in
             parser are valid
             @param build_cb: if not None, then use build_cb() to construct
@@ -912,17 +2123,135 @@ class DumpArgvWorker(object):
         if build_cb:
             parser = build_cb()
         else:
-            parser = cls._build()
+            parser = self._build()
 
         args = parser.parse_args()
-        cls._set_input_filename(args.inFile)
-        cls._set_output_dir(args.inFile, args.outDir)
-        cls.DEBUG_MODE = args.debug_mode
+        self.SQLITE_DB = os.path.abspath(args.sqlite) if args.sqlite else None
+        if args.batch:
+            exclude_list = []
+            if self.SQLITE_DB is not None:
+                exclude_list = [self.SQLITE_DB + suffix for suffix in ['', '-wal', '-shm', '-journal']]
+            self._set_input_list(args.batch, exclude_list)
+            self._set_output_dir(self.INPUT_LIST[0], args.outDir)
+        else:
+            self._set_input_filename(args.inFile)
+            self._set_output_dir(args.inFile, args.outDir)
+        self.JOBS = max(1, args.jobs)
+        self.DEBUG_MODE = args.debug_mode
+        self.SECTION_LIST = get_section_list(args.sections)
+        self.FORMAT = args.format
 
         # return args for additional argv defined 
         # in case build_cb is not None
         return args
 
+def _get_batch_out_name_list(input_list):
+    ''' Get name used in output filenames for each input file in batch mode,
+        so input files with the same filename in different folders do not share output files
+        @param input_list: list of input dump files
+        @return list of names, a name is path of input file relative to common folder of all
+                input files without extension, chars other than letters, digits, '-' and '_'
+                are replaced by '_'. A name is unique in the list.
+    '''
+    path_list = [os.path.abspath(in_file) for in_file in input_list]
+    common_dir = os.path.dirname(os.path.commonprefix(path_list))
+    name_list = []
+    name_set = set()
+    for idx, path in enumerate(path_list):
+        dirname, filename = os.path.split(os.path.relpath(path, common_dir))
+        # extension is dropped as in get_parsed_filename()
+        name = re.sub('[^0-9a-zA-Z_-]', '_', os.path.join(dirname, filename.split('.')[0]))
+        while name in name_set:
+            name = '{}_{}'.format(name, idx)
+        name_set.add(name)
+        name_list.append(name)
+    return name_list
+
+def _run_batch_worker(args):
+    ''' Decode one file in batch mode, an error on this file does not stop the batch
+        @param args: tuple of [worker_cb, in_file, out_name, worker_args]
+        @return list of [in_file, found_log_flag, section_found_list, out_path, error, memo_hits, memo_misses]
+    '''
+    worker_cb, in_file, out_name, worker_args = args
+    hits, misses, size = decode_memo.get_stats()
+    try:
+        found_log_flag, section_found_list, out_path = worker_cb(in_file, *worker_args, out_name=out_name)
+        error = None
+    except Exception:
+        found_log_flag, section_found_list, out_path, error = False, [], None, traceback.format_exc()
+    hits_after, misses_after, size = decode_memo.get_stats()
+    return [in_file, found_log_flag, section_found_list, out_path, error, hits_after - hits, misses_after - misses]
+
+def run_batch(tag, module, input_list, out_dir, jobs, worker_cb, worker_args=(), preload_cb=None, preload_args=()):
+    ''' Decode dump files in input_list by a process pool and save a summary
+        @param tag: tag from caller
+        @param module: module name
+        @param input_list: list of input dump files
+        @param out_dir: output dir, summary is saved here
+        @param jobs: number of processes, decode in this process if jobs is 1
+        @param worker_cb: module level function worker_cb(in_file, *worker_args, out_name=name) to decode
+                          one file, where name is used in output filenames instead of name of in_file,
+                          returns tuple of [found_log_flag, section_found_list, out_path],
+                          where section_found_list is list of [section, found_flag] and out_path
+                          is path to result, or None if nothing is saved
+        @param worker_args: optional, additional args for worker_cb
+        @param preload_cb: optional, function preload_cb(*preload_args) to load definitions
+                           before decoding, called once in this process and once in each worker
+        @param preload_args: optional, args for preload_cb
+        @return True if log is found in any of the files
+    '''
+    tag = get_debug_tags(tag, MODULE_NAME, None, 'run_batch')[0]
+    print(tag + 'decode {} file(s) with {} process(es)'.format(len(input_list), jobs))
+    start_time = time.time()
+    # load definitions once, workers forked after this inherit them
+    if preload_cb is not None:
+        preload_cb(*preload_args)
+    task_list = [(worker_cb, in_file, out_name, worker_args) for in_file, out_name in \
+    zip(input_list, _get_batch_out_name_list(input_list))]
+    if jobs > 1 and len(task_list) > 1:
+        pool = multiprocessing.Pool(min(jobs, len(task_list)), preload_cb, preload_args)
+        try:
+            result_list = pool.map(_run_batch_worker, task_list, 1)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        result_list = [_run_batch_worker(task) for task in task_list]
+    elapsed_time = time.time() - start_time
+
+    summary_list = ['Batch summary for {}, {} dump(s), {} process(es)'.format(module, len(input_list), jobs)]
+    found_count = 0
+    error_count = 0
+    memo_hits = 0
+    memo_misses = 0
+    for in_file, found_log_flag, section_found_list, out_path, error, hits, misses in result_list:
+        memo_hits += hits
+        memo_misses += misses
+        if error is not None:
+            error_count += 1
+            summary_list.append('{}: error\n{}'.format(in_file, error.rstrip()))
+            continue
+        if found_log_flag is True:
+            found_count += 1
+        found_list = [section for section, found_flag in section_found_list if found_flag is True]
+        not_found_list = [section for section, found_flag in section_found_list if found_flag is not True]
+        summary = '{}: found [{}], not found [{}]'.format(in_file, ', '.join(found_list), ', '.join(not_found_list))
+        if out_path is not None:
+            summary += ', result is saved in ' + out_path
+        summary_list.append(summary)
+    summary_list.append('Found log in {}/{} dump(s), {} dump(s) failed'.format(found_count, len(input_list), error_count))
+    summary_list.append('Decoded {} dump(s) in {:.2f} s, {:.2f} dumps/sec'.format(len(input_list), elapsed_time, \
+    len(input_list) / elapsed_time if elapsed_time > 0 else 0))
+    summary_list.append('Decode memo: {} hit(s), {} miss(es)'.format(memo_hits, memo_misses))
+    summary = '\n'.join(summary_list) + '\n'
+
+    filename = get_unique_filename(os.path.join(out_dir, BATCH_SUMMARY_PREFIX + module + '_' + get_timestamp()), '.txt')
+    with open(filename, 'w') as fd:
+        fd.write(summary)
+    print(summary)
+    print(tag + 'summary is saved in ' + filename)
+    return found_count > 0
+
 class XMLREToken():
     # regular expression for things like 'When set to logic'
     re_logic = re.compile('When([a-zA-Z\s]+)logic:')
@@ -930,3 +2259,5 @@ class XMLREToken():
     re_hex_token = re.compile('@PARSE_REPLACE_VALUE_HEX_START@[a-zA-Z0-9\s_]+@PARSE_REPLACE_VALUE_HEX_END@')
     # regular expression token that replace contents with decimal in definition files 
     re_dec_token = re.compile('@PARSE_REPLACE_VALUE_START@[a-zA-Z0-9\s_]+@PARSE_REPLACE_VALUE_END@')
+    # hex or decimal token, used to compile bit meaning templates
+    re_value_token = re.compile('(?P<hex>%s)|(?P<dec>%s)' % (re_hex_token.pattern, re_dec_token.pattern))
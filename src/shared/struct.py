@@ -1,8 +1,19 @@
-''' Data structures for log dump parser. '''
+''' Data structures for log dump parser.
+    Classes use __slots__ since one object is created per register per OSSP/PHY/queue/IU.
+'''
 import collections
+try:
+    from collections.abc import MutableMapping
+except ImportError:
+    from collections import MutableMapping
+from . import dutil as ut
 
 class DefReg(object):
-    ''' Save reg info read from def file, do not save bit des if bit name contains 'RESERVED'. '''
+    ''' Save reg info read from def file, do not save bit des if bit name contains 'RESERVED'.
+        bit_dict[bit_position] = tuple of [bit_name, bit_meaning], both are interned.
+    '''
+    __slots__ = ('reg_address', 'reg_name', 'has_bit_des', 'bit_dict', 'bit_field_dict', 'bit_meaning_dict')
+
     def __init__(self, reg_address, reg_name='N/A'):
         if type(reg_address) is str:
             self.reg_address = int(reg_address, 16)
@@ -10,15 +21,21 @@ class DefReg(object):
             self.reg_address = reg_address
         assert (type(self.reg_address) is int \
         or type(self.reg_address) is long), 'Trying to add a none int/long reg address to def reg'
-        self.reg_name = reg_name
+        self.reg_name = ut.intern_text(reg_name)
         self.has_bit_des = False
     def add_bit_des(self, bit_position, bit_name, bit_meaning):
         if 'RESERVED' in bit_name:
             return
         if self.has_bit_des is False:
             self.bit_dict = collections.OrderedDict()
+            # compiled bit position and bit meaning for each bit in bit_dict
+            self.bit_field_dict = {}
+            self.bit_meaning_dict = {}
             self.has_bit_des = True
-        self.bit_dict[bit_position] = [bit_name, bit_meaning]
+        bit_position = ut.intern_text(bit_position)
+        self.bit_dict[bit_position] = (ut.intern_text(bit_name), ut.intern_text(bit_meaning))
+        self.bit_field_dict[bit_position] = ut.get_bit_field(bit_position)
+        self.bit_meaning_dict[bit_position] = ut.get_bit_meaning(bit_meaning)
 
     def get_bit_des(self, bit_position):
         if self.has_bit_des is True:
@@ -27,7 +44,14 @@ class DefReg(object):
         return None, None
 
 class DecodedReg(object):
-    ''' Save reg info for decoded reg '''
+    ''' Save reg info for decoded reg.
+        A bit meaning is kept as the ut.BitMeaning template shared with definition,
+        and rendered with bit value only when it is read, such as when saving result.
+        bit_des_dict can be shared by regs decoded from the same definition and value,
+        it is copied before being modified.
+    '''
+    __slots__ = ('reg_address', 'reg_name', 'reg_val', 'has_bit_des', 'bit_des_dict', 'bit_des_shared')
+
     def __init__(self, reg_address, reg_name='N/A', reg_val=0x0):
         if type(reg_address) is str:
             self.reg_address = int(reg_address, 16)
@@ -38,16 +62,110 @@ class DecodedReg(object):
         self.reg_name = reg_name
         self.reg_val = reg_val
         self.has_bit_des = False
+        self.bit_des_shared = False
     def add_bit_des(self, bit_position, bit_name, bit_val, bit_meaning):
+        ''' @param bit_val: bit value in bin str
+            @param bit_meaning: meaning in str, or ut.BitMeaning to render with bit_val when it is read
+        '''
         if self.has_bit_des is False:
-            self.bit_dict = collections.OrderedDict()
+            self.bit_des_dict = collections.OrderedDict()
             self.has_bit_des = True
-        self.bit_dict[bit_position] = [bit_name, bit_val, bit_meaning]
+        elif self.bit_des_shared is True:
+            self.bit_des_dict = collections.OrderedDict(self.bit_des_dict)
+            self.bit_des_shared = False
+        self.bit_des_dict[bit_position] = (bit_name, ut.intern_text(bit_val), bit_meaning)
+
+    def set_shared_bit_des(self, bit_des_dict):
+        ''' Use bits decoded before, such as bits returned by ut.decode_reg_bits()
+            @param bit_des_dict: OrderedDict, bit_des_dict[bit_position] = tuple of [bit_name, bit_val, bit_meaning]
+        '''
+        if bit_des_dict:
+            self.bit_des_dict = bit_des_dict
+            self.has_bit_des = True
+            self.bit_des_shared = True
+
+    @classmethod
+    def _render(cls, bit_val, bit_meaning):
+        if isinstance(bit_meaning, ut.BitMeaning):
+            return bit_meaning.render(int(bit_val, 2), bit_val)
+        return bit_meaning
+
+    @property
+    def bit_dict(self):
+        ''' BitDict view of bits, bit_dict[bit_position] = tuple of [bit_name, bit_val, bit_meaning],
+            a meaning is rendered when that bit is read, and writes are saved in this reg
+        '''
+        return BitDict(self)
+
+    @bit_dict.setter
+    def bit_dict(self, bit_dict):
+        self.has_bit_des = False
+        self.bit_des_shared = False
+        for bit_position, (bit_name, bit_val, bit_meaning) in bit_dict.items():
+            self.add_bit_des(bit_position, bit_name, bit_val, bit_meaning)
+
+    def get_bit_des(self, bit_position):
+        ''' @return tuple of [bit_name, bit_val, bit_meaning] of one bit '''
+        bit_name, bit_val, bit_meaning = self.bit_des_dict[bit_position]
+        return bit_name, bit_val, self._render(bit_val, bit_meaning)
+
+    def bit_meaning_contains(self, text):
+        ''' Check text on templates without rendering them
+            @return False if text is not in meaning of any bit
+        '''
+        if self.has_bit_des is False:
+            return False
+        for bit_name, bit_val, bit_meaning in self.bit_des_dict.values():
+            if isinstance(bit_meaning, ut.BitMeaning):
+                bit_meaning = bit_meaning.raw_meaning
+            if text in bit_meaning:
+                return True
+        return False
+
+class BitDict(MutableMapping):
+    ''' Dict view of bits of a DecodedReg, returned by DecodedReg.bit_dict.
+        Reading a bit renders its meaning only, setting or deleting a bit changes the reg.
+    '''
+    __slots__ = ('reg',)
+
+    def __init__(self, reg):
+        self.reg = reg
+
+    def _get_dict(self):
+        if self.reg.has_bit_des is False:
+            return {}
+        return self.reg.bit_des_dict
+
+    def __getitem__(self, bit_position):
+        if bit_position not in self._get_dict():
+            raise KeyError(bit_position)
+        return self.reg.get_bit_des(bit_position)
+
+    def __setitem__(self, bit_position, bit_des):
+        bit_name, bit_val, bit_meaning = bit_des
+        self.reg.add_bit_des(bit_position, bit_name, bit_val, bit_meaning)
+
+    def __delitem__(self, bit_position):
+        reg = self.reg
+        if bit_position not in self._get_dict():
+            raise KeyError(bit_position)
+        if reg.bit_des_shared is True:
+            reg.bit_des_dict = collections.OrderedDict(reg.bit_des_dict)
+            reg.bit_des_shared = False
+        del reg.bit_des_dict[bit_position]
+
+    def __iter__(self):
+        return iter(self._get_dict())
+
+    def __len__(self):
+        return len(self._get_dict())
 
 class DefIU(object):
+    __slots__ = ('iu_name', 'iu_code', 'has_reg', 'reg_dict')
+
     # both iu_name and iu_code are strings
     def __init__(self, iu_name, iu_code):
-        self.iu_name = iu_name
+        self.iu_name = ut.intern_text(iu_name)
         if type(iu_code) is str:
             self.iu_code = int(iu_code, 16)
         else:
@@ -83,6 +201,9 @@ class DefIU(object):
         return None
 
 class DecodedIU(object):
+    ''' sgl_list is list of tuple [addr_lo, addr_hi, length, ctrl] '''
+    __slots__ = ('iu_name', 'iu_code', 'iu_length', 'reg_dict', 'raw_reg_list', 'has_sgl', 'sgl_list')
+
     def __init__(self, iu_name, iu_code, iu_length, raw_reg_list, reg_dict):
         self.iu_name = iu_name
         if type(iu_code) is str:
@@ -98,5 +219,4 @@ class DecodedIU(object):
         self.sgl_list = []
     def add_sgl(self, addr_lo, addr_hi, length, ctrl):
         self.has_sgl = True
-        self.sgl_list.append([addr_lo, addr_hi, length, ctrl])
-        
\ No newline at end of file
+        self.sgl_list.append((addr_lo, addr_hi, length, ctrl))